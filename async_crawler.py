@@ -0,0 +1,278 @@
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple, Optional, Iterable, Iterator
+from urllib.parse import urlsplit
+from http_fetcher import AvitoHTTPFetcher
+from parse_pipeline import parse_detail_page
+from html_archive import HTMLArchive
+from db import DatabaseManager, BufferedWriter
+import config
+
+
+# HTTP-статусы удаленных объявлений
+REMOVED_STATUS_CODES = (404, 410)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket
+    
+    Токены пополняются со скоростью rate в секунду, но не больше burst.
+    Каждый запрос забирает один токен; если токенов нет, запрос ждет.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        """
+        Инициализация ограничителя
+        
+        Args:
+            rate: Запросов в секунду в среднем
+            burst: Максимальное количество запросов подряд без ожидания
+        """
+        if rate <= 0:
+            raise ValueError("rate должен быть больше 0")
+        
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        """Пополнение токенов за прошедшее время"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self) -> float:
+        """
+        Получение токена (с ожиданием при необходимости)
+        
+        Returns:
+            Время ожидания в секундах
+        """
+        started = time.monotonic()
+        # Ожидающие обслуживаются по очереди
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """Набор ограничителей token bucket - по одному на хост"""
+    
+    def __init__(self, rate: float, burst: int):
+        """
+        Инициализация
+        
+        Args:
+            rate: Запросов в секунду к одному хосту
+            burst: Размер пачки запросов к одному хосту
+        """
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+    
+    async def acquire(self, url: str) -> float:
+        """
+        Получение разрешения на запрос к хосту из url
+        
+        Args:
+            url: URL запроса
+            
+        Returns:
+            Время ожидания в секундах
+        """
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return await bucket.acquire()
+
+
+class AsyncCrawler:
+    """
+    Асинхронный обход детальных страниц через HTTP
+    
+    Запросы выполняются параллельно, а их частота ограничивается только
+    HostRateLimiter, без фиксированных пауз. Парсинг выполняется в пуле
+    потоков, запись в БД - в отдельном потоке через BufferedWriter
+    (пачками, объявление и отметка ссылки в одной транзакции).
+    Страницы, похожие на блокировку, пропускаются и остаются
+    непарсенными для обработки браузером.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, rate: Optional[float] = None,
+                 burst: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 fetcher: Optional[AvitoHTTPFetcher] = None,
+                 archive: Optional[HTMLArchive] = None):
+        """
+        Инициализация
+        
+        Args:
+            db_manager: Менеджер базы данных
+            rate: Запросов в секунду (по умолчанию config.ASYNC_RATE)
+            burst: Размер пачки (по умолчанию config.ASYNC_BURST)
+            max_in_flight: Предел одновременных запросов
+                           (по умолчанию config.ASYNC_MAX_IN_FLIGHT)
+            fetcher: HTTP-клиент (по умолчанию новый AvitoHTTPFetcher)
+            archive: Архив загруженных страниц (None - не сохранять)
+        """
+        self.db_manager = db_manager
+        self.limiter = HostRateLimiter(
+            rate if rate is not None else config.ASYNC_RATE,
+            burst if burst is not None else config.ASYNC_BURST
+        )
+        self.max_in_flight = max(1, max_in_flight if max_in_flight is not None
+                                 else config.ASYNC_MAX_IN_FLIGHT)
+        self.fetcher = fetcher or AvitoHTTPFetcher(pool_size=self.max_in_flight)
+        self.archive = archive
+        self.stats: Dict[str, float] = {}
+        self._writer: Optional[BufferedWriter] = None
+    
+    async def crawl(self, links: Iterable[Tuple[int, str]],
+                    total: Optional[int] = None) -> Dict[str, float]:
+        """
+        Обход ссылок
+        
+        Args:
+            links: Список или итератор кортежей (id ссылки, url), например
+                   DatabaseManager.iter_claimed_links
+            total: Количество ссылок (по умолчанию len(links) для списка)
+            
+        Returns:
+            Статистика: processed, saved (из них inserted новых и updated
+            обновленных), failed, blocked, elapsed, throttled (суммарное
+            ожидание лимита) и rate
+        """
+        self.stats = {
+            'processed': 0, 'saved': 0, 'inserted': 0, 'updated': 0, 'failed': 0,
+            'blocked': 0, 'throttled': 0.0, 'elapsed': 0.0, 'rate': 0.0
+        }
+        if total is None:
+            links = list(links)
+            total = len(links)
+        if not total:
+            return self.stats
+        
+        if not self.fetcher.session:
+            self.fetcher.setup_driver()
+            self.fetcher.load_cookies()
+        
+        # Следующая ссылка берется в единственном потоке записи БД: аренда
+        # ссылок (iter_claimed_links) может ждать блокировку БД и не должна
+        # останавливать цикл событий, а итератор не читается параллельно
+        work_queue = iter(links)
+        
+        worker_count = min(self.max_in_flight, total)
+        started = time.monotonic()
+        
+        # Закрытие в обратном порядке: сначала пул загрузки и парсинга (его
+        # задачи передают запись в db_pool), затем поток записи, последним -
+        # буфер, когда в него больше ничего не добавляется
+        with self.db_manager.buffered_writer() as writer, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer") as db_pool, \
+                ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="fetch") as pool:
+            self._writer = writer
+            workers = [
+                asyncio.create_task(self._worker(work_queue, pool, db_pool, total))
+                for _ in range(worker_count)
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        
+        self.stats['inserted'] = writer.inserted
+        self.stats['updated'] = writer.updated
+        self.stats['elapsed'] = time.monotonic() - started
+        if self.stats['elapsed'] > 0:
+            self.stats['rate'] = self.stats['processed'] / self.stats['elapsed']
+        return self.stats
+    
+    async def _worker(self, work_queue: Iterator[Tuple[int, str]], pool: ThreadPoolExecutor,
+                      db_pool: ThreadPoolExecutor, total: int) -> None:
+        """Обработка ссылок из очереди до ее опустошения"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            link = await loop.run_in_executor(db_pool, next, work_queue, None)
+            if link is None:
+                return
+            link_id, url = link
+            
+            self.stats['throttled'] += await self.limiter.acquire(url)
+            
+            try:
+                status_code, html_content = await loop.run_in_executor(
+                    pool, self.fetcher.fetch, url
+                )
+            except Exception as e:
+                print(f"  ✗ Ошибка HTTP-запроса {url}: {e}")
+                self._count('failed')
+                continue
+            
+            if status_code in REMOVED_STATUS_CODES:
+                # Объявление удалено - повторять запрос бессмысленно
+                await loop.run_in_executor(db_pool, self._writer.mark_link_as_parsed, link_id)
+                self._count('failed')
+                print(f"[{self.stats['processed']}/{total}] removed (HTTP {status_code}): {url}")
+                continue
+            
+            if self.fetcher.is_blocked(status_code, html_content, 'detail'):
+                print(f"  ⚠ Блокировка или неполная страница (HTTP {status_code}): {url}")
+                self._count('blocked')
+                continue
+            
+            status = await loop.run_in_executor(
+                pool, self._parse_and_store, link_id, url, html_content, db_pool
+            )
+            self._count(status)
+            print(f"[{self.stats['processed']}/{total}] {status}: {url}")
+    
+    def _parse_and_store(self, link_id: int, url: str, html_content: str,
+                         db_pool: ThreadPoolExecutor) -> str:
+        """
+        Парсинг страницы и запись результата в БД
+        
+        Returns:
+            'saved' или 'failed'
+        """
+        if self.archive:
+            try:
+                self.archive.put(url, html_content, 'detail')
+            except Exception as e:
+                print(f"  ⚠ Не удалось сохранить страницу в архив: {e}")
+        
+        try:
+            # Тот же разбор, что в режимах браузера, HTTP и пула процессов
+            apartment_data, _ = parse_detail_page(url, html_content)
+        except Exception as e:
+            print(f"  ✗ Ошибка при парсинге {url}: {e}")
+            apartment_data = {}
+        
+        return db_pool.submit(self._store, link_id, apartment_data).result()
+    
+    def _store(self, link_id: int, apartment_data: Dict) -> str:
+        """Запись результата (выполняется в единственном потоке записи)"""
+        if not apartment_data.get('title'):
+            self._writer.mark_link_as_parsed(link_id)
+            return 'failed'
+        
+        self._writer.add_apartment(apartment_data, link_id)
+        return 'saved'
+    
+    def _count(self, status: str) -> None:
+        """Учет результата обработки ссылки"""
+        self.stats['processed'] += 1
+        self.stats[status] += 1
+    
+    def close(self) -> None:
+        """Закрытие HTTP-клиента"""
+        self.fetcher.close()
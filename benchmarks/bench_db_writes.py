@@ -0,0 +1,118 @@
+"""
+Бенчмарк записи в БД: стоимость сохранения одного объявления
+
+Повторяет запись этапа 2 (upsert_apartment + mark_link_as_parsed) для
+каждой ссылки во временной БД. Сравниваются режимы DatabaseManager:
+соединение на каждый вызов (legacy), долгоживущее соединение с
+настройками из config (persistent: WAL, synchronous, кэш, mmap) и
+BufferedWriter поверх него (buffered: AVITO_DB_WRITE_BATCH объявлений
+в транзакции).
+
+Использование:
+    python benchmarks/bench_db_writes.py [--rows N] [--synchronous NORMAL]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from db import DatabaseManager
+
+
+# Режимы: имя -> (persistent, buffered)
+MODES = {
+    'legacy': (False, False),
+    'persistent': (True, False),
+    'buffered': (True, True),
+}
+
+
+def make_apartment(index: int) -> Dict[str, str]:
+    """Данные объявления, похожие на результат parse_apartment_detail"""
+    return {
+        'title': f"2-к. квартира, 54 м², {index % 9 + 1}/9 эт.",
+        'url': f"https://www.avito.ru/volgograd/kvartiry/bench_{index}",
+        'price': f"{2000 + index % 50 * 100} ₽ за сутки",
+        'media_url_1': f"https://img.avito.st/{index}_1.jpg",
+        'media_url_2': f"https://img.avito.st/{index}_2.jpg",
+        'media_url_3': f"https://img.avito.st/{index}_3.jpg",
+        'about_apartment': "Количество комнат:2 | Общая площадь:54 м² | Этаж:5",
+        'rules': "Можно с детьми | Нельзя курить",
+        'address': "Волгоград, ул. Мира, 15р-н Центральный",
+        'description': "Уютная квартира в центре города. " * 10,
+        'owner_name': "Владелец",
+        'owner_url': "https://www.avito.ru/user/bench/profile",
+    }
+
+
+def measure(mode: str, rows: int, directory: str) -> float:
+    """
+    Время записи одного объявления
+    
+    Args:
+        mode: Режим из MODES
+        rows: Количество объявлений
+        directory: Каталог для временной БД
+        
+    Returns:
+        Среднее время на объявление (мкс)
+    """
+    persistent, buffered = MODES[mode]
+    db = DatabaseManager(os.path.join(directory, f"bench_{mode}.db"), persistent=persistent)
+    apartments = [make_apartment(index) for index in range(rows)]
+    db.insert_apartment_links_batch([apartment['url'] for apartment in apartments])
+    links: List = list(db.iter_claimed_links("bench", batch_size=rows))
+    
+    start = time.perf_counter()
+    if buffered:
+        with db.buffered_writer() as writer:
+            for (link_id, _), apartment in zip(links, apartments):
+                writer.add_apartment(apartment, link_id)
+    else:
+        for (link_id, _), apartment in zip(links, apartments):
+            db.upsert_apartment(apartment)
+            db.mark_link_as_parsed(link_id)
+    elapsed = time.perf_counter() - start
+    
+    db.close()
+    return elapsed / rows * 1_000_000
+
+
+def run_benchmark(rows: int = 2000) -> None:
+    """Запуск бенчмарка и вывод таблицы результатов"""
+    print("=" * 60)
+    print(f"Запись {rows} объявлений (synchronous={config.DB_SYNCHRONOUS}, "
+          f"кэш {config.DB_CACHE_SIZE_MB} МБ, mmap {config.DB_MMAP_SIZE_MB} МБ)")
+    print("=" * 60)
+    print(f"{'Режим':14} {'мкс/объявление':>16} {'объявлений/с':>14}")
+    print("-" * 60)
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in MODES:
+            results[name] = measure(name, rows, directory)
+            print(f"{name:14} {results[name]:16.1f} {1_000_000 / results[name]:14.0f}")
+    
+    print("-" * 60)
+    for name in ('persistent', 'buffered'):
+        print(f"Ускорение {name}: x{results['legacy'] / results[name]:.1f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк записи в БД")
+    arg_parser.add_argument("--rows", type=int, default=2000,
+                            help="Количество объявлений")
+    arg_parser.add_argument("--synchronous", default=None,
+                            help="Режим synchronous SQLite (по умолчанию AVITO_DB_SYNCHRONOUS)")
+    args = arg_parser.parse_args()
+    
+    if args.synchronous:
+        config.DB_SYNCHRONOUS = args.synchronous.upper()
+    run_benchmark(max(args.rows, 1))
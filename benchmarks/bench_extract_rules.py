@@ -0,0 +1,150 @@
+"""
+Бенчмарк извлечения правил проживания: прежний вариант _extract_rules
+(get_text для каждого p/div/span) против однопроходного
+
+Использование:
+    python benchmarks/bench_extract_rules.py [--pages fixtures] [--archive DIR]
+                                             [--nest N] [--repeat N]
+
+--archive берет детальные страницы из архива (AVITO_ARCHIVE_DIR),
+--nest оборачивает содержимое страницы в N вложенных div, как на
+настоящих страницах Avito с глубоким DOM.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+from typing import List, Tuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parser import AvitoHTMLParser, PARSER_BACKENDS, lxml_html
+
+
+def legacy_extract_rules(parser: AvitoHTMLParser) -> Optional[str]:
+    """Прежняя реализация AvitoHTMLParser._extract_rules"""
+    # Поиск блока с правилами
+    rules_keywords = ['правил', 'условия', 'можно', 'нельзя']
+    
+    # Ищем в описании или отдельных блоках
+    all_text_blocks = parser._select('p, div, span')
+    
+    rules_texts = []
+    for block in all_text_blocks:
+        text = parser._get_text(block)
+        if text and any(keyword in text.lower() for keyword in rules_keywords):
+            if len(text) > 10 and len(text) < 500:  # Фильтр по длине
+                rules_texts.append(text)
+    
+    if rules_texts:
+        return ' | '.join(rules_texts[:3])  # Берем первые 3
+    
+    return None
+
+
+def nest_body(html_content: str, depth: int) -> str:
+    """Оборачивание содержимого <body> в depth вложенных div"""
+    if depth <= 0 or '<body' not in html_content:
+        return html_content
+    start = html_content.index('>', html_content.index('<body')) + 1
+    end = html_content.rfind('</body>')
+    if end < start:
+        end = len(html_content)
+    return (html_content[:start] + '<div class="wrapper">' * depth
+            + html_content[start:end] + '</div>' * depth + html_content[end:])
+
+
+def load_pages(pages_dir: str, archive_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Загрузка детальных страниц
+    
+    Args:
+        pages_dir: Каталог с сохраненными страницами (detail_*.html)
+        archive_dir: Каталог архива страниц или None
+        
+    Returns:
+        Список кортежей (имя, HTML код)
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "detail_*.html"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    
+    if archive_dir:
+        from html_archive import HTMLArchive
+        archive = HTMLArchive(archive_dir)
+        for url, html_content in archive.iter_latest(page_type='detail'):
+            pages.append((url, html_content))
+    
+    return pages
+
+
+def measure(func, parsers: List[AvitoHTMLParser], repeat: int) -> Tuple[float, list]:
+    """Среднее время вызова func на страницу (мс) и результаты"""
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [func(parser) for parser in parsers]
+    elapsed = time.perf_counter() - start
+    return elapsed / (len(parsers) * repeat) * 1000, results
+
+
+def run_benchmark(pages_dir: str = "fixtures", archive_dir: Optional[str] = None,
+                  nest: int = 0, repeat: int = 20) -> bool:
+    """
+    Запуск бенчмарка на всех бэкендах парсера
+    
+    Returns:
+        True если результаты обеих реализаций совпадают
+    """
+    pages = load_pages(pages_dir, archive_dir)
+    if not pages:
+        print(f"✗ Детальные страницы не найдены в {pages_dir}")
+        return False
+    
+    print("=" * 60)
+    print(f"Извлечение правил: {len(pages)} стр., вложенность +{nest}, повторов {repeat}")
+    print("=" * 60)
+    
+    identical = True
+    for backend in PARSER_BACKENDS:
+        if backend == 'lxml' and lxml_html is None:
+            print(f"⚠ {backend:5} - lxml не установлен, пропуск")
+            continue
+        
+        parsers = [AvitoHTMLParser(nest_body(html_content, nest), backend=backend)
+                   for _, html_content in pages]
+        legacy_ms, legacy_results = measure(legacy_extract_rules, parsers, repeat)
+        single_ms, single_results = measure(lambda p: p._extract_rules(), parsers, repeat)
+        
+        if legacy_results != single_results:
+            identical = False
+            for (name, _), old, new in zip(pages, legacy_results, single_results):
+                if old != new:
+                    print(f"✗ {backend}: расхождение на {name}")
+        
+        speedup = legacy_ms / single_ms if single_ms else 0.0
+        print(f"{'✓' if legacy_results == single_results else '✗'} {backend:5} - "
+              f"прежний: {legacy_ms:.3f} мс, однопроходный: {single_ms:.3f} мс, "
+              f"ускорение x{speedup:.1f}")
+    
+    print("=" * 60)
+    return identical
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк извлечения правил проживания")
+    arg_parser.add_argument("--pages", default="fixtures",
+                            help="Каталог с сохраненными страницами (по умолчанию fixtures)")
+    arg_parser.add_argument("--archive", default=None,
+                            help="Каталог архива страниц (детальные страницы из архива)")
+    arg_parser.add_argument("--nest", type=int, default=0,
+                            help="Дополнительная вложенность div в каждой странице")
+    arg_parser.add_argument("--repeat", type=int, default=20,
+                            help="Количество повторов")
+    args = arg_parser.parse_args()
+    
+    success = run_benchmark(args.pages, args.archive, args.nest, max(args.repeat, 1))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,372 @@
+"""
+Бенчмарк парсера на корпусе сохраненных страниц каталога и объявлений
+
+Отдельно замеряются построение дерева, parse_apartment_links,
+parse_apartment_detail и каждый метод _extract_* (методы карточки
+каталога - на каждом контейнере объявления, методы детальной страницы -
+на уже построенном дереве). Для каждой операции выводятся пропускная
+способность, задержки p50/p95 и пиковая память (tracemalloc).
+
+Использование:
+    python benchmarks/bench_parser.py [--pages fixtures] [--archive DIR]
+                                      [--backend bs4|lxml] [--repeat N]
+                                      [--save FILE] [--compare BASELINE]
+                                      [--candidate FILE] [--threshold PCT]
+
+--save сохраняет результаты прогона в JSON, --compare сравнивает прогон
+(или сохраненный прогон --candidate) с базовым и завершается с кодом 1,
+если p50 или пиковая память какой-либо операции выросли больше чем на
+--threshold процентов.
+"""
+
+import os
+import sys
+import io
+import glob
+import json
+import math
+import time
+import inspect
+import argparse
+import platform
+import contextlib
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from html_parser import AvitoHTMLParser, PARSER_BACKENDS, SELECTORS, lxml_html
+from selector_stats import SelectorRegistry
+
+
+# Рост p50 или пиковой памяти (в процентах), считающийся регрессией;
+# разброс между прогонами для операций в доли миллисекунды - 10-20%
+DEFAULT_THRESHOLD = 25.0
+
+
+def load_pages(pages_dir: str, archive_dir: Optional[str]) -> List[Tuple[str, str, str]]:
+    """
+    Загрузка корпуса страниц
+    
+    Args:
+        pages_dir: Каталог с сохраненными страницами (catalog*.html, detail*.html)
+        archive_dir: Каталог архива страниц или None
+        
+    Returns:
+        Список кортежей (имя, тип страницы, HTML код)
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        page_type = 'catalog' if os.path.basename(path).startswith('catalog') else 'detail'
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), page_type, f.read()))
+    
+    if archive_dir:
+        from html_archive import HTMLArchive
+        archive = HTMLArchive(archive_dir)
+        for page_type in ('catalog', 'detail'):
+            for url, html_content in archive.iter_latest(page_type=page_type):
+                pages.append((url, page_type, html_content))
+    
+    return pages
+
+
+def extractor_names() -> Tuple[List[str], List[str]]:
+    """
+    Методы _extract_* парсера
+    
+    Returns:
+        Кортеж (методы карточки каталога с аргументом container,
+        методы детальной страницы без аргументов)
+    """
+    card, detail = [], []
+    for name, method in inspect.getmembers(AvitoHTMLParser, inspect.isfunction):
+        if not name.startswith('_extract_'):
+            continue
+        if 'container' in inspect.signature(method).parameters:
+            card.append(name)
+        else:
+            detail.append(name)
+    return card, detail
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Перцентиль по рангу (samples отсортированы)"""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+class ParserBenchmark:
+    """Замер операций парсера на корпусе страниц"""
+    
+    def __init__(self, pages: List[Tuple[str, str, str]], backend: str, repeat: int):
+        """
+        Инициализация
+        
+        Args:
+            pages: Корпус страниц (load_pages)
+            backend: Бэкенд парсера
+            repeat: Количество повторов каждого вызова для замера времени
+        """
+        self.pages = pages
+        self.backend = backend
+        self.repeat = repeat
+        # Порядок селекторов фиксирован, чтобы прогоны были сопоставимы
+        self.registry = SelectorRegistry(SELECTORS)
+        self.results: Dict[str, Dict[str, float]] = {}
+    
+    def new_parser(self, html_content: str) -> AvitoHTMLParser:
+        """Парсер страницы с фиксированным реестром селекторов"""
+        return AvitoHTMLParser(html_content, backend=self.backend, registry=self.registry)
+    
+    def build_tree(self, parser: AvitoHTMLParser):
+        """Построение дерева страницы выбранным бэкендом"""
+        return parser.tree if self.backend == 'lxml' else parser.soup
+    
+    def containers(self, parser: AvitoHTMLParser) -> list:
+        """Контейнеры объявлений страницы каталога"""
+        for selector in self.registry.chain('catalog_item'):
+            found = parser._select(selector)
+            if found:
+                return found
+        return []
+    
+    def measure(self, name: str, calls: List[Callable[[], object]]) -> None:
+        """
+        Замер одной операции
+        
+        Каждый вызов выполняется один раз для прогрева, один раз под
+        tracemalloc (пиковая память) и repeat раз для замера времени.
+        
+        Args:
+            name: Имя операции
+            calls: Вызовы операции (по одному на страницу или контейнер)
+        """
+        if not calls:
+            return
+        
+        for call in calls:
+            call()
+        
+        peak = 0
+        tracemalloc.start()
+        for call in calls:
+            tracemalloc.reset_peak()
+            start_size, _ = tracemalloc.get_traced_memory()
+            call()
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - start_size)
+        tracemalloc.stop()
+        
+        samples = []
+        for _ in range(self.repeat):
+            for call in calls:
+                start = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - start)
+        samples.sort()
+        total = sum(samples)
+        
+        self.results[name] = {
+            'calls': len(samples),
+            'total_ms': total * 1000,
+            'throughput': len(samples) / total if total else 0.0,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'peak_kb': peak / 1024,
+        }
+    
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """
+        Замер всех операций
+        
+        Returns:
+            Словарь операция -> calls, total_ms, throughput, p50_ms, p95_ms, peak_kb
+        """
+        catalog = [html for _, page_type, html in self.pages if page_type == 'catalog']
+        detail = [html for _, page_type, html in self.pages if page_type == 'detail']
+        card_extractors, detail_extractors = extractor_names()
+        
+        # Сообщения парсера при замерах не выводятся
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.measure('build_tree', [
+                lambda html=html: self.build_tree(self.new_parser(html))
+                for html in catalog + detail
+            ])
+            self.measure('parse_apartment_links', [
+                lambda html=html: self.new_parser(html).parse_apartment_links()
+                for html in catalog
+            ])
+            self.measure('parse_apartment_detail', [
+                lambda html=html: self.new_parser(html).parse_apartment_detail("benchmark")
+                for html in detail
+            ])
+            
+            # Методы извлечения - на готовых деревьях
+            catalog_parsers = [self.new_parser(html) for html in catalog]
+            cards = [(parser, container) for parser in catalog_parsers
+                     for container in self.containers(parser)]
+            for name in card_extractors:
+                self.measure(name, [
+                    lambda parser=parser, container=container, name=name:
+                        getattr(parser, name)(container)
+                    for parser, container in cards
+                ])
+            
+            detail_parsers = [self.new_parser(html) for html in detail]
+            for parser in detail_parsers:
+                self.build_tree(parser)
+            for name in detail_extractors:
+                self.measure(name, [
+                    lambda parser=parser, name=name: getattr(parser, name)()
+                    for parser in detail_parsers
+                ])
+        
+        return self.results
+    
+    def to_dict(self) -> Dict:
+        """Результаты прогона с параметрами для сохранения в JSON"""
+        return {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'backend': self.backend,
+                'repeat': self.repeat,
+                'json_state': config.JSON_STATE,
+                'pages': {
+                    page_type: sum(1 for _, kind, _ in self.pages if kind == page_type)
+                    for page_type in ('catalog', 'detail')
+                },
+                'python': platform.python_version(),
+            },
+            'results': self.results,
+        }
+
+
+def print_results(run: Dict) -> None:
+    """Вывод таблицы результатов прогона"""
+    meta = run['meta']
+    print("=" * 86)
+    print(f"Парсер: {meta['backend']}, страниц каталога {meta['pages']['catalog']}, "
+          f"объявлений {meta['pages']['detail']}, повторов {meta['repeat']}")
+    print("=" * 86)
+    print(f"{'Операция':32} {'вызовов':>8} {'оп/с':>10} {'p50, мс':>10} {'p95, мс':>10} {'пик, КБ':>10}")
+    print("-" * 86)
+    for name, stats in run['results'].items():
+        print(f"{name:32} {stats['calls']:8} {stats['throughput']:10.0f} "
+              f"{stats['p50_ms']:10.3f} {stats['p95_ms']:10.3f} {stats['peak_kb']:10.1f}")
+    print("=" * 86)
+
+
+def compare_runs(baseline: Dict, candidate: Dict, threshold: float) -> bool:
+    """
+    Сравнение прогона-кандидата с базовым
+    
+    Args:
+        baseline: Базовый прогон (to_dict или сохраненный JSON)
+        candidate: Прогон-кандидат
+        threshold: Допустимый рост p50 и пиковой памяти в процентах
+        
+    Returns:
+        True если регрессий нет
+    """
+    def change(old: float, new: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+    
+    for key in ('backend', 'json_state'):
+        if baseline['meta'].get(key) != candidate['meta'].get(key):
+            print(f"⚠ Прогоны отличаются параметром {key}: "
+                  f"{baseline['meta'].get(key)} и {candidate['meta'].get(key)}")
+    
+    print("=" * 86)
+    print(f"Сравнение с базовым прогоном от {baseline['meta'].get('created_at')} "
+          f"(порог {threshold:.0f}%)")
+    print("=" * 86)
+    print(f"{'Операция':32} {'p50, мс':>19} {'изм.':>8} {'пик, КБ':>17} {'изм.':>8}")
+    print("-" * 86)
+    
+    regressions = 0
+    for name, new in candidate['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:32} {'нет в базовом прогоне':>19}")
+            continue
+        
+        time_change = change(old['p50_ms'], new['p50_ms'])
+        memory_change = change(old['peak_kb'], new['peak_kb'])
+        regressed = time_change > threshold or memory_change > threshold
+        regressions += regressed
+        print(f"{name:32} {old['p50_ms']:8.3f} -> {new['p50_ms']:7.3f} {time_change:+7.1f}% "
+              f"{old['peak_kb']:7.1f} -> {new['peak_kb']:6.1f} {memory_change:+7.1f}%"
+              f"{' ✗' if regressed else ''}")
+    
+    for name in baseline['results']:
+        if name not in candidate['results']:
+            print(f"{name:32} {'нет в прогоне-кандидате':>19}")
+    
+    print("=" * 86)
+    if regressions:
+        print(f"✗ Регрессий: {regressions}")
+    else:
+        print("✓ Регрессий нет")
+    return regressions == 0
+
+
+def load_run(path: str) -> Dict:
+    """Загрузка сохраненного прогона"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_run(run: Dict, path: str) -> None:
+    """Сохранение прогона в JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+    print(f"✓ Результаты сохранены в {path}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк парсера на корпусе страниц")
+    arg_parser.add_argument("--pages", default="fixtures",
+                            help="Каталог с сохраненными страницами (по умолчанию fixtures)")
+    arg_parser.add_argument("--archive", default=None,
+                            help="Каталог архива страниц")
+    arg_parser.add_argument("--backend", choices=PARSER_BACKENDS, default=config.PARSER_BACKEND,
+                            help="Бэкенд парсера (по умолчанию AVITO_PARSER_BACKEND)")
+    arg_parser.add_argument("--repeat", type=int, default=20,
+                            help="Количество повторов каждого вызова")
+    arg_parser.add_argument("--save", default=None,
+                            help="Сохранить результаты в JSON-файл")
+    arg_parser.add_argument("--compare", default=None,
+                            help="Сравнить с базовым прогоном из JSON-файла")
+    arg_parser.add_argument("--candidate", default=None,
+                            help="Сравнивать сохраненный прогон вместо нового замера")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"Допустимый рост p50 и памяти, % (по умолчанию {DEFAULT_THRESHOLD:.0f})")
+    args = arg_parser.parse_args()
+    
+    if args.candidate:
+        run = load_run(args.candidate)
+    else:
+        if args.backend == 'lxml' and lxml_html is None:
+            print("✗ Для бэкенда lxml установите пакет lxml")
+            sys.exit(1)
+        
+        pages = load_pages(args.pages, args.archive)
+        if not pages:
+            print(f"✗ Страницы не найдены в {args.pages}")
+            sys.exit(1)
+        
+        benchmark = ParserBenchmark(pages, args.backend, max(args.repeat, 1))
+        benchmark.run()
+        run = benchmark.to_dict()
+    
+    print_results(run)
+    if args.save:
+        save_run(run, args.save)
+    
+    if args.compare:
+        sys.exit(0 if compare_runs(load_run(args.compare), run, args.threshold) else 1)
@@ -0,0 +1,164 @@
+"""
+Бенчмарк ограниченного разбора: дерево всей страницы против дерева
+только нужных областей (PARSE_REGIONS, бэкенд bs4)
+
+Для каждой страницы измеряются время разбора и пиковая память
+(tracemalloc) при полном и ограниченном разборе. Данные из
+JSON-состояния отключены, чтобы сравнивать построение дерева.
+Результаты обоих разборов должны совпадать: при расхождении скрипт
+завершается с кодом 1.
+
+Использование:
+    python benchmarks/bench_restricted_parse.py [--pages fixtures] [--archive DIR] [--repeat N]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+import contextlib
+import io
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from html_parser import AvitoHTMLParser
+
+
+def parse_page(html_content: str, page_type: str, restricted: bool) -> Dict:
+    """
+    Разбор страницы теми же методами, что и при сборе данных
+    
+    Args:
+        html_content: HTML код страницы
+        page_type: 'catalog' или 'detail'
+        restricted: Ограниченный разбор
+        
+    Returns:
+        Результаты разбора
+    """
+    parser = AvitoHTMLParser(html_content, backend='bs4', restricted=restricted)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if page_type == 'catalog':
+            return {
+                'links': parser.parse_apartment_links(),
+                'total_count': parser.get_total_count(),
+                'has_next_page': parser.has_next_page(),
+                'next_page_url': parser.get_next_page_url(),
+            }
+        return {
+            'removed': parser.is_listing_removed(),
+            'detail': parser.parse_apartment_detail("benchmark"),
+        }
+
+
+def measure(html_content: str, page_type: str, restricted: bool,
+            repeat: int) -> Tuple[float, int, Dict]:
+    """
+    Время разбора (мс) и пиковая память (байт) для одной страницы
+    
+    Returns:
+        Кортеж (среднее время, пиковая память, результаты разбора)
+    """
+    tracemalloc.start()
+    result = parse_page(html_content, page_type, restricted)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_page(html_content, page_type, restricted)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, peak, result
+
+
+def load_pages(pages_dir: str, archive_dir: Optional[str]) -> List[Tuple[str, str, str]]:
+    """
+    Загрузка страниц каталога и объявлений
+    
+    Returns:
+        Список кортежей (имя, тип страницы, HTML код)
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        page_type = 'catalog' if os.path.basename(path).startswith('catalog') else 'detail'
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), page_type, f.read()))
+    
+    if archive_dir:
+        from html_archive import HTMLArchive
+        archive = HTMLArchive(archive_dir)
+        for page_type in ('catalog', 'detail'):
+            for url, html_content in archive.iter_latest(page_type=page_type):
+                pages.append((url, page_type, html_content))
+    
+    return pages
+
+
+def run_benchmark(pages_dir: str = "fixtures", archive_dir: Optional[str] = None,
+                  repeat: int = 20) -> bool:
+    """
+    Запуск бенчмарка и вывод таблицы результатов
+    
+    Returns:
+        True если результаты полного и ограниченного разбора совпали
+        на всех страницах
+    """
+    config.JSON_STATE = False
+    pages = load_pages(pages_dir, archive_dir)
+    if not pages:
+        print(f"✗ Страницы не найдены в {pages_dir}")
+        return False
+    
+    print("=" * 78)
+    print(f"{'Страница':32} {'Полный':>18} {'Ограниченный':>18} {'Время':>8}")
+    print(f"{'':32} {'мс':>8} {'КБ':>9} {'мс':>8} {'КБ':>9} {'':>8}")
+    print("=" * 78)
+    
+    totals = {'full_time': 0.0, 'full_peak': 0, 'restricted_time': 0.0, 'restricted_peak': 0}
+    mismatched = []
+    for name, page_type, html_content in pages:
+        full_time, full_peak, full_result = measure(html_content, page_type, False, repeat)
+        restricted_time, restricted_peak, restricted_result = measure(
+            html_content, page_type, True, repeat
+        )
+        totals['full_time'] += full_time
+        totals['full_peak'] += full_peak
+        totals['restricted_time'] += restricted_time
+        totals['restricted_peak'] += restricted_peak
+        
+        mark = ""
+        if full_result != restricted_result:
+            mismatched.append(name)
+            mark = " *"
+        print(f"{name[-32:]:32} {full_time:8.2f} {full_peak / 1024:9.0f} "
+              f"{restricted_time:8.2f} {restricted_peak / 1024:9.0f} "
+              f"x{full_time / restricted_time if restricted_time else 0:6.1f}{mark}")
+    
+    print("-" * 78)
+    print(f"{'Всего':32} {totals['full_time']:8.2f} {totals['full_peak'] / 1024:9.0f} "
+          f"{totals['restricted_time']:8.2f} {totals['restricted_peak'] / 1024:9.0f}")
+    print("=" * 78)
+    if mismatched:
+        print(f"✗ Результаты отличаются от полного разбора (*): {len(mismatched)} стр.")
+        return False
+    
+    print("✓ Результаты совпадают с полным разбором")
+    return True
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк ограниченного разбора")
+    arg_parser.add_argument("--pages", default="fixtures",
+                            help="Каталог с сохраненными страницами (по умолчанию fixtures)")
+    arg_parser.add_argument("--archive", default=None,
+                            help="Каталог архива страниц")
+    arg_parser.add_argument("--repeat", type=int, default=20,
+                            help="Количество повторов для замера времени")
+    args = arg_parser.parse_args()
+    
+    if not run_benchmark(args.pages, args.archive, max(args.repeat, 1)):
+        sys.exit(1)
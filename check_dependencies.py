@@ -16,7 +16,8 @@ def check_dependencies():
         'selenium': 'Selenium WebDriver',
         'bs4': 'BeautifulSoup4',
         'webdriver_manager': 'WebDriver Manager',
-        'lxml': 'lxml (опционально)'
+        'lxml': 'lxml (опционально)',
+        'numpy': 'NumPy (опционально)'
     }
     
     missing = []
@@ -30,6 +31,8 @@ def check_dependencies():
         except ImportError:
             if module == 'lxml':
                 print(f"⚠ {name:30} - Не установлен (будет использован html.parser)")
+            elif module == 'numpy':
+                print(f"⚠ {name:30} - Не установлен (отчет считается без NumPy)")
             else:
                 print(f"✗ {name:30} - НЕ УСТАНОВЛЕН")
                 missing.append(name)
@@ -0,0 +1,166 @@
+"""
+Скрипт для сравнения бэкендов парсера (bs4 и lxml) на сохраненных страницах
+
+Использование:
+    python check_parser_backends.py [каталог со страницами] [--repeat N]
+"""
+
+import os
+import sys
+import glob
+import time
+import io
+import contextlib
+import argparse
+from typing import Dict, List
+import config
+from html_parser import AvitoHTMLParser, PARSER_BACKENDS, SELECTORS
+from selector_stats import SelectorRegistry
+from normalize import parse_district
+
+
+# Поля, которые из JSON-состояния должны совпадать с извлеченными из DOM
+JSON_STATE_CHECK_FIELDS = ('title', 'price')
+
+
+def page_url(path: str) -> str:
+    """
+    URL объявления для сохраненной страницы
+    
+    Для detail_<ID>.html - URL с ID объявления (как у настоящих ссылок),
+    чтобы данные из JSON-состояния брались по ID
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return f"https://www.avito.ru/volgograd/kvartiry/fixture_{name.rsplit('_', 1)[-1]}"
+
+
+def parse_page(html_content: str, backend: str, url: str = "fixture") -> Dict:
+    """
+    Разбор страницы всеми публичными методами парсера
+    
+    Args:
+        html_content: HTML код страницы
+        backend: Бэкенд парсера
+        url: URL объявления для parse_apartment_detail
+        
+    Returns:
+        Словарь с результатами всех методов
+    """
+    # Порядок селекторов фиксирован, чтобы бэкенды сравнивались в равных условиях
+    registry = SelectorRegistry(SELECTORS)
+    parser = AvitoHTMLParser(html_content, backend=backend, registry=registry)
+    # Сообщения парсера при сравнении не выводятся
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            'links': parser.parse_apartment_links(),
+            'total_count': parser.get_total_count(),
+            'has_next_page': parser.has_next_page(),
+            'next_page_url': parser.get_next_page_url(),
+            'removed': parser.is_listing_removed(),
+            'detail': parser.parse_apartment_detail(url),
+        }
+
+
+def check_json_state(html_content: str, url: str) -> List[str]:
+    """
+    Сравнение данных из JSON-состояния с данными из DOM
+    
+    Args:
+        html_content: HTML код страницы
+        url: URL объявления
+        
+    Returns:
+        Поля, значения которых отличаются (district - район из адреса,
+        как в столбце apartments.district)
+    """
+    results = {}
+    json_state = config.JSON_STATE
+    try:
+        for enabled in (True, False):
+            config.JSON_STATE = enabled
+            parser = AvitoHTMLParser(html_content, backend='bs4',
+                                     registry=SelectorRegistry(SELECTORS))
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[enabled] = parser.parse_apartment_detail(url)
+    finally:
+        config.JSON_STATE = json_state
+    
+    differences = [field for field in JSON_STATE_CHECK_FIELDS
+                   if results[True][field] != results[False][field]]
+    if parse_district(results[True]['address']) != parse_district(results[False]['address']):
+        differences.append('district')
+    return differences
+
+
+def check_backends(pages_dir: str = "fixtures", repeat: int = 1) -> bool:
+    """
+    Сравнение результатов бэкендов на всех страницах каталога
+    
+    Args:
+        pages_dir: Каталог с HTML страницами
+        repeat: Количество повторов разбора для замера времени
+        
+    Returns:
+        True если результаты бэкендов совпадают на всех страницах
+    """
+    paths = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    if not paths:
+        print(f"✗ В каталоге {pages_dir} нет HTML страниц")
+        return False
+    
+    print("=" * 50)
+    print(f"Сравнение бэкендов парсера: {', '.join(PARSER_BACKENDS)}")
+    print("=" * 50)
+    
+    timings = {backend: 0.0 for backend in PARSER_BACKENDS}
+    mismatches = 0
+    
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        url = page_url(path)
+        
+        results = {}
+        for backend in PARSER_BACKENDS:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results[backend] = parse_page(html_content, backend, url)
+            timings[backend] += time.perf_counter() - start
+        
+        reference = results[PARSER_BACKENDS[0]]
+        differences = [
+            key for backend in PARSER_BACKENDS[1:]
+            for key in reference if results[backend][key] != reference[key]
+        ]
+        # Данные из JSON-состояния - и по ID из URL, и без него (URL без ID)
+        for check_url in (url, "fixture"):
+            differences += [f"json:{field}" for field in check_json_state(html_content, check_url)]
+        if differences:
+            mismatches += 1
+            print(f"✗ {os.path.basename(path):30} - расхождения: {', '.join(sorted(set(differences)))}")
+        else:
+            print(f"✓ {os.path.basename(path):30} - совпадает")
+    
+    print()
+    for backend in PARSER_BACKENDS:
+        per_page = timings[backend] / (len(paths) * repeat) * 1000
+        print(f"  {backend:5} - {per_page:.2f} мс на страницу")
+    print("=" * 50)
+    
+    if mismatches:
+        print(f"\n❌ Расхождения на {mismatches} из {len(paths)} страниц")
+        return False
+    print(f"\n✅ Результаты совпадают на всех {len(paths)} страницах")
+    return True
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Сравнение бэкендов парсера")
+    arg_parser.add_argument("pages_dir", nargs="?", default="fixtures",
+                            help="Каталог с HTML страницами (по умолчанию fixtures)")
+    arg_parser.add_argument("--repeat", type=int, default=1,
+                            help="Количество повторов разбора для замера времени")
+    args = arg_parser.parse_args()
+    
+    success = check_backends(args.pages_dir, max(args.repeat, 1))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,190 @@
+"""
+Настройки парсера
+
+Все значения можно переопределить через переменные окружения,
+не изменяя код (например: set AVITO_DETAIL_WORKERS=4).
+"""
+
+import os
+import socket
+
+
+def _env_int(name: str, default: int) -> int:
+    """Чтение целого числа из переменной окружения"""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠ Некорректное значение {name}={value!r}, используется {default}")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Чтение дробного числа из переменной окружения"""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠ Некорректное значение {name}={value!r}, используется {default}")
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Чтение флага (1/0, true/false, yes/no) из переменной окружения"""
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name: str, default: list) -> list:
+    """Чтение списка, разделенного запятыми, из переменной окружения"""
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Количество параллельных браузеров на этапе 2 (детальный парсинг)
+DETAIL_WORKERS = _env_int("AVITO_DETAIL_WORKERS", 1)
+
+# Максимальное время ожидания готовности страницы (секунды)
+PAGE_READY_TIMEOUT = _env_float("AVITO_PAGE_READY_TIMEOUT", 10.0)
+
+# Пауза между запросами одного воркера (секунды)
+REQUEST_DELAY = _env_float("AVITO_REQUEST_DELAY", 1.0)
+
+# Способ загрузки детальных страниц: 'browser' (Selenium) или 'http'
+FETCH_MODE = os.environ.get("AVITO_FETCH_MODE", "browser").strip().lower()
+
+# Таймаут HTTP-запроса в режиме 'http' (секунды)
+HTTP_TIMEOUT = _env_float("AVITO_HTTP_TIMEOUT", 15.0)
+
+# Асинхронный режим: запросов в секунду к одному хосту
+ASYNC_RATE = _env_float("AVITO_ASYNC_RATE", 2.0)
+
+# Асинхронный режим: запросов подряд без ожидания (размер "пачки")
+ASYNC_BURST = _env_int("AVITO_ASYNC_BURST", 5)
+
+# Асинхронный режим: предел одновременных запросов
+ASYNC_MAX_IN_FLIGHT = _env_int("AVITO_ASYNC_MAX_IN_FLIGHT", 16)
+
+# Максимальное количество страниц каталога (Avito показывает не больше 100)
+MAX_CATALOG_PAGES = _env_int("AVITO_MAX_CATALOG_PAGES", 100)
+
+# Файл с кэшированным путем к ChromeDriver
+DRIVER_PATH_CACHE_FILE = os.environ.get("AVITO_DRIVER_PATH_CACHE", ".chromedriver_path")
+
+# Теплый старт: постоянный профиль Chrome и общий браузер для этапов 1 и 2
+WARM_START = _env_bool("AVITO_WARM_START", False)
+
+# Каталог постоянного профиля Chrome для теплого старта
+CHROME_PROFILE_DIR = os.environ.get("AVITO_CHROME_PROFILE_DIR", "chrome_profile")
+
+# Блокировка второстепенных ресурсов через Chrome DevTools Protocol
+BLOCK_RESOURCES = _env_bool("AVITO_BLOCK_RESOURCES", True)
+
+# Блокируемые типы ресурсов (см. resource_blocker.RESOURCE_TYPE_PATTERNS)
+BLOCKED_RESOURCE_TYPES = _env_list("AVITO_BLOCKED_RESOURCE_TYPES",
+                                   ["Font", "Stylesheet", "Image", "Media"])
+
+# Дополнительные блокируемые шаблоны URL (например: *.example.com*)
+BLOCKED_URL_PATTERNS = _env_list("AVITO_BLOCKED_URL_PATTERNS", [])
+
+# Замер загрузки первой страницы каждого типа без блокировки для сравнения
+# (страница загружается лишний раз, поэтому по умолчанию выключен)
+BLOCKING_CALIBRATE = _env_bool("AVITO_BLOCKING_CALIBRATE", False)
+
+# Прокрутка каталога: максимальное время (секунды)
+SCROLL_TIME_BUDGET = _env_float("AVITO_SCROLL_TIME_BUDGET", 20.0)
+
+# Прокрутка каталога: максимальное количество шагов
+SCROLL_MAX_STEPS = _env_int("AVITO_SCROLL_MAX_STEPS", 30)
+
+# Прокрутка каталога: сколько ждать новых карточек после шага (секунды)
+SCROLL_SETTLE_TIME = _env_float("AVITO_SCROLL_SETTLE_TIME", 1.5)
+
+# Прокрутка каталога: остановка после стольких шагов подряд без новых карточек
+SCROLL_IDLE_STEPS = _env_int("AVITO_SCROLL_IDLE_STEPS", 2)
+
+# Объявлений на одной странице каталога (цель прокрутки)
+CATALOG_PAGE_SIZE = _env_int("AVITO_CATALOG_PAGE_SIZE", 50)
+
+# Каталог архива загруженных страниц (пустая строка - архив отключен)
+ARCHIVE_DIR = os.environ.get("AVITO_ARCHIVE_DIR", "")
+
+# Сжатие страниц в архиве: gzip или zstd (требует пакет zstandard)
+ARCHIVE_COMPRESSION = os.environ.get("AVITO_ARCHIVE_COMPRESSION", "gzip")
+
+# Повторный обход: минимальный интервал между посещениями объявления (часы)
+RECRAWL_MIN_INTERVAL = _env_float("AVITO_RECRAWL_MIN_INTERVAL", 6.0)
+
+# Повторный обход: максимальный интервал между посещениями объявления (часы)
+RECRAWL_MAX_INTERVAL = _env_float("AVITO_RECRAWL_MAX_INTERVAL", 336.0)
+
+# Повторный обход: максимальное количество страниц за один запуск (0 - без ограничения)
+RECRAWL_PAGE_BUDGET = _env_int("AVITO_RECRAWL_PAGE_BUDGET", 100)
+
+# Бэкенд парсера HTML: bs4 (BeautifulSoup) или lxml (XPath, быстрее)
+PARSER_BACKEND = os.environ.get("AVITO_PARSER_BACKEND", "bs4")
+
+# Файл статистики срабатывания селекторов (пустая строка - не сохранять)
+SELECTOR_STATS_PATH = os.environ.get("AVITO_SELECTOR_STATS", "selector_stats.json")
+
+# Извлечение данных объявления из встроенного JSON-состояния страницы
+JSON_STATE = _env_bool("AVITO_JSON_STATE", True)
+
+# Этап 2: количество процессов парсинга (0 - парсинг в потоке загрузки)
+PARSE_PROCESSES = _env_int("AVITO_PARSE_PROCESSES", 0)
+
+# Этап 2: максимум загруженных страниц, ожидающих парсинга и записи
+PARSE_QUEUE_SIZE = _env_int("AVITO_PARSE_QUEUE_SIZE", 8)
+
+# Ограниченный разбор: дерево BeautifulSoup только для нужных областей страницы
+PARSE_RESTRICTED = _env_bool("AVITO_PARSE_RESTRICTED", False)
+
+# Этап 1: возвращать в очередь этапа 2 объявления, карточка которых в каталоге изменилась
+CARD_REQUEUE = _env_bool("AVITO_CARD_REQUEUE", True)
+
+# Аналитический отчет: количество групп (цен, районов, дней), читаемых из БД за один раз
+REPORT_CHUNK_SIZE = _env_int("AVITO_REPORT_CHUNK_SIZE", 50000)
+
+# БД: одно долгоживущее соединение с настройками ниже вместо соединения на каждый вызов
+DB_PERSISTENT = _env_bool("AVITO_DB_PERSISTENT", True)
+
+# БД: режим синхронизации SQLite (OFF, NORMAL, FULL); в режиме WAL NORMAL не теряет целостность
+DB_SYNCHRONOUS = os.environ.get("AVITO_DB_SYNCHRONOUS", "NORMAL").upper()
+
+# БД: размер кэша страниц SQLite (МБ)
+DB_CACHE_SIZE_MB = _env_int("AVITO_DB_CACHE_SIZE_MB", 64)
+
+# БД: размер области файла, отображаемой в память (МБ, 0 - не использовать mmap)
+DB_MMAP_SIZE_MB = _env_int("AVITO_DB_MMAP_SIZE_MB", 256)
+
+# БД: ожидание блокировки другим процессом (секунд)
+DB_BUSY_TIMEOUT = _env_float("AVITO_DB_BUSY_TIMEOUT", 30.0)
+
+# БД: количество подготовленных запросов, хранимых соединением
+DB_CACHED_STATEMENTS = _env_int("AVITO_DB_CACHED_STATEMENTS", 256)
+
+# БД: объявлений в одной транзакции буферизованной записи результатов парсинга
+DB_WRITE_BATCH = _env_int("AVITO_DB_WRITE_BATCH", 50)
+
+# БД: максимальное время ожидания результата в буфере записи (секунд)
+DB_WRITE_INTERVAL = _env_float("AVITO_DB_WRITE_INTERVAL", 5.0)
+
+# Этап 2: порядок обхода непарсенных ссылок: oldest (сначала старые) или newest (сначала новые)
+LINK_ORDER = os.environ.get("AVITO_LINK_ORDER", "oldest")
+
+# Этап 2: идентификатор воркера при аренде ссылок (по умолчанию хост и PID процесса)
+WORKER_ID = os.environ.get("AVITO_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+# Этап 2: срок аренды ссылок воркером (секунд); ссылки упавшего воркера вернутся в очередь
+LEASE_SECONDS = _env_int("AVITO_LEASE_SECONDS", 600)
+
+# Этап 2: ссылок, арендуемых воркером за один раз
+CLAIM_BATCH = _env_int("AVITO_CLAIM_BATCH", 20)
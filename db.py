@@ -1,24 +1,137 @@
 import sqlite3
 import os
-from typing import List, Tuple, Optional
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Optional, Iterator
+from normalize import NORMALIZE_VERSION, TYPED_COLUMNS, normalize_apartment
+import config
+
+
+# Столбцы объявления в get_all_apartments, get_recent_apartments и iter_apartments
+_APARTMENT_COLUMNS = """
+    id, title, url, price, media_url_1, media_url_2, media_url_3,
+    about_apartment, rules, address, description, owner_name, owner_url, created_at
+"""
+
+# Отметка ссылки обработанной (аренда воркера завершается)
+_COMPLETE_LINK_SQL = """
+    UPDATE apartment_links
+    SET is_parsed = 1, claimed_by = NULL, lease_expires_at = NULL
+    WHERE id = ?
+"""
+
+# Первое повторное посещение обработанной ссылки: через min_interval часов
+# после ее добавления (параметры: min_interval, id ссылки)
+_SCHEDULE_LINK_SQL = """
+    INSERT INTO link_schedule (link_id, next_visit)
+    SELECT id, datetime(created_at, '+' || ? || ' hours')
+    FROM apartment_links
+    WHERE id = ?
+    ON CONFLICT(link_id) DO NOTHING
+"""
+
+# Вставка объявления (параметры - DatabaseManager._apartment_values)
+_INSERT_APARTMENT_SQL = """
+    INSERT INTO apartments (
+        title, url, price, media_url_1, media_url_2, media_url_3,
+        about_apartment, rules, address, description, owner_name, owner_url,
+        price_rub, area, rooms, floor, max_guests, district, normalized_version
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Вставка объявления или обновление существующего (по URL)
+_UPSERT_APARTMENT_SQL = _INSERT_APARTMENT_SQL + """
+    ON CONFLICT(url) DO UPDATE SET
+        title = excluded.title,
+        price = excluded.price,
+        media_url_1 = excluded.media_url_1,
+        media_url_2 = excluded.media_url_2,
+        media_url_3 = excluded.media_url_3,
+        about_apartment = excluded.about_apartment,
+        rules = excluded.rules,
+        address = excluded.address,
+        description = excluded.description,
+        owner_name = excluded.owner_name,
+        owner_url = excluded.owner_url,
+        price_rub = excluded.price_rub,
+        area = excluded.area,
+        rooms = excluded.rooms,
+        floor = excluded.floor,
+        max_guests = excluded.max_guests,
+        district = excluded.district,
+        normalized_version = excluded.normalized_version
+"""
 
 
 class DatabaseManager:
     """Класс для управления базой данных SQLite"""
     
-    def __init__(self, db_path: str = "avito_data.db"):
+    def __init__(self, db_path: str = "avito_data.db", persistent: Optional[bool] = None):
         """
         Инициализация менеджера базы данных
         
         Args:
             db_path: Путь к файлу базы данных
+            persistent: Одно долгоживущее соединение с настройками из
+                        config (WAL, synchronous, кэш, mmap) вместо нового
+                        соединения на каждый вызов (по умолчанию
+                        config.DB_PERSISTENT)
         """
         self.db_path = db_path
+        self.persistent = config.DB_PERSISTENT if persistent is None else persistent
+        self._conn: Optional[sqlite3.Connection] = None
+        # Соединение одно на все потоки, вызовы выполняются по очереди
+        self._conn_lock = threading.RLock()
+        self._writers: List['BufferedWriter'] = []
         self.init_database()
     
+    def _open_connection(self) -> sqlite3.Connection:
+        """Открытие долгоживущего соединения и настройка SQLite"""
+        conn = sqlite3.connect(self.db_path, timeout=config.DB_BUSY_TIMEOUT,
+                               check_same_thread=False,
+                               cached_statements=config.DB_CACHED_STATEMENTS)
+        # WAL: запись не блокирует чтение, фиксация - без fsync основного файла
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {config.DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = {-config.DB_CACHE_SIZE_MB * 1024}")
+        conn.execute(f"PRAGMA mmap_size = {config.DB_MMAP_SIZE_MB * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """
+        Соединение для одной операции
+        
+        В режиме persistent используется общее соединение (открывается при
+        первом обращении и после close()); операция фиксируется при выходе
+        или откатывается при исключении. Иначе, как раньше, открывается
+        отдельное соединение.
+        """
+        if not self.persistent:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+            return
+        
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = self._open_connection()
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+    
     def init_database(self) -> None:
         """Создание таблиц если они не существуют"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             # Таблица для хранения ссылок на объявления (промежуточная)
@@ -31,6 +144,15 @@ class DatabaseManager:
                 )
             """)
             
+            # Частичный индекс очереди этапа 2: только необработанные ссылки
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_apartment_links_pending
+                ON apartment_links (id) WHERE is_parsed = 0
+            """)
+            
+            # Аренда ссылок воркерами (claim_links), в старых БД добавляется
+            self._add_lease_columns(cursor)
+            
             # Основная таблица с детальной информацией
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS apartments (
@@ -51,8 +173,97 @@ class DatabaseManager:
                 )
             """)
             
+            # Типизированные столбцы (normalize.py), в старых БД добавляются
+            self._add_typed_columns(cursor)
+            
+            # Последние объявления без сортировки всей таблицы
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_apartments_created_at
+                ON apartments (created_at)
+            """)
+            
+            # Расписание повторных посещений обработанных объявлений
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS link_schedule (
+                    link_id INTEGER PRIMARY KEY REFERENCES apartment_links (id) ON DELETE CASCADE,
+                    fingerprint TEXT,
+                    visits INTEGER DEFAULT 0,
+                    changes INTEGER DEFAULT 0,
+                    first_visit TIMESTAMP,
+                    last_visit TIMESTAMP,
+                    next_visit TIMESTAMP,
+                    removed_at TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_link_schedule_next_visit
+                ON link_schedule (next_visit)
+            """)
+            
+            # Карточки объявлений из каталога (этап 1)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_cards (
+                    link_id INTEGER PRIMARY KEY REFERENCES apartment_links (id) ON DELETE CASCADE,
+                    title TEXT,
+                    price TEXT,
+                    photo_url TEXT,
+                    fingerprint TEXT,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    changed_at TIMESTAMP
+                )
+            """)
+            
             conn.commit()
     
+    @staticmethod
+    def _add_typed_columns(cursor: sqlite3.Cursor) -> None:
+        """Добавление типизированных столбцов apartments и их индексов"""
+        cursor.execute("PRAGMA table_info(apartments)")
+        existing = {row[1] for row in cursor.fetchall()}
+        
+        columns = dict(TYPED_COLUMNS, normalized_version='INTEGER DEFAULT 0')
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE apartments ADD COLUMN {column} {column_type}")
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_apartments_{column}
+                ON apartments ({column})
+            """)
+    
+    @staticmethod
+    def _add_lease_columns(cursor: sqlite3.Cursor) -> None:
+        """Добавление столбцов аренды ссылок apartment_links"""
+        cursor.execute("PRAGMA table_info(apartment_links)")
+        existing = {row[1] for row in cursor.fetchall()}
+        
+        for column, column_type in (('claimed_by', 'TEXT'), ('lease_expires_at', 'TIMESTAMP')):
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE apartment_links ADD COLUMN {column} {column_type}")
+    
+    @staticmethod
+    def _typed_values(apartment_data: dict) -> tuple:
+        """Значения типизированных столбцов и версия нормализации"""
+        typed = normalize_apartment(apartment_data)
+        return tuple(typed[column] for column in TYPED_COLUMNS) + (NORMALIZE_VERSION,)
+    
+    @classmethod
+    def _apartment_values(cls, apartment_data: dict) -> tuple:
+        """Параметры _INSERT_APARTMENT_SQL и _UPSERT_APARTMENT_SQL"""
+        return (
+            apartment_data.get('title'),
+            apartment_data.get('url'),
+            apartment_data.get('price'),
+            apartment_data.get('media_url_1'),
+            apartment_data.get('media_url_2'),
+            apartment_data.get('media_url_3'),
+            apartment_data.get('about_apartment'),
+            apartment_data.get('rules'),
+            apartment_data.get('address'),
+            apartment_data.get('description'),
+            apartment_data.get('owner_name'),
+            apartment_data.get('owner_url')
+        ) + cls._typed_values(apartment_data)
+    
     def insert_apartment_link(self, url: str) -> Optional[int]:
         """
         Вставка ссылки на объявление
@@ -64,7 +275,7 @@ class DatabaseManager:
             ID вставленной записи или None если ссылка уже существует
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT INTO apartment_links (url)
@@ -86,46 +297,230 @@ class DatabaseManager:
         Returns:
             Количество добавленных новых ссылок
         """
-        count = 0
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
+            # Существующие ссылки пропускаются, считаются только вставленные строки
+            changes_before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO apartment_links (url)
+                VALUES (?)
+            """, ((url,) for url in urls))
+            count = conn.total_changes - changes_before
+            conn.commit()
+        return count
+    
+    def upsert_catalog_cards(self, cards: List[Dict], requeue: bool = True) -> Tuple[int, int]:
+        """
+        Сохранение карточек объявлений из каталога
+        
+        Новые URL добавляются в apartment_links. Если отпечаток карточки
+        уже обработанной ссылки изменился, ссылка снова помечается
+        непарсенной, и этап 2 загрузит детальную страницу повторно.
+        Ссылки без сохраненного отпечатка (собранные до появления
+        карточек) и карточки без отпечатка не переставляются в очередь.
+        
+        Args:
+            cards: Список словарей AvitoHTMLParser.parse_catalog_cards
+            requeue: Возвращать в очередь ссылки с измененной карточкой
+            
+        Returns:
+            Кортеж (новых ссылок, возвращенных в очередь ссылок)
+        """
+        new_count = 0
+        requeued_count = 0
+        with self._connection() as conn:
             cursor = conn.cursor()
-            for url in urls:
-                try:
+            for card in cards:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO apartment_links (url)
+                    VALUES (?)
+                """, (card['url'],))
+                is_new = cursor.rowcount == 1
+                
+                cursor.execute("""
+                    SELECT l.id, l.is_parsed, c.fingerprint
+                    FROM apartment_links l
+                    LEFT JOIN catalog_cards c ON c.link_id = l.id
+                    WHERE l.url = ?
+                """, (card['url'],))
+                link_id, is_parsed, old_fingerprint = cursor.fetchone()
+                
+                fingerprint = card.get('fingerprint')
+                changed = (old_fingerprint is not None and fingerprint is not None
+                           and old_fingerprint != fingerprint)
+                if is_new:
+                    new_count += 1
+                elif changed and requeue and is_parsed:
                     cursor.execute("""
-                        INSERT INTO apartment_links (url)
-                        VALUES (?)
-                    """, (url,))
-                    count += 1
-                except sqlite3.IntegrityError:
-                    # Ссылка уже существует
-                    continue
+                        UPDATE apartment_links
+                        SET is_parsed = 0
+                        WHERE id = ?
+                    """, (link_id,))
+                    requeued_count += 1
+                
+                cursor.execute("""
+                    INSERT INTO catalog_cards (link_id, title, price, photo_url, fingerprint)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(link_id) DO UPDATE SET
+                        title = COALESCE(excluded.title, title),
+                        price = COALESCE(excluded.price, price),
+                        photo_url = COALESCE(excluded.photo_url, photo_url),
+                        fingerprint = COALESCE(excluded.fingerprint, fingerprint),
+                        last_seen = CURRENT_TIMESTAMP,
+                        changed_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE changed_at END
+                """, (link_id, card.get('title'), card.get('price'), card.get('photo_url'),
+                      fingerprint, changed))
             conn.commit()
-        return count
+        return new_count, requeued_count
     
-    def get_unparsed_links(self, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+    def count_unparsed_links(self) -> int:
         """
-        Получение непарсенных ссылок
+        Получение количества непарсенных ссылок
+        
+        Returns:
+            Количество ссылок
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM apartment_links WHERE is_parsed = 0")
+            return cursor.fetchone()[0]
+    
+    def claim_links(self, owner: str, limit: int, lease_seconds: Optional[int] = None,
+                    order: Optional[str] = None,
+                    after_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Аренда пачки непарсенных ссылок воркером
+        
+        Выбираются ссылки без аренды или с истекшей арендой, им
+        назначаются владелец и срок аренды. Выборка и назначение
+        выполняются в транзакции BEGIN IMMEDIATE (блокировка записи
+        берется до выборки), поэтому несколько процессов с одной БД не
+        получат одну и ту же ссылку. Аренда завершается отметкой ссылки
+        обработанной (mark_link_as_parsed, BufferedWriter), продлевается
+        renew_leases и снимается release_links; ссылки упавшего воркера
+        вернутся в очередь после истечения срока.
         
         Args:
+            owner: Идентификатор воркера (config.WORKER_ID)
             limit: Максимальное количество ссылок
+            lease_seconds: Срок аренды (по умолчанию config.LEASE_SECONDS)
+            order: 'oldest' или 'newest' (по умолчанию config.LINK_ORDER)
+            after_id: Курсор: только ссылки после этого id в порядке order
+                      (id последней ссылки предыдущей пачки)
             
         Returns:
             Список кортежей (id, url)
         """
-        with sqlite3.connect(self.db_path) as conn:
+        lease = f"+{lease_seconds or config.LEASE_SECONDS} seconds"
+        order = order or config.LINK_ORDER
+        if order not in ('oldest', 'newest'):
+            raise ValueError(f"Неизвестный порядок обхода ссылок: {order}")
+        direction = "DESC" if order == 'newest' else "ASC"
+        cursor_condition = ""
+        params: list = []
+        if after_id is not None:
+            cursor_condition = "AND id < ?" if order == 'newest' else "AND id > ?"
+            params.append(after_id)
+        
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(f"""
+                SELECT id, url FROM apartment_links
+                WHERE is_parsed = 0 {cursor_condition}
+                  AND (lease_expires_at IS NULL OR lease_expires_at <= datetime('now'))
+                ORDER BY id {direction}
+                LIMIT ?
+            """, params + [limit]).fetchall()
+            conn.executemany("""
+                UPDATE apartment_links
+                SET claimed_by = ?, lease_expires_at = datetime('now', ?)
+                WHERE id = ?
+            """, ((owner, lease, link_id) for link_id, _ in rows))
+        return rows
+    
+    def renew_leases(self, owner: str, lease_seconds: Optional[int] = None) -> int:
+        """
+        Продление аренды всех необработанных ссылок воркера
+        
+        Args:
+            owner: Идентификатор воркера
+            lease_seconds: Новый срок аренды от текущего момента
+                           (по умолчанию config.LEASE_SECONDS)
+            
+        Returns:
+            Количество ссылок с продленной арендой
+        """
+        lease = f"+{lease_seconds or config.LEASE_SECONDS} seconds"
+        with self._connection() as conn:
             cursor = conn.cursor()
-            if limit:
-                cursor.execute("""
-                    SELECT id, url FROM apartment_links
-                    WHERE is_parsed = 0
-                    LIMIT ?
-                """, (limit,))
-            else:
-                cursor.execute("""
-                    SELECT id, url FROM apartment_links
-                    WHERE is_parsed = 0
-                """)
-            return cursor.fetchall()
+            cursor.execute("""
+                UPDATE apartment_links
+                SET lease_expires_at = datetime('now', ?)
+                WHERE claimed_by = ? AND is_parsed = 0
+            """, (lease, owner))
+            conn.commit()
+            return cursor.rowcount
+    
+    def release_links(self, owner: str) -> int:
+        """
+        Возврат необработанных ссылок воркера в очередь
+        
+        Args:
+            owner: Идентификатор воркера
+            
+        Returns:
+            Количество возвращенных ссылок
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE apartment_links
+                SET claimed_by = NULL, lease_expires_at = NULL
+                WHERE claimed_by = ? AND is_parsed = 0
+            """, (owner,))
+            conn.commit()
+            return cursor.rowcount
+    
+    def iter_claimed_links(self, owner: str, batch_size: Optional[int] = None,
+                           lease_seconds: Optional[int] = None,
+                           order: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Ссылки, арендуемые воркером пачками по мере обработки
+        
+        Следующая пачка арендуется, когда выдана предыдущая, начиная
+        после id последней выданной ссылки (keyset-курсор): выборка не
+        просматривает заново начало очереди, занятое арендованными или
+        пропущенными ссылками. Ссылки, вернувшиеся в очередь позади
+        курсора, выдаются при следующем обходе. Если с начала обхода
+        или последнего продления прошло больше половины срока аренды,
+        аренда всех необработанных ссылок воркера продлевается.
+        Выданные, но не обработанные ссылки остаются за воркером -
+        после записи результатов верните их release_links.
+        
+        Args:
+            owner: Идентификатор воркера (config.WORKER_ID)
+            batch_size: Ссылок в пачке (по умолчанию config.CLAIM_BATCH)
+            lease_seconds: Срок аренды (по умолчанию config.LEASE_SECONDS)
+            order: 'oldest' или 'newest' (по умолчанию config.LINK_ORDER)
+            
+        Yields:
+            Кортежи (id, url)
+        """
+        batch_size = max(1, batch_size or config.CLAIM_BATCH)
+        lease_seconds = lease_seconds or config.LEASE_SECONDS
+        
+        renewed_at = time.monotonic()
+        last_id = None
+        while True:
+            links = self.claim_links(owner, batch_size, lease_seconds, order, last_id)
+            if not links:
+                return
+            last_id = links[-1][0]
+            
+            for link in links:
+                if time.monotonic() - renewed_at >= lease_seconds / 2:
+                    self.renew_leases(owner, lease_seconds)
+                    renewed_at = time.monotonic()
+                yield link
     
     def mark_link_as_parsed(self, link_id: int) -> None:
         """
@@ -134,13 +529,10 @@ class DatabaseManager:
         Args:
             link_id: ID ссылки
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE apartment_links
-                SET is_parsed = 1
-                WHERE id = ?
-            """, (link_id,))
+            cursor.execute(_COMPLETE_LINK_SQL, (link_id,))
+            cursor.execute(_SCHEDULE_LINK_SQL, (config.RECRAWL_MIN_INTERVAL, link_id))
             conn.commit()
     
     def insert_apartment(self, apartment_data: dict) -> Optional[int]:
@@ -154,33 +546,301 @@ class DatabaseManager:
             ID вставленной записи или None при ошибке
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO apartments (
-                        title, url, price, media_url_1, media_url_2, media_url_3,
-                        about_apartment, rules, address, description, owner_name, owner_url
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    apartment_data.get('title'),
-                    apartment_data.get('url'),
-                    apartment_data.get('price'),
-                    apartment_data.get('media_url_1'),
-                    apartment_data.get('media_url_2'),
-                    apartment_data.get('media_url_3'),
-                    apartment_data.get('about_apartment'),
-                    apartment_data.get('rules'),
-                    apartment_data.get('address'),
-                    apartment_data.get('description'),
-                    apartment_data.get('owner_name'),
-                    apartment_data.get('owner_url')
-                ))
+                cursor.execute(_INSERT_APARTMENT_SQL, self._apartment_values(apartment_data))
                 conn.commit()
                 return cursor.lastrowid
         except sqlite3.IntegrityError as e:
             print(f"Ошибка при вставке объявления: {e}")
             return None
     
+    def upsert_apartment(self, apartment_data: dict) -> bool:
+        """
+        Вставка объявления или обновление существующего (по URL)
+        
+        Args:
+            apartment_data: Словарь с данными объявления
+            
+        Returns:
+            True если запись добавлена, False если обновлена
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM apartments WHERE url = ?", (apartment_data.get('url'),))
+            exists = cursor.fetchone() is not None
+            cursor.execute(_UPSERT_APARTMENT_SQL, self._apartment_values(apartment_data))
+            conn.commit()
+            return not exists
+    
+    def backfill_typed_columns(self, batch_size: int = 1000) -> int:
+        """
+        Заполнение типизированных столбцов у существующих объявлений
+        
+        Строки с версией нормализации меньше NORMALIZE_VERSION
+        обрабатываются пачками по batch_size в порядке id, каждая
+        пачка - в отдельной транзакции, поэтому прерванное заполнение
+        продолжается с места остановки.
+        
+        Args:
+            batch_size: Количество строк в одной транзакции
+            
+        Returns:
+            Количество обновленных объявлений
+        """
+        count = 0
+        last_id = 0
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute("""
+                    SELECT id, title, price, about_apartment, address FROM apartments
+                    WHERE id > ? AND normalized_version < ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, NORMALIZE_VERSION, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                cursor.executemany(f"""
+                    UPDATE apartments
+                    SET {', '.join(f'{column} = ?' for column in TYPED_COLUMNS)},
+                        normalized_version = ?
+                    WHERE id = ?
+                """, [
+                    self._typed_values({'title': title, 'price': price,
+                                        'about_apartment': about_apartment,
+                                        'address': address}) + (row_id,)
+                    for row_id, title, price, about_apartment, address in rows
+                ])
+                conn.commit()
+                count += len(rows)
+                last_id = rows[-1][0]
+        return count
+    
+    def find_apartments(self, min_price: Optional[int] = None, max_price: Optional[int] = None,
+                        min_area: Optional[float] = None, max_area: Optional[float] = None,
+                        rooms: Optional[int] = None, min_guests: Optional[int] = None,
+                        district: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """
+        Поиск объявлений по типизированным столбцам (через индексы)
+        
+        Args:
+            min_price: Минимальная цена
+            max_price: Максимальная цена
+            min_area: Минимальная площадь
+            max_area: Максимальная площадь
+            rooms: Количество комнат (0 - студия)
+            min_guests: Минимальное количество гостей
+            district: Район
+            limit: Максимальное количество объявлений
+            
+        Returns:
+            Список словарей (id, title, url, price_rub, area, rooms, floor,
+            max_guests, district, address), по возрастанию цены; объявления
+            без цены - в конце (при фильтре по цене они не попадают в список)
+        """
+        conditions = []
+        params: list = []
+        for condition, value in (("price_rub >= ?", min_price), ("price_rub <= ?", max_price),
+                                 ("area >= ?", min_area), ("area <= ?", max_area),
+                                 ("rooms = ?", rooms), ("max_guests >= ?", min_guests),
+                                 ("district = ?", district)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # С фильтром по цене объявлений без цены нет - сортировка по индексу price_rub
+        if min_price is None and max_price is None:
+            order_by = "price_rub IS NULL, price_rub"
+        else:
+            order_by = "price_rub"
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(f"""
+                SELECT id, title, url, price_rub, area, rooms, floor, max_guests, district, address
+                FROM apartments
+                {where}
+                ORDER BY {order_by}
+                LIMIT ?
+            """, params + [limit])
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_apartment_by_url(self, url: str) -> Optional[Dict]:
+        """
+        Получение объявления по URL
+        
+        Args:
+            url: URL объявления
+            
+        Returns:
+            Словарь с данными объявления или None
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT * FROM apartments WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_due_links(self, now: str, limit: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Обработанные ссылки, которые пора посетить повторно
+        
+        Выборка идет по индексу link_schedule.next_visit; первое посещение
+        назначается при обработке ссылки (для старых БД - в
+        backfill_link_schedule).
+        
+        Args:
+            now: Текущее время UTC в формате SQLite
+            limit: Максимальное количество ссылок
+            
+        Returns:
+            Список кортежей (id, url), самые просроченные первыми
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT l.id, l.url
+                FROM link_schedule s
+                JOIN apartment_links l ON l.id = s.link_id
+                WHERE s.next_visit <= ? AND s.removed_at IS NULL AND l.is_parsed = 1
+                ORDER BY s.next_visit
+                LIMIT ?
+            """, (now, limit if limit else -1))
+            return cursor.fetchall()
+    
+    def backfill_link_schedule(self, min_interval: float) -> int:
+        """
+        Первое повторное посещение для обработанных ссылок без расписания
+        
+        Нужно для ссылок, обработанных до появления next_visit при
+        обработке: посещение назначается через min_interval часов после
+        добавления ссылки.
+        
+        Args:
+            min_interval: Минимальный интервал в часах
+            
+        Returns:
+            Количество ссылок, получивших расписание
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO link_schedule (link_id, next_visit)
+                SELECT l.id, datetime(l.created_at, '+' || ? || ' hours')
+                FROM apartment_links l
+                WHERE l.is_parsed = 1
+                  AND NOT EXISTS (SELECT 1 FROM link_schedule s WHERE s.link_id = l.id)
+            """, (min_interval,))
+            conn.commit()
+            return cursor.rowcount
+    
+    def get_link_schedule(self, link_id: int) -> Optional[Dict]:
+        """
+        Расписание посещений ссылки
+        
+        Args:
+            link_id: ID ссылки
+            
+        Returns:
+            Словарь с полями link_schedule и link_created_at
+            (поля расписания None, если ссылка еще не посещалась повторно)
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("""
+                SELECT s.*, l.created_at AS link_created_at
+                FROM apartment_links l
+                LEFT JOIN link_schedule s ON s.link_id = l.id
+                WHERE l.id = ?
+            """, (link_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def save_link_schedule(self, link_id: int, fingerprint: str, visits: int, changes: int,
+                           first_visit: str, last_visit: str, next_visit: str) -> None:
+        """
+        Сохранение расписания посещений ссылки
+        
+        Args:
+            link_id: ID ссылки
+            fingerprint: Отпечаток данных объявления
+            visits: Количество посещений
+            changes: Количество обнаруженных изменений
+            first_visit: Время начала наблюдения
+            last_visit: Время последнего посещения
+            next_visit: Время следующего посещения
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO link_schedule (
+                    link_id, fingerprint, visits, changes, first_visit, last_visit, next_visit
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    visits = excluded.visits,
+                    changes = excluded.changes,
+                    first_visit = excluded.first_visit,
+                    last_visit = excluded.last_visit,
+                    next_visit = excluded.next_visit
+            """, (link_id, fingerprint, visits, changes, first_visit, last_visit, next_visit))
+            conn.commit()
+    
+    def postpone_link(self, link_id: int, next_visit: str) -> None:
+        """
+        Перенос следующего посещения ссылки
+        
+        Args:
+            link_id: ID ссылки
+            next_visit: Время следующего посещения
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO link_schedule (link_id, next_visit)
+                VALUES (?, ?)
+                ON CONFLICT(link_id) DO UPDATE SET next_visit = excluded.next_visit
+            """, (link_id, next_visit))
+            conn.commit()
+    
+    def mark_link_as_removed(self, link_id: int, removed_at: str) -> None:
+        """
+        Отметить объявление как снятое с публикации
+        
+        Args:
+            link_id: ID ссылки
+            removed_at: Время обнаружения
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO link_schedule (link_id, last_visit, removed_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(link_id) DO UPDATE SET
+                    last_visit = excluded.last_visit,
+                    next_visit = NULL,
+                    removed_at = excluded.removed_at
+            """, (link_id, removed_at, removed_at))
+            conn.commit()
+    
+    def get_removed_links_count(self) -> int:
+        """
+        Получение количества объявлений, снятых с публикации
+        
+        Returns:
+            Количество объявлений
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM link_schedule WHERE removed_at IS NOT NULL")
+            return cursor.fetchone()[0]
+    
     def get_all_apartments(self) -> List[Tuple]:
         """
         Получение всех записей из базы данных
@@ -188,16 +848,64 @@ class DatabaseManager:
         Returns:
             Список кортежей с данными объявлений
         """
-        with sqlite3.connect(self.db_path) as conn:
+        return list(self.iter_apartments())
+    
+    def get_recent_apartments(self, limit: int = 3) -> List[Tuple]:
+        """
+        Получение последних добавленных объявлений
+        
+        Args:
+            limit: Количество объявлений
+            
+        Returns:
+            Список кортежей с данными объявлений (как в get_all_apartments)
+        """
+        with self._connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, title, url, price, media_url_1, media_url_2, media_url_3,
-                       about_apartment, rules, address, description, owner_name, owner_url, created_at
+            cursor.execute(f"""
+                SELECT {_APARTMENT_COLUMNS}
                 FROM apartments
-                ORDER BY created_at DESC
-            """)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (limit,))
             return cursor.fetchall()
     
+    def iter_apartments(self, chunk_size: int = 100) -> Iterator[Tuple]:
+        """
+        Все объявления, начиная с последних, пачками
+        
+        Каждая пачка читается отдельным запросом по индексу created_at
+        после последнего выданного объявления, поэтому в памяти не больше
+        chunk_size строк, а соединение не занято между пачками.
+        
+        Args:
+            chunk_size: Объявлений в пачке
+            
+        Yields:
+            Кортежи с данными объявлений (как в get_all_apartments)
+        """
+        chunk_size = max(1, chunk_size)
+        with self._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT {_APARTMENT_COLUMNS}
+                FROM apartments
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (chunk_size,)).fetchall()
+        
+        while rows:
+            yield from rows
+            last_id, last_created_at = rows[-1][0], rows[-1][13]
+            with self._connection() as conn:
+                # Сравнение пар: поиск по индексу и при одинаковом created_at
+                rows = conn.execute(f"""
+                    SELECT {_APARTMENT_COLUMNS}
+                    FROM apartments
+                    WHERE (created_at, id) < (?, ?)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                """, (last_created_at, last_id, chunk_size)).fetchall()
+    
     def get_apartments_count(self) -> int:
         """
         Получение количества записей в базе данных
@@ -205,7 +913,7 @@ class DatabaseManager:
         Returns:
             Количество записей
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM apartments")
             return cursor.fetchone()[0]
@@ -217,7 +925,7 @@ class DatabaseManager:
         Returns:
             Кортеж (всего ссылок, обработано)
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM apartment_links")
             total = cursor.fetchone()[0]
@@ -227,13 +935,187 @@ class DatabaseManager:
     
     def clear_database(self) -> None:
         """Очистка базы данных"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM apartments")
+            cursor.execute("DELETE FROM link_schedule")
+            cursor.execute("DELETE FROM catalog_cards")
             cursor.execute("DELETE FROM apartment_links")
             conn.commit()
     
+    def buffered_writer(self, batch_size: Optional[int] = None,
+                        flush_interval: Optional[float] = None) -> 'BufferedWriter':
+        """
+        Буферизованная запись результатов парсинга
+        
+        Args:
+            batch_size: Объявлений в одной транзакции (по умолчанию config.DB_WRITE_BATCH)
+            flush_interval: Максимальное время в буфере, секунд
+                            (по умолчанию config.DB_WRITE_INTERVAL)
+            
+        Returns:
+            BufferedWriter; записывается при close() менеджера
+        """
+        writer = BufferedWriter(self, batch_size, flush_interval)
+        self._writers.append(writer)
+        return writer
+    
+    def close(self) -> None:
+        """
+        Запись буферов BufferedWriter и закрытие долгоживущего соединения
+        (при следующем вызове откроется заново)
+        """
+        for writer in list(self._writers):
+            writer.close()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BufferedWriter:
+    """
+    Буферизованная запись результатов парсинга
+    
+    Объявления и отметки обработки ссылок копятся в буфере и
+    записываются одной транзакцией: строка объявления и is_parsed = 1
+    его ссылки фиксируются вместе, поэтому после сбоя ссылка либо
+    обработана с сохраненным объявлением, либо остается в очереди.
+    Буфер записывается, когда в нем batch_size объявлений, по таймеру
+    через flush_interval секунд после первой записи в буфер (даже если
+    новых записей нет), а также в close(), при выходе из блока with
+    (в том числе по Ctrl+C) и при завершении интерпретатора. После
+    close() записи не буферизуются (например, результаты потоков,
+    завершающихся после прерывания).
+    
+    Новые и обновленные объявления считаются при записи буфера
+    (inserted, updated): новые строки получают id больше прежнего
+    максимального.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Инициализация
+        
+        Args:
+            db_manager: Менеджер базы данных
+            batch_size: Объявлений в одной транзакции (по умолчанию config.DB_WRITE_BATCH)
+            flush_interval: Максимальное время в буфере, секунд
+                            (по умолчанию config.DB_WRITE_INTERVAL)
+        """
+        self.db_manager = db_manager
+        self.batch_size = max(1, batch_size or config.DB_WRITE_BATCH)
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else config.DB_WRITE_INTERVAL)
+        self._lock = threading.RLock()
+        self._apartments: List[tuple] = []
+        self._parsed_links: List[int] = []
+        self._timer: Optional[threading.Timer] = None
+        self.closed = False
+        self.flushes = 0
+        self.inserted = 0
+        self.updated = 0
+        atexit.register(self.close)
+    
+    def __enter__(self):
+        """Вход в контекстный менеджер"""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Выход из контекстного менеджера (буфер записывается и при исключении)"""
+        self.close()
+    
+    def add_apartment(self, apartment_data: dict, link_id: Optional[int] = None) -> None:
+        """
+        Объявление в буфер (вставка или обновление по URL при записи)
+        
+        Args:
+            apartment_data: Словарь с данными объявления
+            link_id: ID ссылки, отмечаемой обработанной в той же транзакции
+        """
+        values = DatabaseManager._apartment_values(apartment_data)
+        with self._lock:
+            self._apartments.append(values)
+            if link_id is not None:
+                self._parsed_links.append(link_id)
+            self._added()
+    
+    def mark_link_as_parsed(self, link_id: int) -> None:
+        """
+        Отметка ссылки обработанной (без объявления, например при ошибке)
+        
+        Args:
+            link_id: ID ссылки
+        """
+        with self._lock:
+            self._parsed_links.append(link_id)
+            self._added()
+    
+    def _added(self) -> None:
+        """Запись буфера, если он заполнен; иначе запуск таймера записи"""
+        if (self.closed or len(self._apartments) >= self.batch_size
+                or len(self._parsed_links) >= self.batch_size):
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _flush_on_timer(self) -> None:
+        """Запись буфера по таймеру (в потоке таймера)"""
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                # Буфер уже записан, таймер отменен
+                return
+            self._timer = None
+            try:
+                self.flush()
+            except Exception as e:
+                # Буфер сохраняется и будет записан при следующей записи или в close()
+                print(f"⚠ Не удалось записать буфер по таймеру: {e}")
+    
+    def flush(self) -> int:
+        """
+        Запись буфера одной транзакцией
+        
+        Returns:
+            Количество записанных объявлений
+        """
+        with self._lock:
+            if self._timer is not None and self._timer is not threading.current_thread():
+                self._timer.cancel()
+                self._timer = None
+            if not self._apartments and not self._parsed_links:
+                return 0
+            
+            with self.db_manager._connection() as conn:
+                # Блокировка записи до подсчета: чужие вставки не попадут в inserted
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM apartments").fetchone()[0]
+                conn.executemany(_UPSERT_APARTMENT_SQL, self._apartments)
+                conn.executemany(_COMPLETE_LINK_SQL,
+                                 ((link_id,) for link_id in self._parsed_links))
+                conn.executemany(_SCHEDULE_LINK_SQL,
+                                 ((config.RECRAWL_MIN_INTERVAL, link_id)
+                                  for link_id in self._parsed_links))
+                inserted = conn.execute("SELECT COUNT(*) FROM apartments WHERE id > ?",
+                                        (last_id,)).fetchone()[0]
+            
+            count = len(self._apartments)
+            self.inserted += inserted
+            self.updated += count - inserted
+            self._apartments = []
+            self._parsed_links = []
+            self.flushes += 1
+            return count
+    
     def close(self) -> None:
-        """Закрытие соединения с базой данных"""
-        # SQLite автоматически закрывает соединения, но метод оставлен для совместимости
-        pass
+        """Запись оставшегося буфера"""
+        with self._lock:
+            self.flush()
+            self.closed = True
+            atexit.unregister(self.close)
+            if self in self.db_manager._writers:
+                self.db_manager._writers.remove(self)
@@ -0,0 +1,233 @@
+import os
+import gzip
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Optional, Iterator, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard не установлен, используется gzip
+    zstandard = None
+
+
+# Расширения файлов архива по способу сжатия
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.html.gz',
+    'zstd': '.html.zst',
+}
+
+
+class HTMLArchive:
+    """
+    Архив загруженных страниц со сжатием и адресацией по содержимому
+    
+    Каждая страница хранится один раз в objects/<2 символа хэша>/<sha256>,
+    сжатая gzip или zstd. Индекс index.db связывает URL с хэшами
+    всех загруженных версий страницы.
+    """
+    
+    def __init__(self, root_dir: str = "html_archive", compression: str = "gzip"):
+        """
+        Инициализация архива
+        
+        Args:
+            root_dir: Каталог архива
+            compression: Способ сжатия новых страниц: 'gzip' или 'zstd'
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Неизвестный способ сжатия: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            print("⚠ zstandard не установлен, архив использует gzip")
+            compression = 'gzip'
+        
+        self.root_dir = root_dir
+        self.compression = compression
+        self.index_path = os.path.join(root_dir, "index.db")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root_dir, "objects"), exist_ok=True)
+        self.init_index()
+    
+    def init_index(self) -> None:
+        """Создание таблицы индекса если она не существует"""
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    page_type TEXT,
+                    content_hash TEXT NOT NULL,
+                    compression TEXT NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_type ON pages (page_type)")
+            # Поиск уже сохраненного объекта по хешу в put() и get()
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages (content_hash)")
+            conn.commit()
+    
+    def _object_path(self, content_hash: str, compression: str) -> str:
+        """Путь к файлу страницы в архиве"""
+        return os.path.join(self.root_dir, "objects", content_hash[:2],
+                            content_hash + COMPRESSION_EXTENSIONS[compression])
+    
+    def _compress(self, data: bytes) -> bytes:
+        """Сжатие данных выбранным способом"""
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+    
+    @staticmethod
+    def _decompress(data: bytes, compression: str) -> bytes:
+        """Распаковка данных"""
+        if compression == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("Для чтения страниц в формате zstd установите zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+    
+    def put(self, url: str, html_content: str, page_type: Optional[str] = None) -> str:
+        """
+        Сохранение страницы в архив
+        
+        Args:
+            url: URL страницы
+            html_content: HTML код страницы
+            page_type: Тип страницы ('catalog' или 'detail')
+            
+        Returns:
+            SHA-256 хэш содержимого
+        """
+        data = html_content.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        
+        with self._lock:
+            with sqlite3.connect(self.index_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT compression FROM pages WHERE content_hash = ? LIMIT 1
+                """, (content_hash,))
+                row = cursor.fetchone()
+                compression = row[0] if row else self.compression
+                
+                object_path = self._object_path(content_hash, compression)
+                if not os.path.exists(object_path):
+                    self._write_object(object_path, self._compress(data))
+                
+                cursor.execute("""
+                    INSERT INTO pages (url, page_type, content_hash, compression)
+                    VALUES (?, ?, ?, ?)
+                """, (url, page_type, content_hash, compression))
+                conn.commit()
+        
+        return content_hash
+    
+    @staticmethod
+    def _write_object(object_path: str, data: bytes) -> None:
+        """Атомарная запись файла (через временный файл)"""
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(object_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, object_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def get(self, content_hash: str) -> Optional[str]:
+        """
+        Чтение страницы по хэшу
+        
+        Args:
+            content_hash: SHA-256 хэш содержимого
+            
+        Returns:
+            HTML код страницы или None
+        """
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT compression FROM pages WHERE content_hash = ? LIMIT 1
+            """, (content_hash,))
+            row = cursor.fetchone()
+        
+        if not row:
+            return None
+        
+        with open(self._object_path(content_hash, row[0]), 'rb') as f:
+            return self._decompress(f.read(), row[0]).decode('utf-8')
+    
+    def get_latest(self, url: str) -> Optional[str]:
+        """
+        Последняя сохраненная версия страницы
+        
+        Args:
+            url: URL страницы
+            
+        Returns:
+            HTML код страницы или None
+        """
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT content_hash FROM pages
+                WHERE url = ?
+                ORDER BY id DESC
+                LIMIT 1
+            """, (url,))
+            row = cursor.fetchone()
+        
+        return self.get(row[0]) if row else None
+    
+    def iter_latest(self, page_type: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Последние версии всех страниц архива
+        
+        Args:
+            page_type: Только страницы этого типа (None - все)
+            
+        Yields:
+            Кортежи (url, HTML код)
+        """
+        query = """
+            SELECT url, content_hash, compression FROM pages
+            WHERE id IN (SELECT MAX(id) FROM pages GROUP BY url)
+        """
+        params: tuple = ()
+        if page_type:
+            query += " AND page_type = ?"
+            params = (page_type,)
+        query += " ORDER BY id"
+        
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        for url, content_hash, compression in rows:
+            try:
+                with open(self._object_path(content_hash, compression), 'rb') as f:
+                    yield url, self._decompress(f.read(), compression).decode('utf-8')
+            except (OSError, RuntimeError) as e:
+                print(f"⚠ Не удалось прочитать страницу {url} из архива: {e}")
+    
+    def get_stats(self) -> Tuple[int, int, int]:
+        """
+        Статистика архива
+        
+        Returns:
+            Кортеж (записей в индексе, уникальных URL, уникальных страниц)
+        """
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(DISTINCT url), COUNT(DISTINCT content_hash)
+                FROM pages
+            """)
+            return cursor.fetchone()
@@ -1,24 +1,472 @@
 import re
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+import json
+import hashlib
+import functools
+import threading
+from typing import List, Dict, Optional, Iterator, Tuple
+from bs4 import BeautifulSoup, SoupStrainer, Tag, NavigableString, CData
+import config
+from selector_stats import SelectorRegistry
+from json_state import parse_detail_state
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    # lxml не установлен, доступен только бэкенд bs4
+    etree = None
+    lxml_html = None
+
+
+# Цепочки CSS-селекторов по извлекаемым полям (пробуются по порядку)
+SELECTORS: Dict[str, List[str]] = {
+    # Контейнеры объявлений в каталоге
+    'catalog_item': [
+        'div[data-marker="item"]',
+        'div[class*="item"]',
+        'div[class*="iva-item"]'
+    ],
+    'catalog_link': [
+        'a[data-marker="item-title"]',
+        'h3 a',
+        'a[href*="/kvartiry/"]',
+        'a[itemprop="url"]'
+    ],
+    'catalog_title': [
+        'h3[data-marker="item-title"] a',
+        'h3 a[data-marker="item-title"]',
+        'a[data-marker="item-title"]',
+        'h3 a',
+        '.item-title a',
+        '.iva-item-titleStep a',
+        'a[href*="/volgograd/kvartiry/"]'
+    ],
+    'catalog_price': [
+        '[data-marker="item-price"]',
+        '.item-price',
+        '.price-text',
+        '.iva-item-priceStep',
+        '[class*="price"]'
+    ],
+    'catalog_photo': [
+        'img[data-marker="item-photo"]',
+        '.item-photo img',
+        '.photo-slider img',
+        '.iva-item-photo img',
+        'img[src*="avatars.mds.yandex.net"]',
+        'img[src*="avito.st"]'
+    ],
+    'total_count': [
+        '[data-marker="page-title/count"]',
+        '.page-title-count',
+        '[class*="count"]'
+    ],
+    'next_page': [
+        'a[data-marker="pagination-button/next"]',
+        '.pagination-item_next',
+        'a[aria-label="Следующая страница"]'
+    ],
+    'next_page_url': [
+        'a[data-marker="pagination-button/next"]',
+        '.pagination-item_next a',
+        'a[aria-label="Следующая страница"]'
+    ],
+    'removed': [
+        '[data-marker="item-view/closed-warning"]',
+        '[class*="item-closed"]'
+    ],
+    'detail_title': [
+        'h1[data-marker="item-view/title-info"]',
+        'h1[itemprop="name"]',
+        'h1.title-info-title',
+        'span[class*="title"]',
+        'h1'
+    ],
+    'detail_price': [
+        'span[data-marker="item-view/item-price"]',
+        'span[itemprop="price"]',
+        'span[class*="price"]',
+        '[class*="item-price"]'
+    ],
+    'media': [
+        'div[data-marker="image-frame/image-wrapper"] img',
+        'div[class*="gallery"] img',
+        'img[itemprop="image"]',
+        'div[class*="image"] img',
+        'li[class*="image"] img'
+    ],
+    'about': [
+        'ul[class*="params"]',
+        'div[class*="params"]',
+        'ul[data-marker="item-view/item-params"]'
+    ],
+    'about_item': ['li'],
+    'address': [
+        'span[class*="geo-root"]',
+        'div[class*="item-address"]',
+        'span[itemprop="address"]',
+        '[data-marker="item-view/item-address"]',
+        'div[class*="location"]'
+    ],
+    'description': [
+        'div[data-marker="item-view/item-description"]',
+        'div[itemprop="description"]',
+        'div[class*="item-description"]',
+        'p[class*="description"]'
+    ],
+    'seller': [
+        'div[data-marker="seller-info"]',
+        'div[class*="seller"]',
+        'a[class*="seller"]'
+    ],
+    'seller_name': ['span, div, a'],
+    'seller_link': ['a[href]'],
+}
+
+# Парсер-бэкенды: BeautifulSoup или дерево lxml с XPath
+PARSER_BACKENDS = ('bs4', 'lxml')
+
+# Области страницы для ограниченного разбора (значения data-marker корней):
+# в режиме restricted дерево строится только для этих элементов
+PARSE_REGIONS: Dict[str, List[str]] = {
+    'catalog': [
+        'page-title/count',
+        'catalog-serp',
+        'pagination-button',
+        'pagination-button/next'
+    ],
+    'detail': [
+        'item-view/item-view',
+        'item-view/closed-warning'
+    ],
+}
+
+# Поля карточки объявления в каталоге, по которым считается ее отпечаток
+CARD_FIELDS = ('title', 'price', 'photo_url')
+
+# Теги, текст внутри которых BeautifulSoup не включает в get_text() родителя
+TEXT_EXCLUDED_TAGS = ('script', 'style', 'template', 'rt', 'rp')
+
+# Правила проживания: блоки с ключевыми словами и длиной текста 10..500 символов
+RULES_BLOCK_TAGS = ('p', 'div', 'span')
+RULES_KEYWORDS = ('правил', 'условия', 'можно', 'нельзя')
+RULES_MIN_LENGTH = 10
+RULES_MAX_LENGTH = 500
+RULES_MAX_BLOCKS = 3
+
+# Простой селектор: тег и набор .class, #id, [attr], [attr="v"], [attr*="v"], [attr^="v"]
+_COMPOUND_PATTERN = re.compile(r'([a-zA-Z][\w-]*|\*)?((?:\.[\w-]+|#[\w-]+|\[[^\]]+\])*)$')
+_COMPOUND_SPLIT_PATTERN = re.compile(r'(?:\[[^\]]*\]|[^\s\[])+')
+_LIST_SPLIT_PATTERN = re.compile(r',(?![^\[]*\])')
+_PART_PATTERN = re.compile(r'\.([\w-]+)|#([\w-]+)|\[([^\]]+)\]')
+_ATTRIBUTE_PATTERN = re.compile(
+    r'\s*([\w-]+)\s*(?:([*^]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([\w-]+))\s*)?$'
+)
+
+
+def _xpath_literal(value: str) -> str:
+    """Строковый литерал XPath"""
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    parts = value.split('"')
+    return 'concat(' + ', \'"\', '.join(f'"{part}"' for part in parts) + ')'
+
+
+def css_to_xpath(selector: str) -> str:
+    """
+    Преобразование CSS-селектора в выражение XPath
+    
+    Поддерживается подмножество CSS, используемое в SELECTORS:
+    теги, классы, id, атрибуты (=, *=, ^=, наличие), комбинатор
+    потомка и списки селекторов через запятую. Как и select() в
+    BeautifulSoup, выражение ищет только среди потомков узла.
+    
+    Args:
+        selector: CSS-селектор
+        
+    Returns:
+        Выражение XPath
+    """
+    alternatives = []
+    for alternative in _LIST_SPLIT_PATTERN.split(selector):
+        steps = []
+        for compound in _COMPOUND_SPLIT_PATTERN.findall(alternative):
+            match = _COMPOUND_PATTERN.match(compound)
+            if not match:
+                raise ValueError(f"Неподдерживаемый селектор: {selector}")
+            
+            predicates = []
+            for class_name, element_id, attribute in _PART_PATTERN.findall(match.group(2)):
+                if class_name:
+                    predicates.append(
+                        'contains(concat(" ", normalize-space(@class), " "), '
+                        f'{_xpath_literal(" " + class_name + " ")})'
+                    )
+                elif element_id:
+                    predicates.append(f'@id = {_xpath_literal(element_id)}')
+                else:
+                    attr_match = _ATTRIBUTE_PATTERN.match(attribute)
+                    if not attr_match:
+                        raise ValueError(f"Неподдерживаемый селектор: {selector}")
+                    name, operator = attr_match.group(1), attr_match.group(2)
+                    value = next((group for group in attr_match.group(3, 4, 5)
+                                  if group is not None), '')
+                    if not operator:
+                        predicates.append(f'@{name}')
+                    elif operator == '=':
+                        predicates.append(f'@{name} = {_xpath_literal(value)}')
+                    elif operator == '*=':
+                        # Пустое значение в CSS не совпадает ни с чем
+                        predicates.append(f'contains(@{name}, {_xpath_literal(value)})'
+                                          if value else 'false()')
+                    else:
+                        predicates.append(f'starts-with(@{name}, {_xpath_literal(value)})'
+                                          if value else 'false()')
+            
+            step = 'descendant::' + (match.group(1) or '*').lower()
+            steps.append(step + ''.join(f'[{predicate}]' for predicate in predicates))
+        
+        if not steps:
+            raise ValueError(f"Неподдерживаемый селектор: {selector}")
+        alternatives.append('/'.join(steps))
+    
+    return ' | '.join(alternatives)
+
+
+def _compile_selectors() -> Dict[str, 'etree.XPath']:
+    """Компиляция всех селекторов SELECTORS в XPath (один раз при импорте)"""
+    if etree is None:
+        return {}
+    return {
+        selector: etree.XPath(css_to_xpath(selector))
+        for chain in SELECTORS.values()
+        for selector in chain
+    }
+
+
+# Скомпилированные выражения XPath по тексту CSS-селектора
+XPATH_SELECTORS = _compile_selectors()
+
+
+def _lxml_text(elem) -> str:
+    """
+    Текст элемента lxml как у get_text(strip=True) в BeautifulSoup
+    
+    Каждый текстовый узел обрезается по краям, пустые пропускаются.
+    Комментарии и текст внутри TEXT_EXCLUDED_TAGS не учитываются
+    (кроме случая, когда сам элемент - один из этих тегов).
+    """
+    parts: List[str] = []
+    own_container = elem.tag if elem.tag in TEXT_EXCLUDED_TAGS else None
+    
+    def walk(node, container) -> None:
+        if node.tag in TEXT_EXCLUDED_TAGS:
+            container = node.tag
+        if isinstance(node.tag, str) and node.text and container == own_container:
+            text = node.text.strip()
+            if text:
+                parts.append(text)
+        for child in node:
+            walk(child, container)
+            if child.tail and container == own_container:
+                text = child.tail.strip()
+                if text:
+                    parts.append(text)
+    
+    walk(elem, own_container)
+    return ''.join(parts)
+
+
+_selector_registry: Optional[SelectorRegistry] = None
+_selector_registry_lock = threading.Lock()
+
+
+def card_fingerprint(card: Dict[str, Optional[str]]) -> str:
+    """
+    Отпечаток карточки объявления из каталога
+    
+    Args:
+        card: Словарь с полями CARD_FIELDS
+        
+    Returns:
+        SHA-1 хэш полей карточки
+    """
+    values = [card.get(field) for field in CARD_FIELDS]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def get_selector_registry() -> SelectorRegistry:
+    """
+    Общий реестр селекторов процесса
+    
+    Создается при первом обращении; статистика загружается из
+    config.SELECTOR_STATS_PATH и сохраняется туда же методом save().
+    """
+    global _selector_registry
+    with _selector_registry_lock:
+        if _selector_registry is None:
+            _selector_registry = SelectorRegistry(SELECTORS, config.SELECTOR_STATS_PATH or None)
+        return _selector_registry
+
+
+def _in_region(region: Optional[str]):
+    """Декоратор: метод парсера работает с областью страницы region (None - вся страница)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            previous = self._region
+            self._region = region
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._region = previous
+        return wrapper
+    return decorator
 
 
 class AvitoHTMLParser:
     """Класс для парсинга HTML страниц Avito"""
     
-    def __init__(self, html_content: str):
+    def __init__(self, html_content: str, backend: Optional[str] = None,
+                 registry: Optional[SelectorRegistry] = None,
+                 restricted: Optional[bool] = None):
         """
         Инициализация парсера
         
         Args:
             html_content: HTML содержимое страницы
+            backend: 'bs4' (BeautifulSoup) или 'lxml' (дерево lxml и
+                     предкомпилированные XPath), по умолчанию config.PARSER_BACKEND
+            registry: Реестр селекторов (по умолчанию общий, get_selector_registry())
+            restricted: Строить дерево только для нужных областей страницы
+                        (PARSE_REGIONS, только бэкенд bs4), по умолчанию
+                        config.PARSE_RESTRICTED
+        """
+        self.registry = registry or get_selector_registry()
+        self.backend = backend or config.PARSER_BACKEND
+        if self.backend not in PARSER_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд парсера: {self.backend}")
+        
+        if self.backend == 'lxml' and lxml_html is None:
+            raise ImportError("Для бэкенда lxml установите пакет lxml")
+        
+        # Дерево страницы строится при первом обращении (см. soup и tree)
+        self.html_content = html_content
+        self.restricted = config.PARSE_RESTRICTED if restricted is None else restricted
+        self._soup = None
+        self._tree = None
+        # Деревья областей страницы (режим restricted) и текущая область
+        self._region_soups: Dict[str, BeautifulSoup] = {}
+        self._region: Optional[str] = None
+    
+    @property
+    def soup(self):
+        """
+        Дерево BeautifulSoup (бэкенд bs4), строится при первом обращении
+        
+        В режиме restricted внутри методов, работающих с областью страницы,
+        возвращается дерево только этой области; если на странице нет ни
+        одного корня области, используется дерево всей страницы.
         """
+        if self.backend != 'bs4':
+            return None
+        
+        if self.restricted and self._region:
+            region_soup = self._region_soups.get(self._region)
+            if region_soup is None:
+                region_soup = self._build_soup(SoupStrainer(
+                    attrs={'data-marker': PARSE_REGIONS[self._region]}
+                ))
+                if region_soup.find() is None:
+                    region_soup = self._full_soup()
+                self._region_soups[self._region] = region_soup
+            return region_soup
+        
+        return self._full_soup()
+    
+    def _full_soup(self) -> BeautifulSoup:
+        """Дерево BeautifulSoup всей страницы"""
+        if self._soup is None:
+            self._soup = self._build_soup()
+        return self._soup
+    
+    def _build_soup(self, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        """Разбор страницы BeautifulSoup (только parse_only, если задан)"""
         try:
-            self.soup = BeautifulSoup(html_content, 'lxml')
+            return BeautifulSoup(self.html_content, 'lxml', parse_only=parse_only)
         except:
             # Если lxml не установлен, используем встроенный парсер
-            self.soup = BeautifulSoup(html_content, 'html.parser')
+            return BeautifulSoup(self.html_content, 'html.parser', parse_only=parse_only)
+    
+    @property
+    def tree(self):
+        """Дерево lxml (бэкенд lxml), строится при первом обращении"""
+        if self._tree is None and self.backend == 'lxml':
+            self._tree = self._build_lxml_tree(self.html_content)
+        return self._tree
+    
+    @staticmethod
+    def _build_lxml_tree(html_content: str):
+        """Построение дерева lxml (пустой документ при пустом HTML)"""
+        try:
+            root = lxml_html.document_fromstring(html_content)
+        except ValueError:
+            # Строка с объявлением кодировки - разбираем как байты UTF-8
+            root = lxml_html.document_fromstring(
+                html_content.encode('utf-8'),
+                parser=lxml_html.HTMLParser(encoding='utf-8')
+            )
+        except etree.ParserError:
+            root = lxml_html.document_fromstring('<html></html>')
+        return root.getroottree()
     
+    def _select(self, selector: str, context=None) -> list:
+        """
+        Все элементы, подходящие под CSS-селектор
+        
+        Args:
+            selector: CSS-селектор
+            context: Элемент, среди потомков которого идет поиск
+                     (по умолчанию вся страница)
+            
+        Returns:
+            Список элементов в порядке документа
+        """
+        if self.backend == 'lxml':
+            xpath = XPATH_SELECTORS.get(selector)
+            if xpath is None:
+                xpath = XPATH_SELECTORS[selector] = etree.XPath(css_to_xpath(selector))
+            return xpath(self.tree if context is None else context)
+        
+        return (self.soup if context is None else context).select(selector)
+    
+    def _select_one(self, selector: str, context=None):
+        """
+        Первый элемент, подходящий под CSS-селектор
+        
+        Args:
+            selector: CSS-селектор
+            context: Элемент, среди потомков которого идет поиск
+                     (по умолчанию вся страница)
+            
+        Returns:
+            Элемент или None
+        """
+        if self.backend == 'lxml':
+            matches = self._select(selector, context)
+            return matches[0] if matches else None
+        
+        return (self.soup if context is None else context).select_one(selector)
+    
+    def _get_text(self, elem) -> str:
+        """Текст элемента без пробелов по краям фрагментов"""
+        if self.backend == 'lxml':
+            return _lxml_text(elem)
+        return elem.get_text(strip=True)
+    
+    @_in_region('catalog')
     def parse_apartment_links(self) -> List[str]:
         """
         Парсинг ссылок на объявления со страницы каталога
@@ -28,15 +476,7 @@ class AvitoHTMLParser:
         """
         links = []
         
-        # Поиск контейнеров с объявлениями
-        apartment_containers = self.soup.find_all('div', {'data-marker': 'item'})
-        
-        if not apartment_containers:
-            apartment_containers = self.soup.find_all('div', class_=re.compile(r'item.*'))
-        
-        if not apartment_containers:
-            apartment_containers = self.soup.find_all('div', class_=re.compile(r'iva-item.*'))
-        
+        apartment_containers = self._find_apartment_containers()
         print(f"Найдено контейнеров с объявлениями: {len(apartment_containers)}")
         
         for container in apartment_containers:
@@ -46,26 +486,64 @@ class AvitoHTMLParser:
         
         return links
     
+    @_in_region('catalog')
+    def parse_catalog_cards(self) -> List[Dict[str, Optional[str]]]:
+        """
+        Парсинг карточек объявлений со страницы каталога
+        
+        Returns:
+            Список словарей с ключами url, title, price, photo_url и
+            fingerprint (отпечаток полей CARD_FIELDS; None, если в карточке
+            не найдены заголовок или цена)
+        """
+        cards = []
+        
+        apartment_containers = self._find_apartment_containers()
+        print(f"Найдено контейнеров с объявлениями: {len(apartment_containers)}")
+        
+        for container in apartment_containers:
+            url = self._extract_apartment_url(container)
+            if not url:
+                continue
+            
+            card = self._parse_single_apartment(container)
+            if card:
+                card['fingerprint'] = card_fingerprint(card)
+            else:
+                card = {field: None for field in CARD_FIELDS}
+                card['fingerprint'] = None
+            card['url'] = url
+            cards.append(card)
+        
+        return cards
+    
+    def _find_apartment_containers(self) -> list:
+        """Поиск контейнеров с объявлениями на странице каталога"""
+        apartment_containers = []
+        for selector in self.registry.chain('catalog_item'):
+            apartment_containers = self._select(selector)
+            self.registry.record('catalog_item', selector, bool(apartment_containers))
+            if apartment_containers:
+                break
+        
+        return apartment_containers
+    
     def _extract_apartment_url(self, container) -> Optional[str]:
         """Извлечение URL объявления из контейнера"""
         # Различные селекторы для ссылки
-        link_selectors = [
-            'a[data-marker="item-title"]',
-            'h3 a',
-            'a[href*="/kvartiry/"]',
-            'a[itemprop="url"]'
-        ]
-        
-        for selector in link_selectors:
-            link_elem = container.select_one(selector)
-            if link_elem:
+        for selector in self.registry.chain('catalog_link'):
+            link_elem = self._select_one(selector, container)
+            if link_elem is not None:
                 href = link_elem.get('href')
                 if href:
                     # Преобразование относительных URL в абсолютные
                     if href.startswith('/'):
+                        self.registry.record('catalog_link', selector, True)
                         return 'https://www.avito.ru' + href
                     elif href.startswith('http'):
+                        self.registry.record('catalog_link', selector, True)
                         return href
+            self.registry.record('catalog_link', selector, False)
         
         return None
     
@@ -95,7 +573,7 @@ class AvitoHTMLParser:
                     'price': price,
                     'photo_url': photo_url
                 }
-            
+        
         except Exception as e:
             print(f"Ошибка при парсинге объявления: {e}")
         
@@ -104,62 +582,39 @@ class AvitoHTMLParser:
     def _extract_title(self, container) -> Optional[str]:
         """Извлечение заголовка объявления"""
         # Различные селекторы для заголовка
-        title_selectors = [
-            'h3[data-marker="item-title"] a',
-            'h3 a[data-marker="item-title"]',
-            'a[data-marker="item-title"]',
-            'h3 a',
-            '.item-title a',
-            '.iva-item-titleStep a',
-            'a[href*="/volgograd/kvartiry/"]'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = container.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text(strip=True)
+        for selector in self.registry.chain('catalog_title'):
+            title_elem = self._select_one(selector, container)
+            if title_elem is not None:
+                title = self._get_text(title_elem)
                 if title:
+                    self.registry.record('catalog_title', selector, True)
                     return title
+            self.registry.record('catalog_title', selector, False)
         
         return None
     
     def _extract_price(self, container) -> Optional[str]:
         """Извлечение цены"""
         # Различные селекторы для цены
-        price_selectors = [
-            '[data-marker="item-price"]',
-            '.item-price',
-            '.price-text',
-            '.iva-item-priceStep',
-            '[class*="price"]'
-        ]
-        
-        for selector in price_selectors:
-            price_elem = container.select_one(selector)
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
+        for selector in self.registry.chain('catalog_price'):
+            price_elem = self._select_one(selector, container)
+            if price_elem is not None:
+                price_text = self._get_text(price_elem)
                 # Очистка цены от лишних символов
                 price = re.sub(r'[^\d\s₽]', '', price_text).strip()
                 if price:
+                    self.registry.record('catalog_price', selector, True)
                     return price
+            self.registry.record('catalog_price', selector, False)
         
         return None
     
     def _extract_photo_url(self, container) -> Optional[str]:
         """Извлечение URL фотографии"""
         # Различные селекторы для изображения
-        img_selectors = [
-            'img[data-marker="item-photo"]',
-            '.item-photo img',
-            '.photo-slider img',
-            '.iva-item-photo img',
-            'img[src*="avatars.mds.yandex.net"]',
-            'img[src*="avito.st"]'
-        ]
-        
-        for selector in img_selectors:
-            img_elem = container.select_one(selector)
-            if img_elem:
+        for selector in self.registry.chain('catalog_photo'):
+            img_elem = self._select_one(selector, container)
+            if img_elem is not None:
                 photo_url = img_elem.get('src') or img_elem.get('data-src')
                 if photo_url:
                     # Преобразование относительных URL в абсолютные
@@ -168,10 +623,13 @@ class AvitoHTMLParser:
                     elif photo_url.startswith('/'):
                         photo_url = 'https://www.avito.ru' + photo_url
                     
+                    self.registry.record('catalog_photo', selector, True)
                     return photo_url
+            self.registry.record('catalog_photo', selector, False)
         
         return None
     
+    @_in_region('catalog')
     def get_total_count(self) -> Optional[int]:
         """
         Получение общего количества объявлений на странице
@@ -180,23 +638,20 @@ class AvitoHTMLParser:
             Количество объявлений или None
         """
         # Поиск счетчика объявлений
-        count_selectors = [
-            '[data-marker="page-title/count"]',
-            '.page-title-count',
-            '[class*="count"]'
-        ]
-        
-        for selector in count_selectors:
-            count_elem = self.soup.select_one(selector)
-            if count_elem:
-                count_text = count_elem.get_text(strip=True)
+        for selector in self.registry.chain('total_count'):
+            count_elem = self._select_one(selector)
+            if count_elem is not None:
+                count_text = self._get_text(count_elem)
                 # Извлечение числа из текста
                 numbers = re.findall(r'\d+', count_text)
                 if numbers:
+                    self.registry.record('total_count', selector, True)
                     return int(numbers[0])
+            self.registry.record('total_count', selector, False)
         
         return None
     
+    @_in_region('catalog')
     def has_next_page(self) -> bool:
         """
         Проверка наличия следующей страницы
@@ -205,19 +660,17 @@ class AvitoHTMLParser:
             True если есть следующая страница, False иначе
         """
         # Поиск кнопки "Следующая страница"
-        next_selectors = [
-            'a[data-marker="pagination-button/next"]',
-            '.pagination-item_next',
-            'a[aria-label="Следующая страница"]'
-        ]
-        
-        for selector in next_selectors:
-            next_elem = self.soup.select_one(selector)
-            if next_elem and not next_elem.get('disabled'):
+        for selector in self.registry.chain('next_page'):
+            next_elem = self._select_one(selector)
+            # Атрибут disabled без значения тоже означает неактивную кнопку
+            if next_elem is not None and next_elem.get('disabled') is None:
+                self.registry.record('next_page', selector, True)
                 return True
+            self.registry.record('next_page', selector, False)
         
         return False
     
+    @_in_region('catalog')
     def get_next_page_url(self) -> Optional[str]:
         """
         Получение URL следующей страницы
@@ -225,23 +678,36 @@ class AvitoHTMLParser:
         Returns:
             URL следующей страницы или None
         """
-        next_selectors = [
-            'a[data-marker="pagination-button/next"]',
-            '.pagination-item_next a',
-            'a[aria-label="Следующая страница"]'
-        ]
-        
-        for selector in next_selectors:
-            next_elem = self.soup.select_one(selector)
-            if next_elem:
+        for selector in self.registry.chain('next_page_url'):
+            next_elem = self._select_one(selector)
+            if next_elem is not None:
                 href = next_elem.get('href')
                 if href:
+                    self.registry.record('next_page_url', selector, True)
                     if href.startswith('/'):
                         return 'https://www.avito.ru' + href
                     return href
+            self.registry.record('next_page_url', selector, False)
         
         return None
     
+    @_in_region('detail')
+    def is_listing_removed(self) -> bool:
+        """
+        Проверка, снято ли объявление с публикации
+        
+        Returns:
+            True если на странице есть предупреждение о снятии объявления
+        """
+        for selector in self.registry.chain('removed'):
+            if self._select_one(selector) is not None:
+                self.registry.record('removed', selector, True)
+                return True
+            self.registry.record('removed', selector, False)
+        
+        return False
+    
+    @_in_region('detail')
     def parse_apartment_detail(self, url: str) -> Dict[str, Optional[str]]:
         """
         Парсинг детальной страницы объявления
@@ -267,74 +733,76 @@ class AvitoHTMLParser:
             'owner_url': None
         }
         
+        # Быстрый путь: поля из встроенного JSON-состояния без построения DOM
+        if config.JSON_STATE:
+            data.update(parse_detail_state(self.html_content, url))
+        
+        # Остальные поля извлекаются из DOM
         # Извлечение заголовка
-        data['title'] = self._extract_detail_title()
+        if data['title'] is None:
+            data['title'] = self._extract_detail_title()
         
         # Извлечение цены
-        data['price'] = self._extract_detail_price()
+        if data['price'] is None:
+            data['price'] = self._extract_detail_price()
         
         # Извлечение медиа (первые 3 фото/видео)
-        media_urls = self._extract_media_urls()
-        if len(media_urls) > 0:
-            data['media_url_1'] = media_urls[0]
-        if len(media_urls) > 1:
-            data['media_url_2'] = media_urls[1]
-        if len(media_urls) > 2:
-            data['media_url_3'] = media_urls[2]
+        if data['media_url_1'] is None:
+            media_urls = self._extract_media_urls()
+            if len(media_urls) > 0:
+                data['media_url_1'] = media_urls[0]
+            if len(media_urls) > 1:
+                data['media_url_2'] = media_urls[1]
+            if len(media_urls) > 2:
+                data['media_url_3'] = media_urls[2]
         
         # Извлечение информации о квартире
-        data['about_apartment'] = self._extract_about_apartment()
+        if data['about_apartment'] is None:
+            data['about_apartment'] = self._extract_about_apartment()
         
         # Извлечение правил
-        data['rules'] = self._extract_rules()
+        if data['rules'] is None:
+            data['rules'] = self._extract_rules()
         
         # Извлечение адреса
-        data['address'] = self._extract_address()
+        if data['address'] is None:
+            data['address'] = self._extract_address()
         
         # Извлечение описания
-        data['description'] = self._extract_description()
+        if data['description'] is None:
+            data['description'] = self._extract_description()
         
         # Извлечение информации о владельце
-        owner_info = self._extract_owner_info()
-        data['owner_name'] = owner_info.get('name')
-        data['owner_url'] = owner_info.get('url')
+        if data['owner_name'] is None or data['owner_url'] is None:
+            owner_info = self._extract_owner_info()
+            data['owner_name'] = data['owner_name'] or owner_info.get('name')
+            data['owner_url'] = data['owner_url'] or owner_info.get('url')
         
         return data
     
     def _extract_detail_title(self) -> Optional[str]:
         """Извлечение заголовка со страницы объявления"""
-        title_selectors = [
-            'h1[data-marker="item-view/title-info"]',
-            'h1[itemprop="name"]',
-            'h1.title-info-title',
-            'span[class*="title"]',
-            'h1'
-        ]
-        
-        for selector in title_selectors:
-            elem = self.soup.select_one(selector)
-            if elem:
-                title = elem.get_text(strip=True)
+        for selector in self.registry.chain('detail_title'):
+            elem = self._select_one(selector)
+            if elem is not None:
+                title = self._get_text(elem)
                 if title:
+                    self.registry.record('detail_title', selector, True)
                     return title
+            self.registry.record('detail_title', selector, False)
         
         return None
     
     def _extract_detail_price(self) -> Optional[str]:
         """Извлечение цены со страницы объявления"""
-        price_selectors = [
-            'span[data-marker="item-view/item-price"]',
-            'span[itemprop="price"]',
-            'span[class*="price"]',
-            '[class*="item-price"]'
-        ]
-        
-        for selector in price_selectors:
-            elem = self.soup.select_one(selector)
-            if elem:
-                price = elem.get_text(strip=True)
+        for selector in self.registry.chain('detail_price'):
+            elem = self._select_one(selector)
+            if elem is not None:
+                price = self._get_text(elem)
                 if price:
+                    self.registry.record('detail_price', selector, True)
                     return price
+            self.registry.record('detail_price', selector, False)
         
         return None
     
@@ -343,16 +811,9 @@ class AvitoHTMLParser:
         media_urls = []
         
         # Поиск галереи изображений
-        img_selectors = [
-            'div[data-marker="image-frame/image-wrapper"] img',
-            'div[class*="gallery"] img',
-            'img[itemprop="image"]',
-            'div[class*="image"] img',
-            'li[class*="image"] img'
-        ]
-        
-        for selector in img_selectors:
-            images = self.soup.select(selector)
+        for selector in self.registry.chain('media'):
+            images = self._select(selector)
+            found = len(media_urls)
             for img in images[:3]:  # Берем только первые 3
                 src = img.get('src') or img.get('data-src')
                 if src:
@@ -365,88 +826,168 @@ class AvitoHTMLParser:
                         media_urls.append(src)
                     
                     if len(media_urls) >= 3:
+                        self.registry.record('media', selector, True)
                         return media_urls
+            self.registry.record('media', selector, len(media_urls) > found)
         
         return media_urls
     
     def _extract_about_apartment(self) -> Optional[str]:
         """Извлечение информации о квартире"""
         # Поиск блока с параметрами квартиры
-        params_selectors = [
-            'ul[class*="params"]',
-            'div[class*="params"]',
-            'ul[data-marker="item-view/item-params"]'
-        ]
-        
-        for selector in params_selectors:
-            params_block = self.soup.select_one(selector)
-            if params_block:
+        for selector in self.registry.chain('about'):
+            params_block = self._select_one(selector)
+            if params_block is not None:
                 params = []
-                items = params_block.find_all('li')
+                items = self._select(SELECTORS['about_item'][0], params_block)
                 for item in items:
-                    text = item.get_text(strip=True)
+                    text = self._get_text(item)
                     if text:
                         params.append(text)
                 
                 if params:
+                    self.registry.record('about', selector, True)
                     return ' | '.join(params)
+            self.registry.record('about', selector, False)
         
         return None
     
+    def _iter_text_events(self) -> Iterator[Tuple[str, object]]:
+        """
+        Обход всей страницы за один проход
+        
+        Yields:
+            Кортежи в порядке документа: ('start', тег), ('text', фрагмент)
+            и ('end', входит ли текст элемента в текст родителя). Фрагменты
+            обрезаны по краям и учитываются по тем же правилам, что в
+            get_text(strip=True) и _lxml_text()
+        """
+        if self.backend == 'lxml':
+            root = self.tree.getroot()
+            yield 'start', root.tag
+            if root.text and root.text.strip():
+                yield 'text', root.text.strip()
+            stack = [(root, iter(root))]
+            while stack:
+                elem, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    yield 'end', elem.tag not in TEXT_EXCLUDED_TAGS
+                    if stack and elem.tail and elem.tail.strip():
+                        yield 'text', elem.tail.strip()
+                    continue
+                
+                if not isinstance(child.tag, str):
+                    # Комментарий: учитывается только текст после него
+                    if child.tail and child.tail.strip():
+                        yield 'text', child.tail.strip()
+                    continue
+                
+                yield 'start', child.tag
+                if child.text and child.text.strip():
+                    yield 'text', child.text.strip()
+                stack.append((child, iter(child)))
+            return
+        
+        # В BeautifulSoup текст script, style и т.п. имеет отдельные типы строк
+        stack = [(self.soup, iter(self.soup.contents))]
+        while stack:
+            elem, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    yield 'end', True
+                continue
+            
+            if isinstance(child, Tag):
+                yield 'start', child.name
+                stack.append((child, iter(child.contents)))
+            elif type(child) in (NavigableString, CData):
+                text = child.strip()
+                if text:
+                    yield 'text', text
+    
+    @_in_region(None)
     def _extract_rules(self) -> Optional[str]:
-        """Извлечение правил проживания"""
-        # Поиск блока с правилами
-        rules_keywords = ['правил', 'условия', 'можно', 'нельзя']
+        """
+        Извлечение правил проживания
         
-        # Ищем в описании или отдельных блоках
-        all_text_blocks = self.soup.find_all(['p', 'div', 'span'])
+        Берутся первые блоки p/div/span (в порядке документа), текст
+        которых содержит ключевое слово и имеет длину 10..500 символов.
+        Страница обходится один раз: текст каждого элемента собирается
+        из текста потомков, пока не превысит RULES_MAX_LENGTH. Блоки
+        правил бывают и вне item-view (например, в подвале), поэтому
+        в режиме restricted обходится дерево всей страницы.
+        """
+        rules_blocks = []
+        # Открытые элементы: [тег, фрагменты текста или None, длина текста, номер]
+        stack = []
+        position = 0
         
-        rules_texts = []
-        for block in all_text_blocks:
-            text = block.get_text(strip=True)
-            if text and any(keyword in text.lower() for keyword in rules_keywords):
-                if len(text) > 10 and len(text) < 500:  # Фильтр по длине
-                    rules_texts.append(text)
+        for event, value in self._iter_text_events():
+            if event == 'start':
+                stack.append([value, [], 0, position])
+                position += 1
+                continue
+            
+            if event == 'text':
+                if stack:
+                    self._append_block_text(stack[-1], value, len(value))
+                continue
+            
+            tag, parts, length, block_position = stack.pop()
+            text = ''.join(parts) if parts is not None else None
+            if (text and tag in RULES_BLOCK_TAGS
+                    and RULES_MIN_LENGTH < length < RULES_MAX_LENGTH):
+                lowered = text.lower()
+                if any(keyword in lowered for keyword in RULES_KEYWORDS):
+                    rules_blocks.append((block_position, text))
+            if stack and length and value:
+                self._append_block_text(stack[-1], text, length)
         
-        if rules_texts:
-            return ' | '.join(rules_texts[:3])  # Берем первые 3
+        if rules_blocks:
+            rules_blocks.sort()
+            return ' | '.join(text for _, text in rules_blocks[:RULES_MAX_BLOCKS])
         
         return None
     
+    @staticmethod
+    def _append_block_text(frame: list, text: Optional[str], length: int) -> None:
+        """Добавление текста к открытому элементу (не длиннее RULES_MAX_LENGTH)"""
+        frame[2] += length
+        if frame[1] is None:
+            return
+        if text is None or frame[2] >= RULES_MAX_LENGTH:
+            # Длинный текст не подходит под правила - дальше не собирается
+            frame[1] = None
+        else:
+            frame[1].append(text)
+    
     def _extract_address(self) -> Optional[str]:
         """Извлечение адреса"""
-        address_selectors = [
-            'span[class*="geo-root"]',
-            'div[class*="item-address"]',
-            'span[itemprop="address"]',
-            '[data-marker="item-view/item-address"]',
-            'div[class*="location"]'
-        ]
-        
-        for selector in address_selectors:
-            elem = self.soup.select_one(selector)
-            if elem:
-                address = elem.get_text(strip=True)
+        for selector in self.registry.chain('address'):
+            elem = self._select_one(selector)
+            if elem is not None:
+                address = self._get_text(elem)
                 if address:
+                    self.registry.record('address', selector, True)
                     return address
+            self.registry.record('address', selector, False)
         
         return None
     
     def _extract_description(self) -> Optional[str]:
         """Извлечение описания объявления"""
-        desc_selectors = [
-            'div[data-marker="item-view/item-description"]',
-            'div[itemprop="description"]',
-            'div[class*="item-description"]',
-            'p[class*="description"]'
-        ]
-        
-        for selector in desc_selectors:
-            elem = self.soup.select_one(selector)
-            if elem:
-                description = elem.get_text(strip=True)
+        for selector in self.registry.chain('description'):
+            elem = self._select_one(selector)
+            if elem is not None:
+                description = self._get_text(elem)
                 if description:
+                    self.registry.record('description', selector, True)
                     return description
+            self.registry.record('description', selector, False)
         
         return None
     
@@ -458,23 +999,17 @@ class AvitoHTMLParser:
         }
         
         # Поиск блока с информацией о продавце
-        seller_selectors = [
-            'div[data-marker="seller-info"]',
-            'div[class*="seller"]',
-            'a[class*="seller"]'
-        ]
-        
-        for selector in seller_selectors:
-            seller_block = self.soup.select_one(selector)
-            if seller_block:
+        for selector in self.registry.chain('seller'):
+            seller_block = self._select_one(selector)
+            if seller_block is not None:
                 # Извлечение имени
-                name_elem = seller_block.find(['span', 'div', 'a'])
-                if name_elem:
-                    owner_info['name'] = name_elem.get_text(strip=True)
+                name_elem = self._select_one(SELECTORS['seller_name'][0], seller_block)
+                if name_elem is not None:
+                    owner_info['name'] = self._get_text(name_elem)
                 
                 # Извлечение ссылки на профиль
-                link_elem = seller_block.find('a', href=True)
-                if link_elem:
+                link_elem = self._select_one(SELECTORS['seller_link'][0], seller_block)
+                if link_elem is not None:
                     href = link_elem.get('href')
                     if href:
                         if href.startswith('/'):
@@ -483,6 +1018,8 @@ class AvitoHTMLParser:
                             owner_info['url'] = href
                 
                 if owner_info['name']:
+                    self.registry.record('seller', selector, True)
                     break
+            self.registry.record('seller', selector, False)
         
         return owner_info
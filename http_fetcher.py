@@ -0,0 +1,281 @@
+import os
+import time
+import pickle
+from typing import Optional, List, Dict, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from scraper import AvitoScraper, USER_AGENT, FIXED_WAIT_BASELINE
+import config
+
+
+# Фрагменты HTML, по которым страница считается полностью отданной сервером
+PAGE_CONTENT_MARKERS: Dict[str, str] = {
+    'catalog': 'data-marker="item"',
+    'detail': 'data-marker="item-view/title-info"',
+}
+
+# Признаки страницы блокировки или проверки "я не робот". Проверяются, только
+# если в ответе нет нужных парсеру элементов: обычные страницы тоже могут
+# подключать скрипт капчи или упоминать ее в тексте
+BLOCK_PAGE_MARKERS = [
+    'firewall-title',
+    'Доступ ограничен',
+    'Доступ с вашего IP-адреса временно ограничен',
+    'captcha',
+    'geetest',
+]
+
+# HTTP-статусы, означающие блокировку
+BLOCK_STATUS_CODES = (403, 429)
+
+# Признак страницы объявления, снятого с публикации
+REMOVED_PAGE_MARKER = 'data-marker="item-view/closed-warning"'
+
+
+class AvitoHTTPFetcher:
+    """
+    Загрузка страниц Avito через HTTP без запуска браузера
+    
+    Повторяет интерфейс AvitoScraper (navigate_to_page, get_page_source,
+    load_cookies, контекстный менеджер), поэтому может использоваться
+    вместо него на этапе 2. Если сервер отдает страницу блокировки,
+    страница загружается через браузер, который запускается только
+    при первой такой необходимости.
+    """
+    
+    def __init__(self, headless: bool = True, cookies_file: str = "avito_cookies.pkl",
+                 page_ready_timeout: Optional[float] = None, pool_size: int = 10):
+        """
+        Инициализация HTTP-клиента
+        
+        Args:
+            headless: Режим браузера для резервной загрузки
+            cookies_file: Путь к файлу с куки (общий с AvitoScraper)
+            page_ready_timeout: Таймаут для резервного браузера
+            pool_size: Размер пула keep-alive соединений
+        """
+        self.headless = headless
+        self.cookies_file = cookies_file
+        self.page_ready_timeout = page_ready_timeout
+        self.pool_size = pool_size
+        self.timeout = config.HTTP_TIMEOUT
+        self.session: Optional[requests.Session] = None
+        self.fallback: Optional[AvitoScraper] = None
+        self._page_source: Optional[str] = None
+        # Журнал загрузок: url, page_type, waited, ready, fallback
+        self.wait_log: List[Dict] = []
+    
+    def setup_driver(self) -> None:
+        """Создание HTTP-сессии с пулом соединений"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+        })
+        print("✓ HTTP-клиент готов")
+    
+    def load_cookies(self) -> bool:
+        """
+        Загрузка куки, сохраненных браузером
+        
+        Returns:
+            True если куки загружены успешно, False иначе
+        """
+        if not os.path.exists(self.cookies_file):
+            return False
+        
+        try:
+            with open(self.cookies_file, 'rb') as f:
+                cookies = pickle.load(f)
+            
+            for cookie in cookies:
+                self.session.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/')
+                )
+            
+            print("Куки успешно загружены")
+            return True
+        except Exception as e:
+            print(f"Ошибка при загрузке куки: {e}")
+            return False
+    
+    def save_cookies(self) -> None:
+        """Куки сохраняет только браузер, HTTP-клиент их не перезаписывает"""
+        if self.fallback and self.fallback.driver:
+            self.fallback.save_cookies()
+    
+    def fetch(self, url: str) -> Tuple[int, str]:
+        """
+        Загрузка страницы по HTTP
+        
+        Args:
+            url: URL страницы
+            
+        Returns:
+            Кортеж (HTTP-статус, HTML код)
+        """
+        if not self.session:
+            raise Exception("HTTP-клиент не инициализирован")
+        
+        response = self.session.get(url, timeout=self.timeout)
+        return response.status_code, response.text
+    
+    def is_blocked(self, status_code: int, html_content: str,
+                   page_type: Optional[str] = None) -> bool:
+        """
+        Проверка, похож ли ответ на блокировку или страницу проверки
+        
+        Args:
+            status_code: HTTP-статус ответа
+            html_content: HTML код ответа
+            page_type: Тип страницы ('catalog' или 'detail')
+            
+        Returns:
+            True если страницу нужно загрузить через браузер
+        """
+        if status_code in BLOCK_STATUS_CODES:
+            return True
+        
+        # Страница снятого с публикации объявления или с нужными парсеру
+        # элементами - не блокировка, даже если на ней есть слово captcha
+        if REMOVED_PAGE_MARKER in html_content:
+            return False
+        content_marker = PAGE_CONTENT_MARKERS.get(page_type) if page_type else None
+        if content_marker and content_marker in html_content:
+            return False
+        
+        if any(marker in html_content for marker in BLOCK_PAGE_MARKERS):
+            return True
+        
+        # Нужные парсеру элементы отсутствуют в отданном HTML
+        return bool(status_code == 200 and content_marker)
+    
+    def navigate_to_page(self, url: str, page_type: Optional[str] = None) -> bool:
+        """
+        Загрузка страницы (через HTTP, при блокировке - через браузер)
+        
+        Args:
+            url: URL страницы
+            page_type: Тип страницы ('catalog' или 'detail')
+            
+        Returns:
+            True если страница загружена, False иначе
+        """
+        print(f"Загрузка страницы: {url}")
+        self._page_source = None
+        started = time.monotonic()
+        
+        try:
+            status_code, html_content = self.fetch(url)
+        except requests.RequestException as e:
+            print(f"Ошибка HTTP-запроса: {e}")
+            status_code, html_content = 0, ""
+        
+        if status_code and not self.is_blocked(status_code, html_content, page_type):
+            self._page_source = html_content
+            self._log(url, page_type, started, fallback=False)
+            return True
+        
+        print("⚠ Ответ похож на блокировку, загрузка через браузер...")
+        if not self._ensure_fallback():
+            self._log(url, page_type, started, fallback=True)
+            return False
+        
+        loaded = self.fallback.navigate_to_page(url, page_type=page_type)
+        if loaded:
+            self._page_source = self.fallback.get_page_source()
+        self._log(url, page_type, started, fallback=True)
+        return loaded
+    
+    def _ensure_fallback(self) -> bool:
+        """Запуск резервного браузера при первой необходимости"""
+        if self.fallback and self.fallback.driver:
+            return True
+        
+        try:
+            self.fallback = AvitoScraper(
+                headless=self.headless,
+                cookies_file=self.cookies_file,
+                page_ready_timeout=self.page_ready_timeout
+            )
+            self.fallback.setup_driver()
+            self.fallback.load_cookies()
+            return True
+        except Exception as e:
+            print(f"✗ Не удалось запустить резервный браузер: {e}")
+            return False
+    
+    def _log(self, url: str, page_type: Optional[str], started: float, fallback: bool) -> None:
+        """Запись загрузки страницы в журнал"""
+        self.wait_log.append({
+            'url': url,
+            'page_type': page_type,
+            'waited': time.monotonic() - started,
+            'ready': self._page_source is not None,
+            'fallback': fallback
+        })
+    
+    def get_page_source(self) -> str:
+        """
+        Получение HTML кода последней загруженной страницы
+        
+        Returns:
+            HTML код страницы
+        """
+        if self._page_source is None:
+            raise Exception("Страница не загружена")
+        
+        return self._page_source
+    
+    def scroll_to_bottom(self, target_count: Optional[int] = None) -> int:
+        """HTML уже получен целиком, прокрутка не требуется"""
+        return 0
+    
+    def get_wait_summary(self) -> Dict[str, float]:
+        """
+        Сводка по времени загрузки страниц
+        
+        Returns:
+            Словарь в формате AvitoScraper.get_wait_summary
+            и количество загрузок через браузер (fallbacks)
+        """
+        waited = sum(entry['waited'] for entry in self.wait_log)
+        baseline = sum(FIXED_WAIT_BASELINE.get(entry['page_type'], 0.0)
+                       for entry in self.wait_log)
+        return {
+            'pages': len(self.wait_log),
+            'not_ready': sum(1 for entry in self.wait_log if not entry['ready']),
+            'waited': waited,
+            'baseline': baseline,
+            'saved': baseline - waited,
+            'fallbacks': sum(1 for entry in self.wait_log if entry['fallback'])
+        }
+    
+    def get_blocking_summary(self) -> Optional[Dict[str, float]]:
+        """Второстепенные ресурсы по HTTP не загружаются, блокировка не нужна"""
+        return None
+    
+    def close(self) -> None:
+        """Закрытие HTTP-сессии и резервного браузера"""
+        if self.session:
+            self.session.close()
+            self.session = None
+        if self.fallback:
+            self.fallback.close()
+            self.fallback = None
+    
+    def __enter__(self):
+        """Контекстный менеджер - вход"""
+        self.setup_driver()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Контекстный менеджер - выход"""
+        self.close()
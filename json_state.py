@@ -0,0 +1,283 @@
+import re
+import json
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+from normalize import parse_district
+
+
+# Переменные, в которые страница Avito записывает начальное состояние
+STATE_MARKERS = [
+    'window.__initialData__',
+    'window.__preloadedState__',
+]
+
+# Пути к полям объявления внутри состояния (пробуются по порядку)
+STATE_FIELDS: Dict[str, List[tuple]] = {
+    'title': [('title',)],
+    'price': [('priceDetailed', 'string'), ('priceFormatted',), ('price', 'string')],
+    'media': [('images',), ('imageUrls',)],
+    'about_apartment': [('params',), ('paramsBlock', 'items')],
+    'rules': [('houseRules',), ('rules',)],
+    'address': [('address', 'full'), ('address',), ('location', 'address')],
+    'district': [('geoReferences',), ('location', 'geoReferences'), ('location', 'district')],
+    'description': [('description',)],
+    'owner_name': [('seller', 'name'), ('sellerInfo', 'name')],
+    'owner_url': [('seller', 'profileUrl'), ('seller', 'url'), ('sellerInfo', 'profileUrl')],
+}
+
+# Ключи, по которым словарь в состоянии опознается как объявление
+ITEM_KEYS = ('priceDetailed', 'price', 'description', 'address', 'images')
+
+# Путь к самому объявлению в состоянии детальной страницы (рядом лежат
+# похожие объявления, поэтому без ID объявление ищется только по нему)
+ITEM_PATH = ('buyerItem', 'item')
+
+# ID объявления в конце URL: ..._3456789001
+ITEM_ID_PATTERN = re.compile(r'_(\d+)(?:[?#/]|$)')
+
+_decoder = json.JSONDecoder()
+
+
+def extract_state(html_content: str) -> Optional[Any]:
+    """
+    Поиск и декодирование встроенного в страницу JSON-состояния
+    
+    Страница не разбирается в DOM: ищется присваивание одной из
+    переменных STATE_MARKERS и декодируется только его значение -
+    JSON-объект или строка с JSON (в том числе URL-кодированным).
+    
+    Args:
+        html_content: HTML код страницы
+        
+    Returns:
+        Декодированное состояние или None
+    """
+    for marker in STATE_MARKERS:
+        position = html_content.find(marker)
+        while position != -1:
+            state = _decode_assignment(html_content, position + len(marker))
+            if state is not None:
+                return state
+            position = html_content.find(marker, position + len(marker))
+    
+    return None
+
+
+def _decode_assignment(html_content: str, position: int) -> Optional[Any]:
+    """Декодирование значения после 'маркер =' (None если это не присваивание)"""
+    length = len(html_content)
+    while position < length and html_content[position] in ' \t\r\n':
+        position += 1
+    if position >= length or html_content[position] != '=' or html_content[position:position + 2] == '==':
+        return None
+    position += 1
+    while position < length and html_content[position] in ' \t\r\n':
+        position += 1
+    
+    try:
+        value, _ = _decoder.raw_decode(html_content, position)
+    except ValueError:
+        return None
+    
+    if isinstance(value, str):
+        # Состояние записано строкой, часто URL-кодированной
+        text = value.strip()
+        if text.startswith('%'):
+            text = unquote(text)
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return None
+    
+    return value if isinstance(value, (dict, list)) else None
+
+
+def find_item(state: Any, item_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    Поиск данных объявления в состоянии
+    
+    Args:
+        state: Декодированное состояние страницы
+        item_id: ID объявления (None - только объект по пути ITEM_PATH)
+        
+    Returns:
+        Словарь объявления или None
+    """
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if item_id is None:
+                item = _get_path(node, ITEM_PATH)
+                if _is_item(item):
+                    return item
+            elif _is_item(node) and str(node.get('id')) == item_id:
+                # Похожие объявления тоже лежат в состоянии - сверяем id
+                return node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    
+    return None
+
+
+def _is_item(node: Any) -> bool:
+    """Похож ли словарь на объявление (заголовок и один из ITEM_KEYS)"""
+    return (isinstance(node, dict) and isinstance(node.get('title'), str)
+            and any(key in node for key in ITEM_KEYS))
+
+
+def _get_path(item: Dict, path: tuple) -> Any:
+    """Значение по пути ключей или None"""
+    value: Any = item
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _absolute_url(url: str) -> str:
+    """Преобразование относительных URL в абсолютные"""
+    if url.startswith('//'):
+        return 'https:' + url
+    if url.startswith('/'):
+        return 'https://www.avito.ru' + url
+    return url
+
+
+def _media_urls(images: Any) -> List[str]:
+    """Первые 3 URL изображений (из строк или словарей размер -> URL)"""
+    media_urls = []
+    if not isinstance(images, list):
+        return media_urls
+    
+    for image in images:
+        if isinstance(image, dict):
+            # Самый большой из доступных размеров ('640x480' и т.п.)
+            sizes = [key for key, value in image.items() if isinstance(value, str)]
+            sizes.sort(key=lambda size: [int(n) for n in re.findall(r'\d+', size)] or [0])
+            image = image[sizes[-1]] if sizes else None
+        if isinstance(image, str) and image:
+            url = _absolute_url(image)
+            if url not in media_urls:
+                media_urls.append(url)
+        if len(media_urls) >= 3:
+            break
+    
+    return media_urls
+
+
+def _params_text(params: Any) -> Optional[str]:
+    """Параметры квартиры в формате DOM-парсера: 'Название:значение | ...'"""
+    if not isinstance(params, list):
+        return None
+    
+    texts = []
+    for param in params:
+        if isinstance(param, dict):
+            name = str(param.get('title') or param.get('name') or '').strip()
+            value = str(param.get('description') or param.get('value') or '').strip()
+            if name and value:
+                texts.append(f"{name.rstrip(':')}:{value}")
+            elif name or value:
+                texts.append(name or value)
+        elif isinstance(param, str) and param.strip():
+            texts.append(param.strip())
+    
+    return ' | '.join(texts) if texts else None
+
+
+def _district_text(references: Any) -> Optional[str]:
+    """
+    Район в формате DOM-парсера ("р-н Центральный") из geoReferences
+    (список строк или словарей с 'content') или названия района
+    """
+    if isinstance(references, list):
+        for reference in references:
+            if isinstance(reference, dict):
+                reference = reference.get('content') or reference.get('name')
+            reference = _text(reference)
+            if reference and parse_district(reference):
+                return reference
+        return None
+    
+    district = _text(references)
+    if district and not parse_district(district):
+        district = f"р-н {district}"
+    return district
+
+
+def _text(value: Any) -> Optional[str]:
+    """Строковое значение поля или None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def parse_detail_state(html_content: str, url: str) -> Dict[str, Optional[str]]:
+    """
+    Данные объявления из встроенного JSON-состояния
+    
+    Args:
+        html_content: HTML код детальной страницы
+        url: URL объявления
+        
+    Returns:
+        Словарь с ключами AvitoHTMLParser.parse_apartment_detail (кроме 'url');
+        поля, которых нет в состоянии, не включаются
+    """
+    state = extract_state(html_content)
+    if state is None:
+        return {}
+    
+    match = ITEM_ID_PATTERN.search(url or '')
+    item = find_item(state, match.group(1) if match else None)
+    if item is None:
+        return {}
+    
+    def first(field: str) -> Any:
+        for path in STATE_FIELDS[field]:
+            value = _get_path(item, path)
+            if value not in (None, '', [], {}):
+                return value
+        return None
+    
+    data: Dict[str, Optional[str]] = {}
+    
+    for field in ('title', 'price', 'description', 'owner_name'):
+        value = _text(first(field))
+        if value:
+            data[field] = value
+    
+    # Адрес в DOM заканчивается районом ("..., 15р-н Центральный"), из него
+    # заполняется столбец district; без района в состоянии адрес берется из DOM
+    address = _text(first('address'))
+    district = _district_text(first('district'))
+    if address and not parse_district(address) and district:
+        address += district
+    if address and parse_district(address):
+        data['address'] = address
+    
+    owner_url = _text(first('owner_url'))
+    if owner_url:
+        data['owner_url'] = _absolute_url(owner_url)
+    
+    media_urls = _media_urls(first('media'))
+    for index, media_url in enumerate(media_urls, start=1):
+        data[f'media_url_{index}'] = media_url
+    
+    about = _params_text(first('about_apartment'))
+    if about:
+        data['about_apartment'] = about
+    
+    rules = first('rules')
+    if isinstance(rules, list):
+        rules = ' | '.join(str(rule).strip() for rule in rules[:3] if str(rule).strip())
+    rules = _text(rules)
+    if rules:
+        data['rules'] = rules
+    
+    return data
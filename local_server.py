@@ -0,0 +1,170 @@
+"""
+Локальная замена Avito для проверки парсера без доступа к сайту
+
+Отдает сохраненные HTML страницы из каталога fixtures/:
+- /volgograd/kvartiry/..._<id>  ->  detail_<id>.html
+- остальные пути в /volgograd/  ->  catalog.html
+- /<файл>.html                   ->  файл как есть
+
+Пример:
+    python local_server.py --port 8000 --delay 0.2
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+# ID объявления в конце URL детальной страницы
+ITEM_ID_PATTERN = re.compile(r'_(\d+)$')
+
+
+class LocalAvitoServer:
+    """HTTP-сервер, отдающий сохраненные страницы Avito"""
+    
+    def __init__(self, fixtures_dir: str = "fixtures", host: str = "127.0.0.1",
+                 port: int = 0, delay: float = 0.0):
+        """
+        Инициализация сервера
+        
+        Args:
+            fixtures_dir: Каталог с сохраненными HTML страницами
+            host: Адрес для прослушивания
+            port: Порт (0 - выбрать свободный)
+            delay: Искусственная задержка ответа в секундах (имитация сети)
+        """
+        self.fixtures_dir = os.path.abspath(fixtures_dir)
+        self.delay = delay
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+    
+    @property
+    def base_url(self) -> str:
+        """Базовый URL сервера"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def url(self, path: str) -> str:
+        """
+        Преобразование пути или URL Avito в URL локального сервера
+        
+        Args:
+            path: Путь ('/volgograd/...') или полный URL https://www.avito.ru/...
+            
+        Returns:
+            URL на локальном сервере
+        """
+        parts = urlsplit(path)
+        local_path = parts.path or '/'
+        if parts.query:
+            local_path += '?' + parts.query
+        return self.base_url + local_path
+    
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        Поиск файла для запрошенного пути
+        
+        Args:
+            path: Путь запроса без query-строки
+            
+        Returns:
+            Путь к HTML файлу или None
+        """
+        name = os.path.basename(path.rstrip('/'))
+        
+        candidate = os.path.join(self.fixtures_dir, name)
+        if name.endswith('.html') and os.path.isfile(candidate):
+            return candidate
+        
+        match = ITEM_ID_PATTERN.search(name)
+        if match:
+            candidate = os.path.join(self.fixtures_dir, f"detail_{match.group(1)}.html")
+            return candidate if os.path.isfile(candidate) else None
+        
+        if path.startswith('/volgograd/'):
+            candidate = os.path.join(self.fixtures_dir, "catalog.html")
+            return candidate if os.path.isfile(candidate) else None
+        
+        return None
+    
+    def _make_handler(self):
+        """Создание класса-обработчика, связанного с этим сервером"""
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.delay:
+                    time.sleep(server.delay)
+                
+                with server._lock:
+                    server.requests_served += 1
+                
+                file_path = server.resolve(urlsplit(self.path).path)
+                if not file_path:
+                    self.send_error(404)
+                    return
+                
+                with open(file_path, 'rb') as f:
+                    body = f.read()
+                
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                # Не засоряем вывод парсера журналом запросов
+                pass
+        
+        return Handler
+    
+    def start(self) -> None:
+        """Запуск сервера в фоновом потоке"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Остановка сервера"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        """Контекстный менеджер - вход"""
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Контекстный менеджер - выход"""
+        self.stop()
+
+
+def main():
+    """Запуск сервера из командной строки"""
+    arg_parser = argparse.ArgumentParser(description="Локальный сервер сохраненных страниц Avito")
+    arg_parser.add_argument("--dir", default="fixtures", help="Каталог с HTML страницами")
+    arg_parser.add_argument("--port", type=int, default=8000, help="Порт")
+    arg_parser.add_argument("--delay", type=float, default=0.0, help="Задержка ответа (сек)")
+    args = arg_parser.parse_args()
+    
+    server = LocalAvitoServer(args.dir, port=args.port, delay=args.delay)
+    print(f"Сервер запущен: {server.base_url} (страницы из {server.fixtures_dir})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nСервер остановлен")
+        server.httpd.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
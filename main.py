@@ -1,25 +1,151 @@
 import time
 import sys
-from typing import List, Dict, Optional
+import math
+import queue
+import asyncio
+from contextlib import contextmanager
+import threading
+from typing import List, Dict, Optional, Callable, Tuple, Iterator
 from scraper import AvitoScraper
-from html_parser import AvitoHTMLParser
-from db import DatabaseManager
+from http_fetcher import AvitoHTTPFetcher
+from async_crawler import AsyncCrawler
+from html_parser import AvitoHTMLParser, get_selector_registry
+from html_archive import HTMLArchive
+from recrawl_scheduler import RecrawlScheduler
+from parse_pipeline import ParsePipeline, parse_detail_page
+from db import DatabaseManager, BufferedWriter
+from report import build_report, print_report
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import config
+
+
+class WorkerStats:
+    """Статистика одного воркера этапа 2"""
+    
+    def __init__(self, worker_id: int):
+        """
+        Инициализация статистики
+        
+        Args:
+            worker_id: Номер воркера
+        """
+        self.worker_id = worker_id
+        self.processed = 0
+        self.saved = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        # Сводка ожидания готовности страниц (AvitoScraper.get_wait_summary)
+        self.wait_summary: Optional[Dict[str, float]] = None
+        # Сводка блокировки ресурсов (AvitoScraper.get_blocking_summary)
+        self.blocking_summary: Optional[Dict[str, float]] = None
+    
+    def record(self, status: str) -> None:
+        """
+        Учет результата обработки одной ссылки
+        
+        Args:
+            status: 'saved' или 'failed'
+        """
+        self.processed += 1
+        if status == 'saved':
+            self.saved += 1
+        elif status == 'failed':
+            self.failed += 1
+    
+    @property
+    def elapsed(self) -> float:
+        """Время работы воркера в секундах"""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+    
+    @property
+    def pages_per_minute(self) -> float:
+        """Пропускная способность воркера (страниц в минуту)"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.processed / self.elapsed * 60
+
+
+class LinkFeed:
+    """
+    Очередь ссылок этапа 2, общая для воркеров
+    
+    Ссылки берутся из DatabaseManager.iter_claimed_links, который
+    арендует их в БД пачками, поэтому очередь не хранится в памяти
+    целиком, а другие процессы с той же БД не получат те же ссылки.
+    """
+    
+    def __init__(self, links: Iterator[Tuple[int, str]]):
+        """
+        Инициализация очереди
+        
+        Args:
+            links: Итератор кортежей (id ссылки, url)
+        """
+        self._links = links
+        self._lock = threading.Lock()
+        self.issued = 0
+    
+    def get_nowait(self) -> Tuple[int, int, str]:
+        """
+        Следующая ссылка
+        
+        Returns:
+            Кортеж (номер, id ссылки, url)
+            
+        Raises:
+            queue.Empty: Непарсенных ссылок больше нет
+        """
+        with self._lock:
+            try:
+                link_id, url = next(self._links)
+            except StopIteration:
+                raise queue.Empty
+            self.issued += 1
+            return self.issued, link_id, url
 
 
 class AvitoBot:
     """Основной класс для парсинга Avito"""
     
-    def __init__(self, db_path: str = "avito_data.db", headless: bool = True):
+    def __init__(self, db_path: str = "avito_data.db", headless: bool = True,
+                 workers: Optional[int] = None, fetch_mode: Optional[str] = None,
+                 warm_start: Optional[bool] = None, archive_dir: Optional[str] = None):
         """
         Инициализация бота
         
         Args:
             db_path: Путь к базе данных
             headless: Запуск браузера в фоновом режиме
+            workers: Количество параллельных браузеров на этапе 2
+                     (по умолчанию config.DETAIL_WORKERS)
+            fetch_mode: Загрузка детальных страниц: 'browser' или 'http'
+                        (по умолчанию config.FETCH_MODE)
+            warm_start: Постоянный профиль Chrome и один браузер на оба этапа
+                        (по умолчанию config.WARM_START)
+            archive_dir: Каталог архива загруженных страниц
+                         (по умолчанию config.ARCHIVE_DIR, пустая строка - без архива)
         """
         self.db_manager = DatabaseManager(db_path)
         self.headless = headless
+        self.workers = max(1, workers if workers is not None else config.DETAIL_WORKERS)
+        self.fetch_mode = fetch_mode or config.FETCH_MODE
+        if self.fetch_mode not in ('browser', 'http'):
+            raise ValueError(f"Неизвестный режим загрузки: {self.fetch_mode}")
+        # Запись в БД из нескольких потоков выполняется последовательно
+        self._db_lock = threading.Lock()
+        self.warm_start = config.WARM_START if warm_start is None else warm_start
+        # Общий браузер этапов 1 и 2 в режиме теплого старта
+        self._shared_scraper: Optional[AvitoScraper] = None
+        archive_dir = config.ARCHIVE_DIR if archive_dir is None else archive_dir
+        self.archive = HTMLArchive(archive_dir, config.ARCHIVE_COMPRESSION) if archive_dir else None
+        self.scheduler = RecrawlScheduler(self.db_manager)
+        # Конвейер парсинга в пуле процессов на время этапа 2 (AVITO_PARSE_PROCESSES)
+        self._parse_pipeline: Optional[ParsePipeline] = None
+        # Буферизованная запись результатов этапа 2 (AVITO_DB_WRITE_BATCH)
+        self._result_writer: Optional[BufferedWriter] = None
         self.target_url = "https://www.avito.ru/volgograd/kvartiry/sdam/posutochno/-ASgBAgICAkSSA8gQ8AeSUg?context=H4sIAAAAAAAA_wEjANz_YToxOntzOjg6ImZyb21QYWdlIjtzOjc6ImNhdGFsb2ciO312FITcIwAAAA&f=ASgBAgECA0SSA8gQ8AeSUqqDD5z58AIBRdDmFEQie1widmVyc2lvblwiOjEsXCJ0b3RhbENvdW50XCI6MixcImFkdWx0c0NvdW50XCI6MixcImNoaWxkcmVuXCI6W119Ig"
     
     def run(self) -> None:
@@ -28,26 +154,43 @@ class AvitoBot:
         print("ЗАПУСК ПАРСЕРА AVITO (ДВУХЭТАПНЫЙ РЕЖИМ)")
         print("=" * 60)
         
+        self._run_stages(self._parse_apartment_details)
+    
+    def run_async(self) -> None:
+        """Двухэтапный парсинг с асинхронной загрузкой детальных страниц"""
+        print("=" * 60)
+        print("ЗАПУСК ПАРСЕРА AVITO (АСИНХРОННЫЙ РЕЖИМ)")
+        print("=" * 60)
+        
+        self._run_stages(self._parse_apartment_details_async)
+    
+    def _run_stages(self, parse_stage) -> None:
+        """
+        Выполнение этапов 1 и 2
+        
+        Args:
+            parse_stage: Метод этапа 2, возвращающий количество объявлений
+        """
         try:
             # Этап 1: Сбор ссылок на объявления
             print("\n[ЭТАП 1] Сбор ссылок на объявления...")
             links_count = self._collect_apartment_links()
             
             if links_count == 0:
-                print("Новые ссылки не найдены")
+                print("Новые и измененные объявления не найдены")
                 return
             
-            print(f"✓ Собрано новых ссылок: {links_count}")
+            print(f"✓ Ссылок для парсинга (новых и измененных): {links_count}")
             
             # Этап 2: Парсинг детальных страниц
             print("\n[ЭТАП 2] Парсинг детальных страниц объявлений...")
-            parsed_count = self._parse_apartment_details()
+            parsed_count = parse_stage()
             
             print(f"\n✓ Обработано объявлений: {parsed_count}")
             
             # Вывод статистики
             self._print_statistics()
-            
+        
         except KeyboardInterrupt:
             print("\n\nПарсинг прерван пользователем")
             self._print_statistics()
@@ -56,21 +199,71 @@ class AvitoBot:
             import traceback
             traceback.print_exc()
             sys.exit(1)
+        finally:
+            self.close()
+    
+    @contextmanager
+    def _browser_session(self, worker_index: int = 0):
+        """
+        Браузер для воркера с номером worker_index
+        
+        В режиме теплого старта первый воркер получает общий браузер,
+        который переживает этапы 1 и 2 и закрывается в close(), а каждый
+        воркер использует свой постоянный профиль Chrome.
+        
+        Args:
+            worker_index: Номер воркера, начиная с 0
+        """
+        if not self.warm_start:
+            with AvitoScraper(headless=self.headless) as scraper:
+                yield scraper
+            return
+        
+        profile_dir = config.CHROME_PROFILE_DIR
+        if worker_index > 0:
+            profile_dir = f"{profile_dir}_w{worker_index + 1}"
+        
+        if worker_index == 0:
+            if self._shared_scraper is None:
+                scraper = AvitoScraper(headless=self.headless, user_data_dir=profile_dir)
+                scraper.setup_driver()
+                self._shared_scraper = scraper
+            yield self._shared_scraper
+            return
+        
+        with AvitoScraper(headless=self.headless, user_data_dir=profile_dir) as scraper:
+            yield scraper
+    
+    def close(self) -> None:
+        """Закрытие общего браузера (режим теплого старта) и соединения с БД"""
+        if self._shared_scraper:
+            self._shared_scraper.close()
+            self._shared_scraper = None
+        self.db_manager.close()
     
     def _collect_apartment_links(self) -> int:
         """
-        Этап 1: Сбор ссылок на объявления со страницы каталога
+        Этап 1: Сбор ссылок на объявления со всех страниц каталога
+        
+        Количество страниц вычисляется по общему числу объявлений
+        (get_total_count), после чего остальные страницы загружаются
+        параллельно. Если счетчик не найден, обход идет по ссылкам
+        "Следующая страница".
+        
+        Вместе со ссылками сохраняются карточки объявлений; обработанные
+        объявления, карточка которых изменилась, возвращаются в очередь
+        этапа 2 (AVITO_CARD_REQUEUE).
         
         Returns:
-            Количество новых добавленных ссылок
+            Количество новых и возвращенных в очередь ссылок
         """
-        with AvitoScraper(headless=self.headless) as scraper:
+        with self._browser_session() as scraper:
             # Попытка загрузить сохраненные куки
             cookies_loaded = scraper.load_cookies()
             
             # Переход на целевую страницу
             print(f"Переход на страницу каталога...")
-            if not scraper.navigate_to_page(self.target_url):
+            if not scraper.navigate_to_page(self.target_url, page_type='catalog'):
                 print("✗ Ошибка при переходе на страницу")
                 return 0
             
@@ -84,104 +277,712 @@ class AvitoBot:
             print("Прокрутка страницы...")
             scraper.scroll_to_bottom()
             
-            # Получение HTML кода страницы
-            html_content = scraper.get_page_source()
-            
-            # Парсинг ссылок
-            parser = AvitoHTMLParser(html_content)
-            links = parser.parse_apartment_links()
+            # Парсинг и сохранение ссылок первой страницы
+            parser, links, new_links_count = self._store_catalog_page(
+                scraper.get_page_source(), page_number=1, page_url=self.target_url
+            )
             
             if not links:
                 print("✗ Ссылки не найдены")
                 return 0
             
-            # Сохранение ссылок в базу данных
-            new_links_count = self.db_manager.insert_apartment_links_batch(links)
+            total_count = parser.get_total_count()
+            if total_count:
+                page_count = min(math.ceil(total_count / len(links)), config.MAX_CATALOG_PAGES)
+                print(f"Всего объявлений: {total_count}, страниц каталога: {page_count}")
+                if page_count > 1:
+                    new_links_count += self._collect_catalog_pages(
+                        scraper, list(range(2, page_count + 1))
+                    )
+            elif parser.has_next_page():
+                print("Счетчик объявлений не найден, обход по ссылкам на следующую страницу")
+                new_links_count += self._follow_next_pages(scraper, parser.get_next_page_url())
+            
+            self._print_wait_summary(scraper.get_wait_summary())
+            self._print_blocking_summary(scraper.get_blocking_summary())
             
             return new_links_count
     
+    def _store_catalog_page(self, html_content: str, page_number: int,
+                            prefix: str = "", page_url: Optional[str] = None):
+        """
+        Парсинг страницы каталога и пакетное сохранение карточек объявлений
+        
+        Args:
+            html_content: HTML код страницы каталога
+            page_number: Номер страницы (для вывода)
+            prefix: Префикс для вывода (номер воркера)
+            page_url: URL страницы (для архива)
+            
+        Returns:
+            Кортеж (парсер, список ссылок, количество новых и возвращенных
+            в очередь ссылок)
+        """
+        if page_url:
+            self._archive_page(page_url, html_content, 'catalog')
+        
+        parser = AvitoHTMLParser(html_content)
+        cards = parser.parse_catalog_cards()
+        links = [card['url'] for card in cards]
+        
+        new_links_count = requeued_count = 0
+        if cards:
+            with self._db_lock:
+                new_links_count, requeued_count = self.db_manager.upsert_catalog_cards(
+                    cards, requeue=config.CARD_REQUEUE
+                )
+        
+        changed_text = f", изменилось {requeued_count}" if requeued_count else ""
+        print(f"{prefix}Страница {page_number}: ссылок {len(links)}, новых {new_links_count}"
+              f"{changed_text}")
+        return parser, links, new_links_count + requeued_count
+    
+    def _archive_page(self, url: str, html_content: str, page_type: str) -> None:
+        """Сохранение загруженной страницы в архив (если он включен)"""
+        if not self.archive:
+            return
+        
+        try:
+            self.archive.put(url, html_content, page_type)
+        except Exception as e:
+            print(f"⚠ Не удалось сохранить страницу в архив: {e}")
+    
+    def _build_catalog_page_url(self, page_number: int) -> str:
+        """
+        URL страницы каталога с заданным номером (параметр p)
+        
+        Args:
+            page_number: Номер страницы, начиная с 1
+            
+        Returns:
+            URL страницы каталога
+        """
+        parts = urlsplit(self.target_url)
+        query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                 if key != 'p']
+        if page_number > 1:
+            query.append(('p', str(page_number)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+    
+    def _collect_catalog_pages(self, scraper: AvitoScraper, page_numbers: List[int]) -> int:
+        """
+        Параллельная загрузка страниц каталога
+        
+        Первый воркер использует уже открытый браузер, остальные
+        запускают свои экземпляры (всего не больше self.workers).
+        
+        Args:
+            scraper: Открытый браузер этапа 1
+            page_numbers: Номера страниц для загрузки
+            
+        Returns:
+            Количество новых и возвращенных в очередь ссылок
+        """
+        page_queue: queue.Queue = queue.Queue()
+        for page_number in page_numbers:
+            page_queue.put(page_number)
+        
+        worker_count = min(self.workers, len(page_numbers))
+        new_counts = [0] * worker_count
+        
+        def catalog_worker(worker_index: int, stop_event: threading.Event) -> None:
+            prefix = f"[W{worker_index + 1}] " if worker_count > 1 else ""
+            if worker_index == 0:
+                new_counts[0] = self._catalog_worker(scraper, page_queue, stop_event, prefix)
+                return
+            
+            try:
+                with self._browser_session(worker_index) as worker_scraper:
+                    worker_scraper.load_cookies()
+                    new_counts[worker_index] = self._catalog_worker(
+                        worker_scraper, page_queue, stop_event, prefix
+                    )
+            except Exception as e:
+                print(f"{prefix}✗ Воркер остановлен из-за ошибки: {e}")
+        
+        self._run_worker_threads(worker_count, catalog_worker, "catalog-worker")
+        return sum(new_counts)
+    
+    def _catalog_worker(self, scraper: AvitoScraper, page_queue: queue.Queue,
+                        stop_event: threading.Event, prefix: str = "") -> int:
+        """
+        Обработка страниц каталога из общей очереди
+        
+        Returns:
+            Количество новых и возвращенных в очередь ссылок
+        """
+        new_links_count = 0
+        
+        while not stop_event.is_set():
+            try:
+                page_number = page_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            page_url = self._build_catalog_page_url(page_number)
+            if not scraper.navigate_to_page(page_url, page_type='catalog'):
+                print(f"{prefix}✗ Страница {page_number} не загружена")
+                continue
+            
+            scraper.scroll_to_bottom()
+            _, _, page_new_count = self._store_catalog_page(
+                scraper.get_page_source(), page_number, prefix, page_url
+            )
+            new_links_count += page_new_count
+        
+        return new_links_count
+    
+    def _follow_next_pages(self, scraper: AvitoScraper, next_url: Optional[str]) -> int:
+        """
+        Последовательный обход каталога по ссылкам "Следующая страница"
+        
+        Args:
+            scraper: Открытый браузер
+            next_url: URL второй страницы
+            
+        Returns:
+            Количество новых и возвращенных в очередь ссылок
+        """
+        new_links_count = 0
+        page_number = 1
+        
+        while next_url and page_number < config.MAX_CATALOG_PAGES:
+            page_number += 1
+            if not scraper.navigate_to_page(next_url, page_type='catalog'):
+                print(f"✗ Страница {page_number} не загружена")
+                break
+            
+            scraper.scroll_to_bottom()
+            parser, links, page_new_count = self._store_catalog_page(
+                scraper.get_page_source(), page_number, page_url=next_url
+            )
+            new_links_count += page_new_count
+            
+            if not links or not parser.has_next_page():
+                break
+            next_url = parser.get_next_page_url()
+        
+        return new_links_count
+    
+    def _run_worker_threads(self, worker_count: int, target, name: str) -> None:
+        """
+        Запуск воркеров в отдельных потоках с ожиданием завершения
+        
+        При одном воркере он выполняется в текущем потоке. Ctrl+C
+        останавливает всех воркеров через общий stop_event.
+        
+        Args:
+            worker_count: Количество воркеров
+            target: Функция target(worker_index, stop_event)
+            name: Префикс имени потоков
+        """
+        stop_event = threading.Event()
+        
+        try:
+            if worker_count == 1:
+                target(0, stop_event)
+                return
+            
+            print(f"Запуск воркеров: {worker_count}")
+            threads = [
+                threading.Thread(target=target, args=(worker_index, stop_event),
+                                 name=f"{name}-{worker_index + 1}", daemon=True)
+                for worker_index in range(worker_count)
+            ]
+            for thread in threads:
+                thread.start()
+            # join с таймаутом, чтобы Ctrl+C доходил до основного потока
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            raise
+    
     def _parse_apartment_details(self) -> int:
         """
         Этап 2: Парсинг детальных страниц объявлений
         
+        Ссылки распределяются между несколькими воркерами, у каждого
+        из которых свой экземпляр браузера. При AVITO_PARSE_PROCESSES > 0
+        воркеры только загружают страницы, а парсинг и запись в БД
+        выполняет ParsePipeline.
+        
         Returns:
             Количество обработанных объявлений
         """
-        # Получение непарсенных ссылок
-        unparsed_links = self.db_manager.get_unparsed_links()
+        # Количество непарсенных ссылок (сами ссылки читаются пачками по ходу работы)
+        total = self.db_manager.count_unparsed_links()
         
-        if not unparsed_links:
+        if not total:
             print("Нет непарсенных ссылок")
             return 0
         
-        total = len(unparsed_links)
-        print(f"Найдено непарсенных ссылок: {total}")
+        print(f"Найдено непарсенных ссылок: {total} (порядок: {config.LINK_ORDER})")
         
-        parsed_count = 0
-        failed_count = 0
+        # Очередь задач общая для всех воркеров (потоков) процесса
+        work_queue = LinkFeed(self.db_manager.iter_claimed_links(config.WORKER_ID))
         
-        with AvitoScraper(headless=self.headless) as scraper:
-            # Загрузка куки
-            scraper.load_cookies()
-            
-            for idx, (link_id, url) in enumerate(unparsed_links, 1):
-                try:
-                    # Прогресс
-                    progress = (idx / total) * 100
-                    print(f"\n[{idx}/{total}] ({progress:.1f}%) Парсинг: {url}")
-                    
-                    # Переход на страницу объявления
-                    if not scraper.navigate_to_page(url):
-                        print(f"  ✗ Ошибка при переходе на страницу")
-                        failed_count += 1
-                        continue
-                    
-                    # Небольшая задержка для загрузки
-                    time.sleep(2)
-                    
-                    # Получение HTML
-                    html_content = scraper.get_page_source()
-                    
-                    # Парсинг детальной информации
-                    parser = AvitoHTMLParser(html_content)
-                    apartment_data = parser.parse_apartment_detail(url)
-                    
-                    # Проверка наличия основных данных
-                    if not apartment_data.get('title'):
-                        print(f"  ⚠ Не удалось извлечь заголовок")
-                        failed_count += 1
-                        self.db_manager.mark_link_as_parsed(link_id)
-                        continue
-                    
-                    # Сохранение в базу данных
-                    result = self.db_manager.insert_apartment(apartment_data)
-                    
-                    if result:
-                        print(f"  ✓ Сохранено: {apartment_data['title'][:50]}...")
-                        parsed_count += 1
-                    else:
-                        print(f"  ⚠ Объявление уже существует в БД")
-                    
-                    # Отметить ссылку как обработанную
-                    self.db_manager.mark_link_as_parsed(link_id)
-                    
-                    # Задержка между запросами
-                    time.sleep(1)
-                    
-                except KeyboardInterrupt:
-                    raise
-                except Exception as e:
-                    print(f"  ✗ Ошибка при парсинге: {e}")
-                    failed_count += 1
-                    # Отметить как обработанную даже при ошибке
-                    self.db_manager.mark_link_as_parsed(link_id)
-                    continue
+        worker_count = min(self.workers, total)
+        stats = [WorkerStats(worker_id) for worker_id in range(1, worker_count + 1)]
+        
+        def detail_worker(worker_index: int, stop_event: threading.Event) -> None:
+            self._detail_worker(stats[worker_index], work_queue, total, stop_event)
+        
+        if config.PARSE_PROCESSES > 0:
+            self._parse_pipeline = ParsePipeline(self._store_detail_result)
+            print(f"Парсинг в пуле процессов: {self._parse_pipeline.processes}, "
+                  f"очередь до {self._parse_pipeline.queue_size} стр.")
+        
+        self._result_writer = self.db_manager.buffered_writer()
+        try:
+            try:
+                self._run_worker_threads(worker_count, detail_worker, "detail-worker")
+            finally:
+                if self._parse_pipeline:
+                    pipeline, self._parse_pipeline = self._parse_pipeline, None
+                    pipeline.close(cancel=sys.exc_info()[0] is not None)
+                    self._print_pipeline_summary(pipeline.get_summary())
+        finally:
+            # Запись буфера, в том числе при Ctrl+C; результаты потоков,
+            # завершающихся после прерывания, записываются сразу
+            self._result_writer.close()
+            self._release_claimed_links()
+            self._print_worker_stats(stats)
+            print(f"Новых объявлений: {self._result_writer.inserted}, "
+                  f"обновлено: {self._result_writer.updated}")
+        
+        parsed_count = sum(worker_stats.saved for worker_stats in stats)
+        failed_count = sum(worker_stats.failed for worker_stats in stats)
         
         if failed_count > 0:
             print(f"\n⚠ Не удалось обработать: {failed_count} объявлений")
         
         return parsed_count
     
+    def _parse_apartment_details_async(self) -> int:
+        """
+        Этап 2 в асинхронном режиме: параллельные HTTP-запросы
+        с ограничением частоты (token bucket)
+        
+        Returns:
+            Количество обработанных объявлений
+        """
+        total = self.db_manager.count_unparsed_links()
+        
+        if not total:
+            print("Нет непарсенных ссылок")
+            return 0
+        
+        print(f"Найдено непарсенных ссылок: {total} (порядок: {config.LINK_ORDER})")
+        
+        crawler = AsyncCrawler(self.db_manager, archive=self.archive)
+        print(f"Лимит: {crawler.limiter.rate:g} запр/с, пачка {crawler.limiter.burst}, "
+              f"одновременно до {crawler.max_in_flight}")
+        try:
+            stats = asyncio.run(crawler.crawl(self.db_manager.iter_claimed_links(config.WORKER_ID),
+                                              total))
+        finally:
+            crawler.close()
+            self._release_claimed_links()
+        
+        print(f"\n{'-' * 60}")
+        print(f"Обработано {stats['processed']} за {stats['elapsed']:.1f} с "
+              f"({stats['rate']:.2f} стр/с), ожидание лимита {stats['throttled']:.1f} с")
+        print(f"Сохранено: {stats['saved']} (новых {stats['inserted']}, "
+              f"обновлено {stats['updated']}), ошибок: {stats['failed']}")
+        if stats['blocked']:
+            print(f"⚠ Заблокировано: {stats['blocked']} (остались непарсенными, "
+                  f"их можно обработать в режиме браузера)")
+        print(f"{'-' * 60}")
+        
+        return stats['saved']
+    
+    def reparse_archive(self) -> int:
+        """
+        Офлайн-перепарсинг архива страниц без запуска браузера
+        
+        Последняя версия каждой страницы каталога заново разбирается
+        на карточки объявлений (как на этапе 1, см. _store_catalog_page),
+        а каждой детальной страницы - на данные объявления, которые
+        добавляются в БД или обновляют существующую запись.
+        
+        Returns:
+            Количество добавленных и обновленных объявлений
+        """
+        if not self.archive:
+            print("✗ Архив страниц отключен (задайте AVITO_ARCHIVE_DIR)")
+            return 0
+        
+        entries, urls, objects = self.archive.get_stats()
+        print(f"Архив {self.archive.root_dir}: {urls} URL, {entries} загрузок, "
+              f"{objects} уникальных страниц")
+        
+        started = time.monotonic()
+        new_links_count = 0
+        for page_number, (url, html_content) in enumerate(self.archive.iter_latest('catalog'), 1):
+            _, _, queued_count = self._store_catalog_page(html_content, page_number)
+            new_links_count += queued_count
+        
+        failed = 0
+        with self.db_manager.buffered_writer() as writer:
+            for url, html_content in self.archive.iter_latest('detail'):
+                try:
+                    apartment_data = AvitoHTMLParser(html_content).parse_apartment_detail(url)
+                except Exception as e:
+                    print(f"  ✗ Ошибка при парсинге {url}: {e}")
+                    apartment_data = {}
+                
+                if not apartment_data.get('title'):
+                    failed += 1
+                    continue
+                
+                writer.add_apartment(apartment_data)
+        
+        elapsed = time.monotonic() - started
+        print(f"\n{'-' * 60}")
+        print(f"Перепарсинг занял {elapsed:.1f} с")
+        print(f"Новых и измененных ссылок из каталога: {new_links_count}")
+        print(f"Объявлений добавлено: {writer.inserted}, обновлено: {writer.updated}, "
+              f"ошибок: {failed}")
+        print(f"{'-' * 60}")
+        
+        return writer.inserted + writer.updated
+    
+    def recrawl_due(self, page_budget: Optional[int] = None) -> int:
+        """
+        Повторное посещение обработанных объявлений по расписанию
+        
+        Посещаются только объявления, для которых наступило время
+        следующего посещения (см. RecrawlScheduler), самые просроченные
+        первыми и не больше page_budget за запуск.
+        
+        Args:
+            page_budget: Максимальное количество страниц
+                         (по умолчанию config.RECRAWL_PAGE_BUDGET)
+            
+        Returns:
+            Количество измененных объявлений
+        """
+        due_links = self.scheduler.get_due_links(page_budget)
+        
+        if not due_links:
+            print("Нет объявлений для повторного посещения")
+            return 0
+        
+        total = len(due_links)
+        print(f"Объявлений к повторному посещению: {total}")
+        
+        work_queue: queue.Queue = queue.Queue()
+        for idx, (link_id, url) in enumerate(due_links, 1):
+            work_queue.put((idx, link_id, url))
+        
+        worker_count = min(self.workers, total)
+        counts = {'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        
+        def recrawl_worker(worker_index: int, stop_event: threading.Event) -> None:
+            prefix = f"[W{worker_index + 1}] " if worker_count > 1 else ""
+            try:
+                with self._create_detail_fetcher(worker_index) as scraper:
+                    scraper.load_cookies()
+                    while not stop_event.is_set():
+                        try:
+                            idx, link_id, url = work_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        
+                        print(f"\n{prefix}[{idx}/{total}] Повторное посещение: {url}")
+                        status = self._recrawl_link(scraper, link_id, url, prefix)
+                        with self._db_lock:
+                            counts[status] += 1
+            except Exception as e:
+                print(f"{prefix}✗ Воркер остановлен из-за ошибки: {e}")
+        
+        try:
+            self._run_worker_threads(worker_count, recrawl_worker, "recrawl-worker")
+        finally:
+            print(f"\n{'-' * 60}")
+            print(f"Изменилось: {counts['changed']}, без изменений: {counts['unchanged']}, "
+                  f"снято с публикации: {counts['removed']}, ошибок: {counts['failed']}")
+            print(f"{'-' * 60}")
+        
+        return counts['changed']
+    
+    def _recrawl_link(self, scraper: AvitoScraper, link_id: int, url: str,
+                      prefix: str = "") -> str:
+        """
+        Повторное посещение одного объявления
+        
+        Args:
+            scraper: Экземпляр браузера воркера
+            link_id: ID ссылки
+            url: URL объявления
+            prefix: Префикс для вывода (номер воркера)
+            
+        Returns:
+            'changed', 'unchanged', 'removed' или 'failed'
+        """
+        try:
+            if not scraper.navigate_to_page(url, page_type='detail'):
+                print(f"  {prefix}✗ Ошибка при переходе на страницу")
+                with self._db_lock:
+                    self.scheduler.record_failure(link_id)
+                return 'failed'
+            
+            html_content = scraper.get_page_source()
+            self._archive_page(url, html_content, 'detail')
+            parser = AvitoHTMLParser(html_content)
+            
+            if parser.is_listing_removed():
+                print(f"  {prefix}✗ Объявление снято с публикации")
+                with self._db_lock:
+                    self.scheduler.record_removed(link_id)
+                status = 'removed'
+            else:
+                apartment_data = parser.parse_apartment_detail(url)
+                if apartment_data.get('title'):
+                    with self._db_lock:
+                        changed = self.scheduler.record_visit(link_id, apartment_data)
+                        self.db_manager.upsert_apartment(apartment_data)
+                    status = 'changed' if changed else 'unchanged'
+                    print(f"  {prefix}{'✓ Изменилось' if changed else 'Без изменений'}: "
+                          f"{apartment_data['title'][:50]}")
+                else:
+                    print(f"  {prefix}⚠ Не удалось извлечь заголовок")
+                    with self._db_lock:
+                        self.scheduler.record_failure(link_id)
+                    status = 'failed'
+            
+            # Задержка между запросами
+            time.sleep(config.REQUEST_DELAY)
+            
+            return status
+        
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"  {prefix}✗ Ошибка при повторном посещении: {e}")
+            with self._db_lock:
+                self.scheduler.record_failure(link_id)
+            return 'failed'
+    
+    def _detail_worker(self, stats: WorkerStats, work_queue: LinkFeed,
+                       total: int, stop_event: threading.Event) -> None:
+        """
+        Воркер этапа 2: обрабатывает ссылки из общей очереди
+        
+        Args:
+            stats: Статистика воркера
+            work_queue: Очередь ссылок этапа 2
+            total: Количество ссылок при запуске (для прогресса)
+            stop_event: Сигнал остановки
+        """
+        prefix = f"[W{stats.worker_id}] " if self.workers > 1 else ""
+        
+        try:
+            with self._create_detail_fetcher(stats.worker_id - 1) as scraper:
+                # Загрузка куки
+                scraper.load_cookies()
+                
+                try:
+                    while not stop_event.is_set():
+                        try:
+                            idx, link_id, url = work_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        
+                        # Прогресс
+                        # Ссылки, добавленные во время работы, сверх total
+                        progress = min(idx / total, 1.0) * 100
+                        print(f"\n{prefix}[{idx}/{total}] ({progress:.1f}%) Парсинг: {url}")
+                        
+                        status = self._process_detail_link(scraper, link_id, url, prefix,
+                                                           on_result=stats.record)
+                        if status:
+                            stats.record(status)
+                finally:
+                    stats.wait_summary = scraper.get_wait_summary()
+                    stats.blocking_summary = scraper.get_blocking_summary()
+        except KeyboardInterrupt:
+            stop_event.set()
+            raise
+        except Exception as e:
+            print(f"{prefix}✗ Воркер остановлен из-за ошибки: {e}")
+        finally:
+            stats.finished_at = time.monotonic()
+    
+    def _create_detail_fetcher(self, worker_index: int = 0):
+        """
+        Создание загрузчика детальных страниц согласно fetch_mode
+        
+        Args:
+            worker_index: Номер воркера, начиная с 0
+            
+        Returns:
+            Контекстный менеджер, возвращающий AvitoScraper или
+            AvitoHTTPFetcher (одинаковый интерфейс)
+        """
+        if self.fetch_mode == 'http':
+            return AvitoHTTPFetcher(headless=self.headless)
+        return self._browser_session(worker_index)
+    
+    def _process_detail_link(self, scraper: AvitoScraper, link_id: int, url: str,
+                             prefix: str = "",
+                             on_result: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Обработка одной детальной страницы
+        
+        Args:
+            scraper: Экземпляр браузера воркера
+            link_id: ID ссылки
+            url: URL объявления
+            prefix: Префикс для вывода (номер воркера)
+            on_result: Получает статус, если страница передана в пул парсинга
+            
+        Returns:
+            'saved', 'failed' или None, если страница передана
+            в пул парсинга (статус придет в on_result после записи в БД)
+        """
+        try:
+            # Переход на страницу объявления
+            if not scraper.navigate_to_page(url, page_type='detail'):
+                print(f"  {prefix}✗ Ошибка при переходе на страницу")
+                return 'failed'
+            
+            # Получение HTML
+            html_content = scraper.get_page_source()
+            self._archive_page(url, html_content, 'detail')
+            
+            if self._parse_pipeline is not None:
+                # Парсинг и запись - в пуле процессов, воркер сразу идет дальше
+                self._parse_pipeline.submit(link_id, url, html_content, prefix, on_result)
+                status = None
+            else:
+                # Парсинг детальной информации
+                status = self._store_detail_result(link_id, url,
+                                                   parse_detail_page(url, html_content), prefix)
+            
+            # Задержка между запросами
+            time.sleep(config.REQUEST_DELAY)
+            
+            return status
+        
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            print(f"  {prefix}✗ Ошибка при парсинге: {e}")
+            # Отметить как обработанную даже при ошибке
+            self._result_writer.mark_link_as_parsed(link_id)
+            return 'failed'
+    
+    def _store_detail_result(self, link_id: int, url: str,
+                             result: Optional[Tuple[Dict, bool]], prefix: str = "") -> str:
+        """
+        Запись результата парсинга детальной страницы в БД
+        
+        Объявление и отметка ссылки попадают в буфер _result_writer и
+        фиксируются одной транзакцией вместе с другими результатами.
+        
+        Args:
+            link_id: ID ссылки
+            url: URL объявления
+            result: Кортеж (данные объявления, снято ли объявление) или None
+                    при ошибке парсинга
+            prefix: Префикс для вывода (номер воркера)
+            
+        Returns:
+            'saved' (объявление добавлено или обновлено по URL, например
+            после изменения карточки в каталоге) или 'failed'
+        """
+        if result is None:
+            # Отметить как обработанную даже при ошибке
+            self._result_writer.mark_link_as_parsed(link_id)
+            return 'failed'
+        
+        apartment_data, removed = result
+        
+        # Проверка наличия основных данных
+        if not apartment_data.get('title'):
+            if removed:
+                print(f"  {prefix}✗ Объявление снято с публикации")
+            else:
+                print(f"  {prefix}⚠ Не удалось извлечь заголовок")
+            self._result_writer.mark_link_as_parsed(link_id)
+            if removed:
+                with self._db_lock:
+                    self.scheduler.record_removed(link_id)
+            return 'failed'
+        
+        # Сохранение в базу данных и отметка ссылки как обработанной
+        self._result_writer.add_apartment(apartment_data, link_id)
+        print(f"  {prefix}✓ Сохранено: {apartment_data['title'][:50]}...")
+        return 'saved'
+    
+    def _release_claimed_links(self) -> None:
+        """Возврат в очередь арендованных, но не обработанных ссылок"""
+        released = self.db_manager.release_links(config.WORKER_ID)
+        if released:
+            print(f"Возвращено в очередь необработанных ссылок: {released}")
+    
+    def _print_pipeline_summary(self, summary: Dict[str, float]) -> None:
+        """Вывод сводки конвейера парсинга"""
+        print(f"\nПул парсинга ({summary['processes']} проц.): записано {summary['written']} "
+              f"из {summary['submitted']} стр., ошибок {summary['failed']}")
+        if summary['backpressure_time'] >= 0.1:
+            print(f"  Загрузка ждала освобождения очереди: {summary['backpressure_time']:.1f} с")
+    
+    def _print_worker_stats(self, stats: List[WorkerStats]) -> None:
+        """Вывод пропускной способности каждого воркера"""
+        if not stats or sum(worker_stats.processed for worker_stats in stats) == 0:
+            return
+        
+        print(f"\n{'-' * 60}")
+        print("ПРОИЗВОДИТЕЛЬНОСТЬ ВОРКЕРОВ")
+        print(f"{'-' * 60}")
+        for worker_stats in stats:
+            print(f"  W{worker_stats.worker_id}: обработано {worker_stats.processed} "
+                  f"(сохранено {worker_stats.saved}, ошибок {worker_stats.failed}) "
+                  f"за {worker_stats.elapsed:.1f} с — "
+                  f"{worker_stats.pages_per_minute:.1f} стр/мин")
+            if worker_stats.wait_summary:
+                self._print_wait_summary(worker_stats.wait_summary, indent="    ")
+                if worker_stats.wait_summary.get('fallbacks'):
+                    print(f"    Загружено через браузер (блокировка): "
+                          f"{worker_stats.wait_summary['fallbacks']} стр.")
+            self._print_blocking_summary(worker_stats.blocking_summary, indent="    ")
+        if len(stats) > 1:
+            total_processed = sum(worker_stats.processed for worker_stats in stats)
+            wall_time = max(worker_stats.elapsed for worker_stats in stats)
+            if wall_time > 0:
+                print(f"  Всего: {total_processed / wall_time * 60:.1f} стр/мин")
+        print(f"{'-' * 60}")
+    
+    def _print_wait_summary(self, summary: Dict[str, float], indent: str = "") -> None:
+        """Вывод времени ожидания готовности страниц"""
+        if not summary['pages']:
+            return
+        
+        print(f"{indent}Ожидание готовности: {summary['waited']:.1f} с на "
+              f"{summary['pages']} стр. (фиксированные задержки: "
+              f"{summary['baseline']:.1f} с, сэкономлено {summary['saved']:.1f} с)")
+        if summary['not_ready']:
+            print(f"{indent}⚠ Не дождались маркеров: {summary['not_ready']} стр.")
+    
+    def _print_blocking_summary(self, summary: Optional[Dict[str, float]],
+                                indent: str = "") -> None:
+        """Вывод экономии от блокировки второстепенных ресурсов"""
+        if not summary or not summary['pages']:
+            return
+        
+        pages = summary['pages']
+        print(f"{indent}Загружено: {summary['bytes'] / 1024:.0f} КБ на {pages} стр., "
+              f"в среднем {summary['load_time'] / pages:.2f} с на страницу")
+        calibrated = summary.get('calibrated_pages', 0)
+        if calibrated:
+            print(f"{indent}Блокировка ресурсов сэкономила (без кэша): "
+                  f"{summary['bytes_saved'] / calibrated / 1024:.0f} КБ и "
+                  f"{summary['load_time_saved'] / calibrated:.2f} с на страницу")
+    
     def _print_statistics(self) -> None:
         """Вывод статистики по базе данных"""
         apartments_count = self.db_manager.get_apartments_count()
@@ -193,11 +994,18 @@ class AvitoBot:
         print(f"Ссылок собрано: {links_total}")
         print(f"Ссылок обработано: {links_parsed}")
         print(f"Ссылок осталось: {links_total - links_parsed}")
+        print(f"Снято с публикации: {self.db_manager.get_removed_links_count()}")
         print(f"Объявлений в БД: {apartments_count}")
         print(f"{'=' * 60}")
         
+        # Статистика селекторов сохраняется между запусками
+        selector_registry = get_selector_registry()
+        selector_registry.save()
+        for warning in selector_registry.get_warnings():
+            print(f"⚠ Селекторы: {warning}")
+        
         # Показать последние 3 записи
-        recent_apartments = self.db_manager.get_all_apartments()[:3]
+        recent_apartments = self.db_manager.get_recent_apartments(3)
         if recent_apartments:
             print(f"\nПоследние {len(recent_apartments)} объявления:")
             for apt in recent_apartments:
@@ -206,19 +1014,27 @@ class AvitoBot:
                 print(f"    Цена: {apt[3] or 'Не указана'}")
                 print(f"    Адрес: {apt[9] or 'Не указан'}")
     
-    def show_all_data(self) -> None:
-        """Показать все данные из базы"""
-        apartments = self.db_manager.get_all_apartments()
+    def show_all_data(self, page_size: int = 20) -> None:
+        """
+        Показать все данные из базы постранично
+        
+        Записи читаются из БД пачками, поэтому память не зависит от
+        размера таблицы.
+        
+        Args:
+            page_size: Записей на странице (0 - без остановок)
+        """
+        total = self.db_manager.get_apartments_count()
         
-        if not apartments:
+        if not total:
             print("\nБаза данных пуста")
             return
         
         print(f"\n{'=' * 80}")
-        print(f"ВСЕ ДАННЫЕ ({len(apartments)} записей)")
+        print(f"ВСЕ ДАННЫЕ ({total} записей)")
         print(f"{'=' * 80}")
         
-        for apt in apartments:
+        for shown, apt in enumerate(self.db_manager.iter_apartments(), 1):
             print(f"\n[ID: {apt[0]}]")
             print(f"Название: {apt[1]}")
             print(f"URL: {apt[2]}")
@@ -234,6 +1050,32 @@ class AvitoBot:
             print(f"Ссылка владельца: {apt[12] or '-'}")
             print(f"Дата добавления: {apt[13]}")
             print("-" * 80)
+            
+            if page_size and shown % page_size == 0 and shown < total:
+                answer = input(f"\nПоказано {shown} из {total}. "
+                               f"Enter - следующая страница, q - выход: ").strip().lower()
+                if answer == 'q':
+                    break
+    
+    def normalize_apartments(self, batch_size: int = 1000) -> int:
+        """
+        Заполнение типизированных столбцов (цена, площадь, комнаты, этаж,
+        гости) у объявлений, сохраненных до их появления
+        
+        Args:
+            batch_size: Количество строк в одной транзакции
+            
+        Returns:
+            Количество обновленных объявлений
+        """
+        started = time.monotonic()
+        count = self.db_manager.backfill_typed_columns(batch_size)
+        print(f"Нормализовано объявлений: {count} за {time.monotonic() - started:.1f} с")
+        return count
+    
+    def show_report(self) -> None:
+        """Аналитический отчет: перцентили цены, районы, новые объявления по дням"""
+        print_report(build_report(self.db_manager.db_path))
     
     def clear_database(self) -> None:
         """Очистка базы данных"""
@@ -256,9 +1098,14 @@ def main():
             print("  4. Показать статистику")
             print("  5. Показать все данные")
             print("  6. Очистить базу данных")
-            print("  7. Выход")
+            print("  7. Асинхронный парсинг детальных страниц (HTTP)")
+            print("  8. Перепарсить архив страниц (без браузера)")
+            print("  9. Повторно посетить объявления по расписанию")
+            print("  10. Заполнить типизированные столбцы (цена, площадь, комнаты...)")
+            print("  11. Аналитический отчет (цены, районы, динамика)")
+            print("  12. Выход")
             
-            choice = input("\n➤ Выберите действие (1-7): ").strip()
+            choice = input("\n➤ Выберите действие (1-12): ").strip()
             
             if choice == "1":
                 # Полный парсинг
@@ -269,17 +1116,23 @@ def main():
                 # Только сбор ссылок
                 print("\n[РЕЖИМ] Сбор ссылок на объявления")
                 bot = AvitoBot(headless=True)
-                links_count = bot._collect_apartment_links()
-                print(f"\n✓ Собрано новых ссылок: {links_count}")
-                bot._print_statistics()
+                try:
+                    links_count = bot._collect_apartment_links()
+                    print(f"\n✓ Собрано новых ссылок: {links_count}")
+                    bot._print_statistics()
+                finally:
+                    bot.close()
             
             elif choice == "3":
                 # Только парсинг детальных страниц
                 print("\n[РЕЖИМ] Парсинг детальных страниц")
                 bot = AvitoBot(headless=True)
-                parsed_count = bot._parse_apartment_details()
-                print(f"\n✓ Обработано объявлений: {parsed_count}")
-                bot._print_statistics()
+                try:
+                    parsed_count = bot._parse_apartment_details()
+                    print(f"\n✓ Обработано объявлений: {parsed_count}")
+                    bot._print_statistics()
+                finally:
+                    bot.close()
             
             elif choice == "4":
                 # Статистика
@@ -302,6 +1155,50 @@ def main():
                     print("Отменено")
             
             elif choice == "7":
+                # Асинхронный парсинг детальных страниц
+                print("\n[РЕЖИМ] Асинхронный парсинг детальных страниц")
+                bot = AvitoBot(headless=True)
+                try:
+                    parsed_count = bot._parse_apartment_details_async()
+                    print(f"\n✓ Обработано объявлений: {parsed_count}")
+                    bot._print_statistics()
+                finally:
+                    bot.close()
+            
+            elif choice == "8":
+                # Офлайн-перепарсинг архива
+                print("\n[РЕЖИМ] Перепарсинг архива страниц")
+                bot = AvitoBot()
+                try:
+                    parsed_count = bot.reparse_archive()
+                    print(f"\n✓ Обработано объявлений: {parsed_count}")
+                    bot._print_statistics()
+                finally:
+                    bot.close()
+            
+            elif choice == "9":
+                # Повторный обход по расписанию
+                print("\n[РЕЖИМ] Повторное посещение объявлений")
+                bot = AvitoBot(headless=True)
+                try:
+                    changed_count = bot.recrawl_due()
+                    print(f"\n✓ Изменившихся объявлений: {changed_count}")
+                    bot._print_statistics()
+                finally:
+                    bot.close()
+            
+            elif choice == "10":
+                # Нормализация существующих объявлений
+                print("\n[РЕЖИМ] Заполнение типизированных столбцов")
+                bot = AvitoBot()
+                bot.normalize_apartments()
+            
+            elif choice == "11":
+                # Аналитический отчет
+                bot = AvitoBot()
+                bot.show_report()
+            
+            elif choice == "12":
                 # Выход
                 print("\n👋 До свидания!")
                 break
@@ -0,0 +1,184 @@
+"""
+Нормализация текстовых полей объявлений в типизированные столбцы
+
+Цена ("2 500 ₽ за сутки"), площадь, количество комнат, этаж и
+максимальное количество гостей извлекаются из price, about_apartment
+('Название:значение | ...') и заголовка ("2-к. квартира, 54 м², 5/9 эт."),
+район - из адреса ("..., р-н Центральный").
+
+Использование:
+    python normalize.py [файл БД] [--batch-size N]
+"""
+
+import re
+import argparse
+from typing import Dict, List, Optional, Union
+
+
+# Версия правил нормализации: строки с меньшей версией пересчитываются
+NORMALIZE_VERSION = 2
+
+# Типизированные столбцы таблицы apartments
+TYPED_COLUMNS: Dict[str, str] = {
+    'price_rub': 'INTEGER',
+    'area': 'REAL',
+    'rooms': 'INTEGER',
+    'floor': 'INTEGER',
+    'max_guests': 'INTEGER',
+    'district': 'TEXT',
+}
+
+# Названия параметров about_apartment в нижнем регистре (пробуются по порядку)
+PARAM_NAMES: Dict[str, List[str]] = {
+    'area': ['общая площадь', 'площадь'],
+    'rooms': ['количество комнат', 'комнат'],
+    'floor': ['этаж'],
+    'max_guests': ['количество гостей', 'максимум гостей', 'гостей'],
+}
+
+_NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+_PRICE_PATTERN = re.compile(r'\d[\d\s]*')
+_TITLE_AREA_PATTERN = re.compile(r'(\d+(?:[.,]\d+)?)\s*м²')
+_TITLE_ROOMS_PATTERN = re.compile(r'(\d+)-к\.')
+_TITLE_FLOOR_PATTERN = re.compile(r'(\d+)/\d+\s*эт')
+_DISTRICT_PATTERN = re.compile(r'р-н\s*([^,|]+)|([^,|\d]+?)\s+район\b')
+
+Number = Union[int, float]
+
+
+def parse_price(text: Optional[str]) -> Optional[int]:
+    """
+    Цена в рублях из текста
+    
+    Args:
+        text: Текст цены ("2 500 ₽ за сутки")
+        
+    Returns:
+        Цена или None
+    """
+    if not text:
+        return None
+    
+    match = _PRICE_PATTERN.search(text)
+    if not match:
+        return None
+    digits = re.sub(r'\D', '', match.group())
+    return int(digits) if digits else None
+
+
+def _number(text: Optional[str]) -> Optional[float]:
+    """Первое число в тексте (десятичный разделитель - точка или запятая)"""
+    if not text:
+        return None
+    match = _NUMBER_PATTERN.search(text)
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def parse_params(about_apartment: Optional[str]) -> Dict[str, str]:
+    """
+    Параметры квартиры из about_apartment
+    
+    Args:
+        about_apartment: Текст 'Название:значение | ...'
+        
+    Returns:
+        Словарь название (в нижнем регистре) -> значение
+    """
+    params = {}
+    if not about_apartment:
+        return params
+    
+    for part in about_apartment.split(' | '):
+        name, separator, value = part.partition(':')
+        if separator:
+            params[name.strip().lower()] = value.strip()
+    return params
+
+
+def parse_district(address: Optional[str]) -> Optional[str]:
+    """
+    Район из адреса
+    
+    Args:
+        address: Адрес ("Волгоград, ул. Мира, 15р-н Центральный")
+        
+    Returns:
+        Название района ("Центральный") или None
+    """
+    if not address:
+        return None
+    
+    match = _DISTRICT_PATTERN.search(address)
+    if not match:
+        return None
+    district = (match.group(1) or match.group(2)).strip()
+    return district or None
+
+
+def _param(params: Dict[str, str], field: str) -> Optional[str]:
+    """Значение параметра поля (первое из названий PARAM_NAMES)"""
+    for name in PARAM_NAMES[field]:
+        if name in params:
+            return params[name]
+    return None
+
+
+def normalize_apartment(apartment_data: Dict) -> Dict[str, Union[Number, str, None]]:
+    """
+    Типизированные значения объявления
+    
+    Параметры из about_apartment имеют приоритет, заголовок используется,
+    если параметра нет.
+    
+    Args:
+        apartment_data: Словарь с полями title, price, about_apartment, address
+        
+    Returns:
+        Словарь со столбцами TYPED_COLUMNS (None, если значение не найдено)
+    """
+    params = parse_params(apartment_data.get('about_apartment'))
+    title = apartment_data.get('title') or ''
+    
+    area = _number(_param(params, 'area'))
+    if area is None:
+        match = _TITLE_AREA_PATTERN.search(title)
+        area = float(match.group(1).replace(',', '.')) if match else None
+    
+    rooms_text = _param(params, 'rooms')
+    rooms = _number(rooms_text)
+    if rooms is None:
+        if (rooms_text and 'студ' in rooms_text.lower()) or 'студия' in title.lower():
+            rooms = 0
+        else:
+            match = _TITLE_ROOMS_PATTERN.search(title)
+            rooms = int(match.group(1)) if match else None
+    
+    floor = _number(_param(params, 'floor'))
+    if floor is None:
+        match = _TITLE_FLOOR_PATTERN.search(title)
+        floor = int(match.group(1)) if match else None
+    
+    max_guests = _number(_param(params, 'max_guests'))
+    
+    return {
+        'price_rub': parse_price(apartment_data.get('price')),
+        'area': area,
+        'rooms': int(rooms) if rooms is not None else None,
+        'floor': int(floor) if floor is not None else None,
+        'max_guests': int(max_guests) if max_guests is not None else None,
+        'district': parse_district(apartment_data.get('address')),
+    }
+
+
+if __name__ == "__main__":
+    from db import DatabaseManager
+    
+    arg_parser = argparse.ArgumentParser(description="Заполнение типизированных столбцов")
+    arg_parser.add_argument("db_path", nargs="?", default="avito_data.db",
+                            help="Файл базы данных (по умолчанию avito_data.db)")
+    arg_parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Строк в одной транзакции")
+    args = arg_parser.parse_args()
+    
+    count = DatabaseManager(args.db_path).backfill_typed_columns(max(args.batch_size, 1))
+    print(f"✓ Нормализовано объявлений: {count}")
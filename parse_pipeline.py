@@ -0,0 +1,190 @@
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from html_parser import AvitoHTMLParser, SELECTORS, get_selector_registry
+from selector_stats import SelectorRegistry
+import config
+
+
+# Результат разбора: (данные объявления, снято ли объявление с публикации)
+DetailResult = Tuple[Dict[str, Optional[str]], bool]
+
+
+def parse_detail_page(url: str, html_content: str,
+                      registry: Optional[SelectorRegistry] = None) -> DetailResult:
+    """
+    Парсинг детальной страницы
+    
+    Args:
+        url: URL объявления
+        html_content: HTML код страницы
+        registry: Реестр селекторов (по умолчанию общий, get_selector_registry())
+        
+    Returns:
+        Кортеж (данные объявления, снято ли объявление с публикации);
+        снятие проверяется только если заголовок не найден
+    """
+    parser = AvitoHTMLParser(html_content, registry=registry)
+    apartment_data = parser.parse_apartment_detail(url)
+    removed = not apartment_data.get('title') and parser.is_listing_removed()
+    return apartment_data, removed
+
+
+def _parse_in_process(url: str, html_content: str) -> Tuple[DetailResult,
+                                                           Dict[str, Dict[str, List[int]]]]:
+    """
+    Парсинг детальной страницы в процессе пула
+    
+    Returns:
+        Кортеж (результат parse_detail_page, статистика селекторов этой
+        страницы для SelectorRegistry.merge в основном процессе)
+    """
+    registry = SelectorRegistry(SELECTORS)
+    return parse_detail_page(url, html_content, registry), registry.stats
+
+
+class ParsePipeline:
+    """
+    Конвейер этапа 2: загрузка -> парсинг в пуле процессов -> запись в БД
+    
+    Потоки загрузки передают HTML в submit() и сразу переходят к следующей
+    странице. Страницы разбираются в ProcessPoolExecutor (BeautifulSoup не
+    упирается в GIL потоков загрузки), а результаты записывает в БД один
+    поток записи. Страниц в работе (в очереди, в разборе и в ожидании
+    записи) не больше queue_size: если парсинг отстает, submit() ждет
+    свободного места, и загрузка замедляется до скорости парсинга.
+    Статистика селекторов каждой страницы возвращается из процесса
+    парсинга и добавляется в общий реестр (get_selector_registry()).
+    """
+    
+    def __init__(self, store: Callable[..., str], processes: Optional[int] = None,
+                 queue_size: Optional[int] = None):
+        """
+        Инициализация конвейера
+        
+        Args:
+            store: Функция записи store(link_id, url, result, prefix) -> статус,
+                   где result - результат parse_detail_page или None при ошибке
+            processes: Количество процессов парсинга (по умолчанию config.PARSE_PROCESSES)
+            queue_size: Максимум страниц в работе (по умолчанию config.PARSE_QUEUE_SIZE)
+        """
+        self.store = store
+        self.processes = max(1, processes or config.PARSE_PROCESSES)
+        self.queue_size = max(self.processes, queue_size or config.PARSE_QUEUE_SIZE)
+        
+        # spawn: процессы не наследуют потоки браузеров (и так же работает в Windows)
+        self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._results: queue.Queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        # Суммарное время ожидания места в очереди потоками загрузки
+        self.backpressure_time = 0.0
+        
+        self._writer = threading.Thread(target=self._write_results, name="parse-writer", daemon=True)
+        self._writer.start()
+    
+    def __enter__(self):
+        """Вход в контекстный менеджер"""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Выход из контекстного менеджера (при прерывании ожидающие страницы отменяются)"""
+        self.close(cancel=exc_type is not None)
+    
+    def submit(self, link_id: int, url: str, html_content: str, prefix: str = "",
+               on_result: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Передача страницы на парсинг (ждет, если очередь заполнена)
+        
+        Args:
+            link_id: ID ссылки
+            url: URL объявления
+            html_content: HTML код страницы
+            prefix: Префикс для вывода (номер воркера)
+            on_result: Вызывается со статусом после записи в БД
+        """
+        started = time.monotonic()
+        self._slots.acquire()
+        waited = time.monotonic() - started
+        
+        try:
+            future = self._executor.submit(_parse_in_process, url, html_content)
+        except Exception:
+            self._slots.release()
+            raise
+        
+        with self._stats_lock:
+            self.submitted += 1
+            self.backpressure_time += waited
+        future.add_done_callback(
+            lambda done: self._results.put((done, link_id, url, prefix, on_result))
+        )
+    
+    def _write_results(self) -> None:
+        """Поток записи: результаты парсинга в БД по мере готовности"""
+        while True:
+            item = self._results.get()
+            if item is None:
+                break
+            
+            future, link_id, url, prefix, on_result = item
+            status = None
+            try:
+                if future.cancelled():
+                    # Прерванная страница остается непарсенной
+                    continue
+                
+                try:
+                    result, selector_stats = future.result()
+                    get_selector_registry().merge(selector_stats)
+                except Exception as e:
+                    print(f"  {prefix}✗ Ошибка при парсинге {url}: {e}")
+                    result = None
+                
+                status = self.store(link_id, url, result, prefix)
+            except Exception as e:
+                print(f"  {prefix}✗ Ошибка при записи {url}: {e}")
+                status = 'failed'
+            finally:
+                self._slots.release()
+            
+            with self._stats_lock:
+                self.written += 1
+                if status == 'failed':
+                    self.failed += 1
+            if on_result:
+                on_result(status)
+    
+    def close(self, cancel: bool = False) -> None:
+        """
+        Завершение: ожидание разбора и записи всех переданных страниц
+        
+        Args:
+            cancel: Отменить страницы, которые еще не начали разбираться
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        self._results.put(None)
+        self._writer.join()
+    
+    def get_summary(self) -> Dict[str, float]:
+        """
+        Сводка работы конвейера
+        
+        Returns:
+            Словарь: processes, submitted, written, failed, backpressure_time
+        """
+        with self._stats_lock:
+            return {
+                'processes': self.processes,
+                'submitted': self.submitted,
+                'written': self.written,
+                'failed': self.failed,
+                'backpressure_time': self.backpressure_time,
+            }
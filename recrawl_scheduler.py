@@ -0,0 +1,192 @@
+import json
+import math
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Tuple, Optional
+from db import DatabaseManager
+import config
+
+
+# Поля объявления, изменение которых считается изменением объявления
+TRACKED_FIELDS = [
+    'title', 'price', 'media_url_1', 'media_url_2', 'media_url_3',
+    'about_apartment', 'rules', 'address', 'description', 'owner_name', 'owner_url'
+]
+
+# Априорная оценка: одно изменение за столько часов наблюдения
+PRIOR_CHANGE_HOURS = 24.0
+
+# Через сколько дней с момента появления объявления интервал удваивается
+AGE_DOUBLING_DAYS = 30.0
+
+# Формат времени как у CURRENT_TIMESTAMP в SQLite (UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def utc_now() -> datetime:
+    """Текущее время UTC без часового пояса (как в SQLite)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Разбор времени из SQLite"""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], TIMESTAMP_FORMAT)
+
+
+class RecrawlScheduler:
+    """
+    Расписание повторных посещений уже обработанных объявлений
+    
+    Для каждой ссылки хранится отпечаток данных объявления, количество
+    посещений и обнаруженных изменений. Частота изменений оценивается
+    как (изменений + 1) / (часов наблюдения + PRIOR_CHANGE_HOURS), и
+    следующее посещение назначается на момент, когда объявление
+    изменилось бы с вероятностью 50%. Интервал растет с возрастом
+    объявления и ограничен RECRAWL_MIN_INTERVAL..RECRAWL_MAX_INTERVAL.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager,
+                 min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None):
+        """
+        Инициализация
+        
+        Args:
+            db_manager: Менеджер базы данных
+            min_interval: Минимальный интервал в часах
+                          (по умолчанию config.RECRAWL_MIN_INTERVAL)
+            max_interval: Максимальный интервал в часах
+                          (по умолчанию config.RECRAWL_MAX_INTERVAL)
+        """
+        self.db_manager = db_manager
+        self.min_interval = config.RECRAWL_MIN_INTERVAL if min_interval is None else min_interval
+        self.max_interval = config.RECRAWL_MAX_INTERVAL if max_interval is None else max_interval
+        if self.min_interval <= 0 or self.max_interval < self.min_interval:
+            raise ValueError("Некорректные интервалы повторного обхода")
+        # Расписание для ссылок, обработанных без next_visit, назначается один раз
+        self._backfilled = False
+    
+    @staticmethod
+    def fingerprint(apartment_data: Dict) -> str:
+        """
+        Отпечаток отслеживаемых полей объявления
+        
+        Args:
+            apartment_data: Словарь с данными объявления
+            
+        Returns:
+            SHA-1 хэш отслеживаемых полей
+        """
+        values = [apartment_data.get(field) for field in TRACKED_FIELDS]
+        return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+    
+    def next_interval(self, changes: int, observed_hours: float, age_days: float) -> float:
+        """
+        Интервал до следующего посещения
+        
+        Args:
+            changes: Количество обнаруженных изменений
+            observed_hours: Время наблюдения за объявлением в часах
+            age_days: Возраст объявления в днях
+            
+        Returns:
+            Интервал в часах
+        """
+        change_rate = (changes + 1) / (max(observed_hours, 0.0) + PRIOR_CHANGE_HOURS)
+        interval = math.log(2) / change_rate
+        interval *= 1 + max(age_days, 0.0) / AGE_DOUBLING_DAYS
+        return min(max(interval, self.min_interval), self.max_interval)
+    
+    def get_due_links(self, page_budget: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        Ссылки, которые пора посетить повторно
+        
+        Args:
+            page_budget: Максимальное количество ссылок (по умолчанию
+                         config.RECRAWL_PAGE_BUDGET, 0 - без ограничения)
+            
+        Returns:
+            Список кортежей (id, url), самые просроченные первыми
+        """
+        if page_budget is None:
+            page_budget = config.RECRAWL_PAGE_BUDGET
+        if not self._backfilled:
+            self.db_manager.backfill_link_schedule(self.min_interval)
+            self._backfilled = True
+        return self.db_manager.get_due_links(
+            utc_now().strftime(TIMESTAMP_FORMAT), page_budget or None
+        )
+    
+    def record_visit(self, link_id: int, apartment_data: Dict) -> bool:
+        """
+        Учет посещения объявления и назначение следующего
+        
+        Если ссылка посещается повторно впервые, для сравнения
+        используются данные объявления, уже сохраненные в БД.
+        
+        Args:
+            link_id: ID ссылки
+            apartment_data: Данные объявления, полученные при посещении
+            
+        Returns:
+            True если объявление изменилось
+        """
+        now = utc_now()
+        new_fingerprint = self.fingerprint(apartment_data)
+        schedule = self.db_manager.get_link_schedule(link_id) or {}
+        
+        if schedule.get('visits'):
+            old_fingerprint = schedule['fingerprint']
+            visits = schedule['visits']
+            changes = schedule['changes']
+            first_visit = parse_timestamp(schedule['first_visit']) or now
+        else:
+            stored = self.db_manager.get_apartment_by_url(apartment_data.get('url'))
+            old_fingerprint = self.fingerprint(stored) if stored else None
+            visits = 0
+            changes = 0
+            first_visit = (parse_timestamp(stored['created_at']) if stored else None) or now
+        
+        changed = old_fingerprint is not None and old_fingerprint != new_fingerprint
+        visits += 1
+        if changed:
+            changes += 1
+        
+        created_at = parse_timestamp(schedule.get('link_created_at')) or first_visit
+        interval = self.next_interval(
+            changes,
+            (now - first_visit).total_seconds() / 3600,
+            (now - created_at).total_seconds() / 86400
+        )
+        
+        self.db_manager.save_link_schedule(
+            link_id,
+            fingerprint=new_fingerprint,
+            visits=visits,
+            changes=changes,
+            first_visit=first_visit.strftime(TIMESTAMP_FORMAT),
+            last_visit=now.strftime(TIMESTAMP_FORMAT),
+            next_visit=(now + timedelta(hours=interval)).strftime(TIMESTAMP_FORMAT)
+        )
+        return changed
+    
+    def record_failure(self, link_id: int) -> None:
+        """
+        Неудачное посещение: повтор через минимальный интервал
+        
+        Args:
+            link_id: ID ссылки
+        """
+        next_visit = utc_now() + timedelta(hours=self.min_interval)
+        self.db_manager.postpone_link(link_id, next_visit.strftime(TIMESTAMP_FORMAT))
+    
+    def record_removed(self, link_id: int) -> None:
+        """
+        Объявление снято с публикации: больше не посещается
+        
+        Args:
+            link_id: ID ссылки
+        """
+        self.db_manager.mark_link_as_removed(link_id, utc_now().strftime(TIMESTAMP_FORMAT))
@@ -0,0 +1,221 @@
+"""
+Аналитический отчет по таблице apartments
+
+Строки не загружаются в Python по одной: SQLite группирует нужные
+столбцы (цена и район - по их индексам, см. normalize.py), а пары
+значение/количество читаются пачками по REPORT_CHUNK_SIZE в массивы
+NumPy, по которым векторно считаются перцентили, среднее и итоги.
+Память зависит от количества различных цен, районов и дней, а не от
+количества строк.
+
+Использование:
+    python report.py [файл БД] [--chunk-size N] [--days N]
+"""
+
+import os
+import bisect
+import sqlite3
+import time
+import argparse
+import contextlib
+from typing import Dict, Optional, Sequence, Tuple
+import config
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy не установлен, агрегаты считаются циклами Python
+    np = None
+
+
+# Перцентили цены в отчете
+PRICE_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Группировки отчета: имя -> выражение SQL
+REPORT_GROUPS = {
+    'price': "price_rub",
+    'district': "district",
+    'day': "substr(created_at, 1, 10)",
+}
+
+
+def load_counts(conn: sqlite3.Connection, expression: str, chunk_size: int) -> Tuple[list, list]:
+    """
+    Количество объявлений по значению выражения
+    
+    Args:
+        conn: Соединение с БД
+        expression: Выражение SQL из REPORT_GROUPS
+        chunk_size: Количество групп, читаемых за один раз
+        
+    Returns:
+        Кортеж (значения, количества) по возрастанию значения, без NULL;
+        при установленном NumPy - массивы
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {expression} AS value, COUNT(*) FROM apartments
+        WHERE value IS NOT NULL
+        GROUP BY value
+        ORDER BY value
+    """)
+    
+    values: list = []
+    counts: list = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunk_values, chunk_counts = zip(*rows)
+        values.extend(chunk_values)
+        counts.extend(chunk_counts)
+    
+    if np is not None:
+        return np.array(values), np.array(counts, dtype=np.int64)
+    return values, counts
+
+
+def weighted_percentiles(values: Sequence, counts: Sequence,
+                         percents: Sequence[float]) -> Dict[float, float]:
+    """
+    Перцентили по сгруппированным значениям (метод nearest-rank)
+    
+    Args:
+        values: Значения по возрастанию
+        counts: Количество строк с каждым значением
+        percents: Перцентили от 0 до 100
+        
+    Returns:
+        Словарь перцентиль -> значение (пустой, если значений нет)
+    """
+    if len(values) == 0:
+        return {}
+    
+    if np is not None:
+        values = np.asarray(values)
+        cumulative = np.cumsum(counts)
+        ranks = np.maximum(1, np.ceil(np.asarray(percents) * cumulative[-1] / 100))
+        indexes = np.searchsorted(cumulative, ranks)
+        return {percent: values[index].item() for percent, index in zip(percents, indexes)}
+    
+    cumulative = []
+    running = 0
+    for count in counts:
+        running += count
+        cumulative.append(running)
+    return {
+        percent: values[bisect.bisect_left(cumulative, max(1, -(-percent * running // 100)))]
+        for percent in percents
+    }
+
+
+def weighted_mean(values: Sequence, counts: Sequence) -> Optional[float]:
+    """Среднее по сгруппированным значениям"""
+    if len(values) == 0:
+        return None
+    if np is not None:
+        counts = np.asarray(counts)
+        return float(np.dot(np.asarray(values, dtype=np.float64), counts) / counts.sum())
+    return sum(value * count for value, count in zip(values, counts)) / sum(counts)
+
+
+def build_report(db_path: str = "avito_data.db", chunk_size: Optional[int] = None) -> Dict:
+    """
+    Расчет отчета
+    
+    Args:
+        db_path: Путь к базе данных
+        chunk_size: Групп в пачке (по умолчанию config.REPORT_CHUNK_SIZE)
+        
+    Returns:
+        Словарь: rows, priced, price_mean, price_percentiles,
+        districts (по убыванию количества), per_day, elapsed
+    """
+    chunk_size = chunk_size or config.REPORT_CHUNK_SIZE
+    started = time.monotonic()
+    
+    # closing: соединение закрывается (with sqlite3.connect только фиксирует транзакцию)
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        rows = conn.execute("SELECT COUNT(*) FROM apartments").fetchone()[0]
+        prices, price_counts = load_counts(conn, REPORT_GROUPS['price'], chunk_size)
+        districts, district_counts = load_counts(conn, REPORT_GROUPS['district'], chunk_size)
+        days, day_counts = load_counts(conn, REPORT_GROUPS['day'], chunk_size)
+    
+    if np is not None:
+        priced = int(price_counts.sum())
+        order = np.argsort(-district_counts, kind='stable')
+        district_rows = list(zip(districts[order].tolist(), district_counts[order].tolist()))
+        day_rows = list(zip(days.tolist(), day_counts.tolist()))
+    else:
+        priced = sum(price_counts)
+        district_rows = sorted(zip(districts, district_counts), key=lambda item: -item[1])
+        day_rows = list(zip(days, day_counts))
+    
+    without_district = rows - sum(count for _, count in district_rows)
+    if without_district:
+        district_rows.append((None, without_district))
+    
+    return {
+        'rows': rows,
+        'priced': priced,
+        'price_mean': weighted_mean(prices, price_counts),
+        'price_percentiles': weighted_percentiles(prices, price_counts, PRICE_PERCENTILES),
+        'districts': district_rows,
+        'per_day': day_rows,
+        'elapsed': time.monotonic() - started,
+    }
+
+
+def print_report(report: Dict, days: int = 14) -> None:
+    """
+    Вывод отчета
+    
+    Args:
+        report: Результат build_report
+        days: Сколько последних дней показать в разбивке по дням
+    """
+    print(f"\n{'=' * 60}")
+    print("АНАЛИТИЧЕСКИЙ ОТЧЕТ")
+    print(f"{'=' * 60}")
+    print(f"Объявлений: {report['rows']}, с ценой: {report['priced']}")
+    if not report['rows']:
+        print(f"{'=' * 60}")
+        return
+    
+    if report['priced']:
+        print(f"\nЦена, ₽ (средняя {report['price_mean']:.0f}):")
+        for percent, value in report['price_percentiles'].items():
+            print(f"  p{percent:<3} {value:>10}")
+    else:
+        print("⚠ Нет цен в типизированных столбцах - заполните их (режим 10)")
+    
+    print("\nОбъявлений по районам:")
+    for district, count in report['districts']:
+        print(f"  {district or 'Район не указан':30} {count:>8}")
+    
+    print(f"\nНовых объявлений по дням (последние {days}):")
+    for day, count in report['per_day'][-days:]:
+        print(f"  {day}  {count:>8}")
+    
+    backend = "NumPy" if np is not None else "без NumPy"
+    print(f"\nРасчет занял {report['elapsed']:.2f} с ({backend})")
+    print(f"{'=' * 60}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Аналитический отчет по объявлениям")
+    arg_parser.add_argument("db_path", nargs="?", default="avito_data.db",
+                            help="Файл базы данных (по умолчанию avito_data.db)")
+    arg_parser.add_argument("--chunk-size", type=int, default=None,
+                            help="Групп в пачке (по умолчанию AVITO_REPORT_CHUNK_SIZE)")
+    arg_parser.add_argument("--days", type=int, default=14,
+                            help="Сколько последних дней показать")
+    args = arg_parser.parse_args()
+    
+    if not os.path.exists(args.db_path):
+        print(f"✗ База данных не найдена: {args.db_path}")
+    else:
+        from db import DatabaseManager
+        # Добавление типизированных столбцов, если БД создана до их появления
+        DatabaseManager(args.db_path)
+        print_report(build_report(args.db_path, args.chunk_size), args.days)
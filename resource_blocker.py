@@ -0,0 +1,218 @@
+from typing import Optional, List, Dict
+import config
+
+
+# Шаблоны URL по типам ресурсов. Network.setBlockedURLs принимает только
+# шаблоны URL, поэтому типы ресурсов задаются через расширения файлов.
+# Завершающая * нужна для URL с параметрами запроса (style.css?v=123)
+RESOURCE_TYPE_PATTERNS: Dict[str, List[str]] = {
+    'Font': ['*.woff*', '*.ttf*', '*.otf*', '*.eot*'],
+    'Stylesheet': ['*.css*'],
+    'Image': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'],
+    'Media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.ts', '*.ts?*', '*.mp3*'],
+}
+
+# Аналитика, реклама и сторонние трекеры, встречающиеся на страницах Avito
+DEFAULT_BLOCKED_URL_PATTERNS: List[str] = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*mc.yandex.ru*',
+    '*an.yandex.ru*',
+    '*yastatic.net/partner-code*',
+    '*ads.adfox.ru*',
+    '*top-fwz1.mail.ru*',
+    '*vk.com/rtrg*',
+    '*criteo.com*',
+    '*criteo.net*',
+    '*tns-counter.ru*',
+    '*mediascope.net*',
+    '*sentry.io*',
+]
+
+# Объем переданных данных и время загрузки по Performance API
+PAGE_METRICS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || 0) : 0;
+for (const entry of resources) {
+    bytes += entry.transferSize || 0;
+}
+let loadTime = performance.now();
+if (nav && nav.loadEventEnd > 0) {
+    loadTime = nav.loadEventEnd;
+} else if (nav && nav.domContentLoadedEventEnd > 0) {
+    loadTime = nav.domContentLoadedEventEnd;
+}
+return {bytes: bytes, requests: resources.length, load_time: loadTime / 1000};
+"""
+
+
+class ResourceBlocker:
+    """
+    Блокировка второстепенных ресурсов через Chrome DevTools Protocol
+    
+    Шрифты, стили, медиа и трекеры не загружаются браузером вовсе
+    (Network.setBlockedURLs). Для каждой страницы записывается объем
+    переданных данных и время загрузки. Для оценки экономии (по желанию)
+    первая страница каждого типа загружается дважды: без блокировки и с
+    блокировкой, оба раза с отключенным кэшем браузера.
+    """
+    
+    def __init__(self, resource_types: Optional[List[str]] = None,
+                 url_patterns: Optional[List[str]] = None,
+                 calibrate: Optional[bool] = None):
+        """
+        Инициализация
+        
+        Args:
+            resource_types: Блокируемые типы ресурсов (ключи RESOURCE_TYPE_PATTERNS),
+                            по умолчанию config.BLOCKED_RESOURCE_TYPES
+            url_patterns: Блокируемые шаблоны URL,
+                          по умолчанию DEFAULT_BLOCKED_URL_PATTERNS
+            calibrate: Измерять загрузку без блокировки для сравнения
+                       (по умолчанию config.BLOCKING_CALIBRATE)
+        """
+        self.resource_types = (resource_types if resource_types is not None
+                               else config.BLOCKED_RESOURCE_TYPES)
+        unknown = [name for name in self.resource_types if name not in RESOURCE_TYPE_PATTERNS]
+        if unknown:
+            raise ValueError(f"Неизвестные типы ресурсов: {', '.join(unknown)}")
+        
+        self.url_patterns = (url_patterns if url_patterns is not None
+                             else DEFAULT_BLOCKED_URL_PATTERNS + config.BLOCKED_URL_PATTERNS)
+        self.calibrate = config.BLOCKING_CALIBRATE if calibrate is None else calibrate
+        # Метрики загрузки без блокировки по типу страницы
+        self.baseline: Dict[str, Dict[str, float]] = {}
+        # Тип страницы, следующая загрузка которой идет без кэша для сравнения
+        self.calibrating: Optional[str] = None
+        # Метрики загруженных страниц
+        self.page_log: List[Dict] = []
+    
+    @property
+    def patterns(self) -> List[str]:
+        """Все блокируемые шаблоны URL"""
+        patterns = []
+        for name in self.resource_types:
+            patterns.extend(RESOURCE_TYPE_PATTERNS[name])
+        patterns.extend(self.url_patterns)
+        return patterns
+    
+    def apply(self, driver) -> None:
+        """
+        Включение блокировки в браузере
+        
+        Args:
+            driver: Экземпляр webdriver.Chrome
+        """
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+    
+    def disable(self, driver) -> None:
+        """Отключение блокировки"""
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+    
+    def needs_baseline(self, page_type: Optional[str]) -> bool:
+        """Нужно ли измерить загрузку без блокировки для этого типа страниц"""
+        return bool(self.calibrate and page_type and page_type not in self.baseline)
+    
+    def measure_baseline(self, driver, url: str, page_type: str) -> None:
+        """
+        Загрузка страницы без блокировки и без кэша для сравнения
+        
+        Кэш остается отключенным до end_calibration, чтобы следующая
+        загрузка той же страницы с блокировкой тоже шла без кэша.
+        
+        Args:
+            driver: Экземпляр webdriver.Chrome
+            url: URL страницы
+            page_type: Тип страницы
+        """
+        try:
+            self.disable(driver)
+            driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+            self.calibrating = page_type
+            driver.get(url)
+            self.baseline[page_type] = self.collect_metrics(driver)
+            print(f"Загрузка без блокировки ({page_type}): "
+                  f"{self.baseline[page_type]['bytes'] / 1024:.0f} КБ, "
+                  f"{self.baseline[page_type]['load_time']:.2f} с")
+        except Exception as e:
+            print(f"⚠ Не удалось измерить загрузку без блокировки: {e}")
+            self.baseline[page_type] = {}
+            self.end_calibration(driver)
+        finally:
+            self.apply(driver)
+    
+    def end_calibration(self, driver) -> None:
+        """Включение кэша после сравнительной загрузки"""
+        if self.calibrating is None:
+            return
+        self.calibrating = None
+        try:
+            driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+        except Exception as e:
+            print(f"⚠ Не удалось включить кэш браузера: {e}")
+    
+    def collect_metrics(self, driver) -> Dict[str, float]:
+        """
+        Метрики текущей страницы
+        
+        Returns:
+            Словарь: bytes (переданные байты), requests, load_time (с)
+        """
+        metrics = driver.execute_script(PAGE_METRICS_SCRIPT) or {}
+        return {
+            'bytes': float(metrics.get('bytes', 0)),
+            'requests': float(metrics.get('requests', 0)),
+            'load_time': float(metrics.get('load_time', 0)),
+        }
+    
+    def record_page(self, driver, url: str, page_type: Optional[str]) -> Dict[str, float]:
+        """
+        Запись метрик загруженной страницы
+        
+        Args:
+            driver: Экземпляр webdriver.Chrome
+            url: URL страницы
+            page_type: Тип страницы
+            
+        Returns:
+            Метрики страницы; для загрузки без кэша сразу после
+            measure_baseline - с экономией относительно загрузки без блокировки
+        """
+        try:
+            metrics = self.collect_metrics(driver)
+        except Exception as e:
+            print(f"⚠ Не удалось получить метрики страницы: {e}")
+            return {}
+        
+        # Сравнение только при одинаковых условиях: обе загрузки без кэша
+        baseline = self.baseline.get(page_type) if page_type == self.calibrating else None
+        if baseline:
+            metrics['bytes_saved'] = baseline['bytes'] - metrics['bytes']
+            metrics['load_time_saved'] = baseline['load_time'] - metrics['load_time']
+        
+        metrics['url'] = url
+        metrics['page_type'] = page_type
+        self.page_log.append(metrics)
+        return metrics
+    
+    def get_summary(self) -> Dict[str, float]:
+        """
+        Сводка по загруженным страницам
+        
+        Returns:
+            Словарь: pages, bytes, load_time, calibrated_pages, bytes_saved,
+            load_time_saved (экономия - суммарная по calibrated_pages страницам,
+            загруженным для сравнения)
+        """
+        return {
+            'pages': len(self.page_log),
+            'calibrated_pages': sum(1 for entry in self.page_log if 'bytes_saved' in entry),
+            'bytes': sum(entry['bytes'] for entry in self.page_log),
+            'load_time': sum(entry['load_time'] for entry in self.page_log),
+            'bytes_saved': sum(entry.get('bytes_saved', 0) for entry in self.page_log),
+            'load_time_saved': sum(entry.get('load_time_saved', 0) for entry in self.page_log),
+        }
@@ -1,7 +1,8 @@
 import time
 import pickle
 import os
-from typing import Optional
+import threading
+from typing import Optional, List, Dict, Tuple
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -10,37 +11,188 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
+from resource_blocker import ResourceBlocker
+import config
+
+
+# User-Agent браузера (используется также HTTP-клиентом)
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+# Элементы, наличие которых означает, что страница готова к парсингу
+PAGE_READY_MARKERS: Dict[str, List[str]] = {
+    'catalog': ['[data-marker="item"]'],
+    'detail': ['[data-marker="item-view/title-info"]'],
+}
+
+# Элементы, после появления которых нужных маркеров уже не будет
+# (объявление снято с публикации)
+PAGE_FINAL_MARKERS: Dict[str, List[str]] = {
+    'detail': ['[data-marker="item-view/closed-warning"]'],
+}
+
+# Карточка объявления в каталоге
+ITEM_CARD_SELECTOR = '[data-marker="item"]'
+
+# Прокрутка вниз и ожидание новых карточек через MutationObserver:
+# скрипт завершается, как только карточек стало больше, или по таймауту
+SCROLL_STEP_SCRIPT = """
+const selector = arguments[0];
+const settleMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const count = () => document.querySelectorAll(selector).length;
+const before = count();
+let timer = null;
+const observer = new MutationObserver(() => {
+    const current = count();
+    if (current > before) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(current);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(() => {
+    observer.disconnect();
+    done(count());
+}, settleMs);
+window.scrollTo(0, document.body.scrollHeight);
+"""
+
+# Общее количество объявлений из заголовка каталога
+TOTAL_COUNT_SCRIPT = """
+const elem = document.querySelector('[data-marker="page-title/count"]');
+if (!elem) { return null; }
+const digits = elem.textContent.replace(/\\D/g, '');
+return digits ? parseInt(digits, 10) : null;
+"""
+
+# Фиксированные задержки старой схемы (для оценки сэкономленного времени)
+FIXED_WAIT_BASELINE: Dict[str, float] = {
+    'catalog': 3.0,
+    'detail': 5.0,
+}
+
+
+# Путь к ChromeDriver, найденный в текущем процессе
+_driver_path: Optional[str] = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path(refresh: bool = False) -> Tuple[str, bool]:
+    """
+    Получение пути к ChromeDriver с кэшированием
+    
+    webdriver-manager вызывается только если пути нет в памяти процесса
+    и в файле config.DRIVER_PATH_CACHE_FILE. Файл записывается только
+    после успешного запуска браузера (remember_driver_path).
+    
+    Args:
+        refresh: Сбросить кэш (например, после обновления Chrome путь из
+                 кэша указывает на драйвер несовместимой версии)
+        
+    Returns:
+        Кортеж (путь к исполняемому файлу ChromeDriver, взят ли путь из кэша)
+    """
+    global _driver_path
+    
+    with _driver_path_lock:
+        cache_file = config.DRIVER_PATH_CACHE_FILE
+        if refresh:
+            _driver_path = None
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+        
+        if _driver_path and os.path.exists(_driver_path):
+            return _driver_path, True
+        
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached_path = f.read().strip()
+            if cached_path and os.path.exists(cached_path):
+                _driver_path = cached_path
+                return _driver_path, True
+        
+        _driver_path = ChromeDriverManager().install()
+        return _driver_path, False
+
+
+def remember_driver_path(driver_path: str) -> None:
+    """
+    Сохранение пути к ChromeDriver, с которым браузер успешно запустился
+    
+    Args:
+        driver_path: Путь к исполняемому файлу ChromeDriver
+    """
+    cache_file = config.DRIVER_PATH_CACHE_FILE
+    try:
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                if f.read().strip() == driver_path:
+                    return
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            f.write(driver_path)
+    except OSError as e:
+        print(f"⚠ Не удалось сохранить путь к ChromeDriver: {e}")
 
 
 class AvitoScraper:
     """Класс для управления браузером и скрапинга Avito"""
     
-    def __init__(self, headless: bool = True, cookies_file: str = "avito_cookies.pkl"):
+    def __init__(self, headless: bool = True, cookies_file: str = "avito_cookies.pkl",
+                 page_ready_timeout: Optional[float] = None,
+                 user_data_dir: Optional[str] = None,
+                 resource_blocker: Optional[ResourceBlocker] = None):
         """
         Инициализация скрапера
         
         Args:
             headless: Запуск браузера в фоновом режиме
             cookies_file: Путь к файлу с куки
+            page_ready_timeout: Максимальное ожидание готовности страницы
+                                (по умолчанию config.PAGE_READY_TIMEOUT)
+            user_data_dir: Постоянный профиль Chrome. Куки сохраняются
+                           в профиле и не загружаются через главную страницу
+            resource_blocker: Блокировка второстепенных ресурсов (по умолчанию
+                              создается, если включен config.BLOCK_RESOURCES)
         """
         self.headless = headless
         self.cookies_file = cookies_file
+        self.user_data_dir = os.path.abspath(user_data_dir) if user_data_dir else None
+        # Профиль уже содержал данные до запуска браузера
+        self.profile_reused = False
+        self.cookies_applied = False
+        # Время запуска браузера и загрузки куки (секунды)
+        self.startup_time: Optional[float] = None
+        self.cookies_time: Optional[float] = None
+        self.page_ready_timeout = (page_ready_timeout if page_ready_timeout is not None
+                                   else config.PAGE_READY_TIMEOUT)
+        if resource_blocker is None and config.BLOCK_RESOURCES:
+            resource_blocker = ResourceBlocker()
+        self.resource_blocker = resource_blocker
         self.driver: Optional[webdriver.Chrome] = None
         self.wait: Optional[WebDriverWait] = None
+        # Журнал ожидания готовности страниц
+        self.wait_log: List[Dict] = []
     
     def setup_driver(self) -> None:
         """Настройка и запуск браузера"""
+        started = time.monotonic()
         chrome_options = Options()
         
         if self.headless:
             chrome_options.add_argument("--headless")
         
+        if self.user_data_dir:
+            self.profile_reused = os.path.isdir(os.path.join(self.user_data_dir, "Default"))
+            chrome_options.add_argument(f"--user-data-dir={self.user_data_dir}")
+        
         # Дополнительные опции для стабильности
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
         
         # Отключение изображений для ускорения загрузки
         prefs = {
@@ -51,11 +203,23 @@ class AvitoScraper:
         
         try:
             # Метод 1: Автоматическая установка ChromeDriver через webdriver-manager
-            driver_path = ChromeDriverManager().install()
-            service = Service(executable_path=driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver_path, cached = resolve_driver_path()
+            try:
+                self.driver = webdriver.Chrome(service=Service(executable_path=driver_path),
+                                               options=chrome_options)
+            except Exception as e:
+                if not cached:
+                    raise
+                # Драйвер из кэша не подошел (например, Chrome обновился)
+                print(f"⚠ ChromeDriver из кэша не запустился: {e}")
+                print("Повторный поиск ChromeDriver...")
+                driver_path, _ = resolve_driver_path(refresh=True)
+                self.driver = webdriver.Chrome(service=Service(executable_path=driver_path),
+                                               options=chrome_options)
+            remember_driver_path(driver_path)
             self.wait = WebDriverWait(self.driver, 10)
-            print("✓ Браузер успешно запущен")
+            self.startup_time = time.monotonic() - started
+            print(f"✓ Браузер успешно запущен за {self.startup_time:.1f} с")
         except Exception as e:
             print(f"⚠ Ошибка при запуске браузера (метод 1): {e}")
             print("Попытка альтернативного метода...")
@@ -63,7 +227,9 @@ class AvitoScraper:
                 # Метод 2: Попытка использовать системный ChromeDriver
                 self.driver = webdriver.Chrome(options=chrome_options)
                 self.wait = WebDriverWait(self.driver, 10)
-                print("✓ Браузер успешно запущен (системный ChromeDriver)")
+                self.startup_time = time.monotonic() - started
+                print(f"✓ Браузер успешно запущен за {self.startup_time:.1f} с "
+                      f"(системный ChromeDriver)")
             except Exception as e2:
                 print(f"✗ Альтернативный метод также не сработал: {e2}")
                 print("\n" + "=" * 60)
@@ -79,6 +245,14 @@ class AvitoScraper:
                 print("   И добавьте в PATH")
                 print("=" * 60)
                 raise
+        
+        if self.resource_blocker:
+            try:
+                self.resource_blocker.apply(self.driver)
+                print(f"Блокировка ресурсов включена ({len(self.resource_blocker.patterns)} шаблонов)")
+            except Exception as e:
+                print(f"⚠ Не удалось включить блокировку ресурсов: {e}")
+                self.resource_blocker = None
     
     def load_cookies(self) -> bool:
         """
@@ -87,9 +261,21 @@ class AvitoScraper:
         Returns:
             True если куки загружены успешно, False иначе
         """
+        # Куки уже установлены в этой сессии браузера
+        if self.cookies_applied:
+            return True
+        
+        # Постоянный профиль хранит куки сам, главная страница не нужна
+        if self.profile_reused:
+            self.cookies_applied = True
+            self.cookies_time = 0.0
+            print("Куки взяты из профиля браузера")
+            return True
+        
         if not os.path.exists(self.cookies_file):
             return False
         
+        started = time.monotonic()
         try:
             with open(self.cookies_file, 'rb') as f:
                 cookies = pickle.load(f)
@@ -105,7 +291,9 @@ class AvitoScraper:
                     print(f"Ошибка при добавлении куки: {e}")
                     continue
             
-            print("Куки успешно загружены")
+            self.cookies_applied = True
+            self.cookies_time = time.monotonic() - started
+            print(f"Куки успешно загружены за {self.cookies_time:.1f} с")
             return True
         except Exception as e:
             print(f"Ошибка при загрузке куки: {e}")
@@ -121,23 +309,35 @@ class AvitoScraper:
         except Exception as e:
             print(f"Ошибка при сохранении куки: {e}")
     
-    def navigate_to_page(self, url: str) -> bool:
+    def navigate_to_page(self, url: str, page_type: Optional[str] = None) -> bool:
         """
         Переход на указанную страницу
         
         Args:
             url: URL страницы для перехода
+            page_type: Тип страницы ('catalog' или 'detail'). Если указан,
+                       ожидание идет до появления нужных парсеру элементов,
+                       иначе используется фиксированная задержка
             
         Returns:
             True если переход успешен, False иначе
         """
         try:
             print(f"Переход на страницу: {url}")
+            if self.resource_blocker and self.resource_blocker.needs_baseline(page_type):
+                self.resource_blocker.measure_baseline(self.driver, url, page_type)
             self.driver.get(url)
             
             # Ожидание загрузки страницы
             self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(3)  # Дополнительное время для загрузки контента
+            
+            if page_type:
+                self.wait_for_page_ready(page_type, url)
+            else:
+                time.sleep(3)  # Дополнительное время для загрузки контента
+            
+            if self.resource_blocker:
+                self.resource_blocker.record_page(self.driver, url, page_type)
             
             return True
         except TimeoutException:
@@ -146,6 +346,83 @@ class AvitoScraper:
         except Exception as e:
             print(f"Ошибка при переходе на страницу: {e}")
             return False
+        finally:
+            if self.resource_blocker:
+                self.resource_blocker.end_calibration(self.driver)
+    
+    def wait_for_page_ready(self, page_type: str, url: Optional[str] = None,
+                            timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание появления элементов, необходимых парсеру
+        
+        Возвращает управление сразу, как только все маркеры типа страницы
+        найдены, но не позже timeout. Время ожидания записывается в wait_log.
+        
+        Args:
+            page_type: Тип страницы (ключ PAGE_READY_MARKERS)
+            url: URL страницы (для журнала)
+            timeout: Максимальное время ожидания в секундах
+            
+        Returns:
+            True если страница готова, False если истек таймаут
+        """
+        markers = PAGE_READY_MARKERS.get(page_type)
+        if not markers:
+            raise ValueError(f"Неизвестный тип страницы: {page_type}")
+        
+        timeout = timeout if timeout is not None else self.page_ready_timeout
+        final_markers = PAGE_FINAL_MARKERS.get(page_type, [])
+        started = time.monotonic()
+        
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda driver: all(driver.find_elements(By.CSS_SELECTOR, marker)
+                                   for marker in markers)
+                or any(driver.find_elements(By.CSS_SELECTOR, marker)
+                       for marker in final_markers)
+            )
+            ready = True
+        except TimeoutException:
+            print(f"⚠ Страница не готова за {timeout:.0f} с ({page_type})")
+            ready = False
+        
+        self.wait_log.append({
+            'url': url,
+            'page_type': page_type,
+            'waited': time.monotonic() - started,
+            'ready': ready
+        })
+        return ready
+    
+    def get_wait_summary(self) -> Dict[str, float]:
+        """
+        Сводка по времени ожидания готовности страниц
+        
+        Returns:
+            Словарь: pages, not_ready, waited (с), baseline (с) и saved (с),
+            где baseline - время фиксированных задержек старой схемы
+        """
+        waited = sum(entry['waited'] for entry in self.wait_log)
+        baseline = sum(FIXED_WAIT_BASELINE.get(entry['page_type'], 0.0)
+                       for entry in self.wait_log)
+        return {
+            'pages': len(self.wait_log),
+            'not_ready': sum(1 for entry in self.wait_log if not entry['ready']),
+            'waited': waited,
+            'baseline': baseline,
+            'saved': baseline - waited
+        }
+    
+    def get_blocking_summary(self) -> Optional[Dict[str, float]]:
+        """
+        Сводка по блокировке ресурсов
+        
+        Returns:
+            ResourceBlocker.get_summary() или None, если блокировка выключена
+        """
+        if not self.resource_blocker:
+            return None
+        return self.resource_blocker.get_summary()
     
     def get_page_source(self) -> str:
         """
@@ -159,28 +436,68 @@ class AvitoScraper:
         
         return self.driver.page_source
     
-    def scroll_to_bottom(self) -> None:
-        """Прокрутка страницы вниз для загрузки всего контента"""
-        if not self.driver:
-            return
+    def scroll_to_bottom(self, target_count: Optional[int] = None) -> int:
+        """
+        Прокрутка страницы вниз для загрузки всего контента
         
-        # Получаем высоту страницы
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        Прокрутка останавливается, как только количество карточек
+        достигло target_count или не росло config.SCROLL_IDLE_STEPS шагов
+        подряд, а также по бюджету времени (config.SCROLL_TIME_BUDGET)
+        и шагов (config.SCROLL_MAX_STEPS).
         
-        while True:
-            # Прокручиваем вниз
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        Args:
+            target_count: Ожидаемое количество карточек на странице. По
+                          умолчанию config.CATALOG_PAGE_SIZE, но не больше
+                          счетчика объявлений из заголовка каталога
             
-            # Ждем загрузки нового контента
-            time.sleep(2)
+        Returns:
+            Количество карточек на странице
+        """
+        if not self.driver:
+            return 0
+        
+        if target_count is None:
+            # Счетчик в заголовке - объявления всех страниц, на одной их не больше
+            # CATALOG_PAGE_SIZE (на последней странице меньше - там прокрутка
+            # остановится по шагам без новых карточек)
+            total_count = self.driver.execute_script(TOTAL_COUNT_SCRIPT)
+            target_count = config.CATALOG_PAGE_SIZE
+            if total_count:
+                target_count = min(target_count, total_count)
+        
+        settle_ms = int(config.SCROLL_SETTLE_TIME * 1000)
+        self.driver.set_script_timeout(config.SCROLL_SETTLE_TIME + 5)
+        
+        started = time.monotonic()
+        count = len(self.driver.find_elements(By.CSS_SELECTOR, ITEM_CARD_SELECTOR))
+        steps = 0
+        idle_steps = 0
+        
+        while steps < config.SCROLL_MAX_STEPS:
+            if target_count and count >= target_count:
+                break
+            if time.monotonic() - started >= config.SCROLL_TIME_BUDGET:
+                print("⚠ Прокрутка остановлена по бюджету времени")
+                break
             
-            # Вычисляем новую высоту страницы
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
+            steps += 1
+            new_count = self.driver.execute_async_script(
+                SCROLL_STEP_SCRIPT, ITEM_CARD_SELECTOR, settle_ms
+            ) or 0
             
-            if new_height == last_height:
-                break
+            # Новые карточки не появились за SCROLL_SETTLE_TIME
+            if new_count <= count:
+                idle_steps += 1
+                if idle_steps >= config.SCROLL_IDLE_STEPS:
+                    break
+                continue
             
-            last_height = new_height
+            idle_steps = 0
+            count = new_count
+        
+        print(f"Прокрутка: карточек {count}, шагов {steps}, "
+              f"{time.monotonic() - started:.1f} с")
+        return count
     
     def close(self) -> None:
         """Закрытие браузера"""
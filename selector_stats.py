@@ -0,0 +1,222 @@
+"""
+Статистика срабатывания CSS-селекторов парсера
+
+Использование:
+    python selector_stats.py [файл статистики]
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+
+# Предупреждение: основной селектор поля срабатывает реже этой доли...
+PRIMARY_WARN_RATE = 0.5
+
+# ...при стольких попытках, а другой селектор поля срабатывает
+PRIMARY_WARN_MIN_ATTEMPTS = 20
+
+
+class SelectorRegistry:
+    """
+    Реестр цепочек селекторов с подсчетом попаданий и промахов
+    
+    Для каждого поля и селектора считается, сколько раз селектор дал
+    значение (попадание) и сколько раз нет (промах). Селекторы всегда
+    пробуются в порядке SELECTORS: общие запасные селекторы (например,
+    div[class*="item"]) захватывают лишние элементы, поэтому их нельзя
+    ставить перед основными. Статистика служит для предупреждений о
+    смене разметки Avito (get_warnings).
+    """
+    
+    def __init__(self, selectors: Dict[str, List[str]], stats_path: Optional[str] = None):
+        """
+        Инициализация
+        
+        Args:
+            selectors: Цепочки селекторов по полям (html_parser.SELECTORS)
+            stats_path: JSON-файл статистики (None - без сохранения)
+        """
+        self.selectors = {field: list(chain) for field, chain in selectors.items()}
+        self.stats_path = stats_path
+        # Поле -> селектор -> [попадания, промахи]
+        self.stats: Dict[str, Dict[str, List[int]]] = {}
+        self._lock = threading.Lock()
+        
+        if stats_path and os.path.exists(stats_path):
+            self.load(stats_path)
+    
+    def chain(self, field: str) -> List[str]:
+        """
+        Цепочка селекторов поля (в порядке SELECTORS)
+        
+        Args:
+            field: Имя поля (ключ SELECTORS)
+            
+        Returns:
+            Список селекторов
+        """
+        return self.selectors[field]
+    
+    def record(self, field: str, selector: str, hit: bool) -> None:
+        """
+        Учет попытки селектора
+        
+        Args:
+            field: Имя поля
+            selector: CSS-селектор
+            hit: True если селектор дал значение
+        """
+        with self._lock:
+            counts = self.stats.setdefault(field, {}).setdefault(selector, [0, 0])
+            counts[0 if hit else 1] += 1
+    
+    def hit_rate(self, field: str, selector: str) -> float:
+        """
+        Доля попаданий селектора
+        
+        Args:
+            field: Имя поля
+            selector: CSS-селектор
+            
+        Returns:
+            Доля от 0 до 1 (0, если попыток не было)
+        """
+        hits, misses = self.stats.get(field, {}).get(selector, [0, 0])
+        return hits / (hits + misses) if hits + misses else 0.0
+    
+    def load(self, stats_path: str) -> None:
+        """
+        Загрузка статистики из JSON-файла (суммируется с текущей)
+        
+        Args:
+            stats_path: Путь к файлу
+        """
+        try:
+            with open(stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Не удалось загрузить статистику селекторов {stats_path}: {e}")
+            return
+        
+        self.merge({
+            field: {
+                selector: [int(counts.get('hits', 0)), int(counts.get('misses', 0))]
+                for selector, counts in selectors.items()
+            }
+            for field, selectors in data.get('fields', {}).items()
+        })
+    
+    def merge(self, stats: Dict[str, Dict[str, List[int]]]) -> None:
+        """
+        Добавление статистики другого реестра (например, из процесса парсинга)
+        
+        Args:
+            stats: Поле -> селектор -> [попадания, промахи] (атрибут stats)
+        """
+        with self._lock:
+            for field, selectors in stats.items():
+                for selector, (hits, misses) in selectors.items():
+                    current = self.stats.setdefault(field, {}).setdefault(selector, [0, 0])
+                    current[0] += hits
+                    current[1] += misses
+    
+    def save(self, stats_path: Optional[str] = None) -> None:
+        """
+        Сохранение статистики в JSON-файл (атомарно, через временный файл)
+        
+        Args:
+            stats_path: Путь к файлу (по умолчанию stats_path реестра)
+        """
+        stats_path = stats_path or self.stats_path
+        if not stats_path:
+            return
+        
+        with self._lock:
+            data = {
+                'fields': {
+                    field: {
+                        selector: {'hits': hits, 'misses': misses}
+                        for selector, (hits, misses) in selectors.items()
+                    }
+                    for field, selectors in self.stats.items()
+                }
+            }
+        
+        directory = os.path.dirname(os.path.abspath(stats_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, stats_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def get_warnings(self) -> List[str]:
+        """
+        Поля, у которых перестал срабатывать основной селектор
+        
+        Предупреждение выдается, если основной селектор (первый в SELECTORS)
+        после PRIMARY_WARN_MIN_ATTEMPTS попыток срабатывает реже
+        PRIMARY_WARN_RATE, а другой селектор этого поля срабатывает.
+        Поля, где промахи всех селекторов - норма (например, кнопка
+        следующей страницы на последней странице), не попадают в список.
+        
+        Returns:
+            Список сообщений
+        """
+        warnings = []
+        with self._lock:
+            for field, chain in self.selectors.items():
+                field_stats = self.stats.get(field, {})
+                hits, misses = field_stats.get(chain[0], [0, 0])
+                if hits + misses < PRIMARY_WARN_MIN_ATTEMPTS:
+                    continue
+                if hits / (hits + misses) >= PRIMARY_WARN_RATE:
+                    continue
+                fallback_hits = sum(field_stats.get(selector, [0, 0])[0] for selector in chain[1:])
+                if fallback_hits:
+                    warnings.append(
+                        f"{field}: основной селектор '{chain[0]}' сработал "
+                        f"{hits} из {hits + misses} раз, запасные - {fallback_hits} раз"
+                    )
+        return warnings
+    
+    def dump(self) -> None:
+        """Вывод статистики по всем полям"""
+        print("=" * 60)
+        print("СТАТИСТИКА СЕЛЕКТОРОВ")
+        print("=" * 60)
+        for field in self.selectors:
+            if len(self.selectors[field]) < 2:
+                continue
+            print(f"\n{field}:")
+            for selector in self.chain(field):
+                hits, misses = self.stats.get(field, {}).get(selector, [0, 0])
+                primary = " (основной)" if selector == self.selectors[field][0] else ""
+                print(f"  {hits:6} / {hits + misses:<6} {self.hit_rate(field, selector):5.0%}  "
+                      f"{selector}{primary}")
+        
+        warnings = self.get_warnings()
+        if warnings:
+            print()
+            for warning in warnings:
+                print(f"⚠ {warning}")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    import config
+    from html_parser import SELECTORS
+    
+    path = sys.argv[1] if len(sys.argv) > 1 else config.SELECTOR_STATS_PATH
+    if not path or not os.path.exists(path):
+        print(f"✗ Файл статистики селекторов не найден: {path}")
+        sys.exit(1)
+    
+    SelectorRegistry(SELECTORS, path).dump()